@@ -1,8 +1,6 @@
 import streamlit as st
-import pandas as pd
-import tempfile
-import requests
-from lxml import etree
+import hashlib
+import threading
 import json
 
 # ---------------- Local imports ----------------
@@ -10,22 +8,42 @@ from data_fetch.cvr_api import hent_cvr_data
 from data_fetch.regnskab_api import hent_regnskaber
 
 from xbrl_processing.downloader import download_xbrl
-from xbrl_processing.parser import extract_xbrl_data
-from xbrl_processing.financial_parser import extract_financials
 from xbrl_processing.json_transformer import transform_xbrl_to_json
+from xbrl_processing.xbrl_analysis import start_xbrl_analysis_job
 
-from xhtml_processing.xhtml_text import extract_raw_text
-from xhtml_processing.xhtml_llm_extraction import llm_extract_ledelsesberetning
-from xhtml_processing.xhtml_llm_summary import llm_summarize_ledelsesberetning
+from xhtml_processing.ledelsesberetning_pipeline import start_ledelsesberetning_job
+from xhtml_processing.xhtml_llm_summary import (
+    condense_ledelsesberetning,
+    prepare_incremental_summary_prompt,
+    prepare_ledelsesberetning_summary_prompt,
+)
+from xhtml_processing.xhtml_chunker import split_paragraphs
+from xhtml_processing.paragraph_diff import diff_paragraphs
 
-from nlp.llm_summary import run_ai_model
+from nlp.llm_backend import LLMError, LLMRateLimitError
+from nlp.llm_summary import run_ai_model, stream_ai_model
 from nlp.summary_prompt import build_summary_prompt
+from nlp.final_summary_prompt import build_final_summary_prompt, split_combined_summary
+from nlp.summary_store import get_summary_store
 
 from utils.formatting import dk_number, dk_percent
 
 from xbrl_processing.instance_finder import find_valid_instance
+from xbrl_processing.instance_store import get_instance, store_instance
+
+from utils.workspace import Workspace, sweep_orphans
+from utils.lazy import lazy_import
+from utils.jobs import get_job, DONE
+from utils.singleflight import SingleFlight, SingleFlightTimeout
+from utils.resilience import CircuitOpenError
 
-from xbrl_processing.arelle_loader import load_model
+from concurrent.futures import ThreadPoolExecutor
+from requests import RequestException
+from pathlib import Path
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+# Heavy modules used only after a search are imported on first use
+pd = lazy_import("pandas")
 
 
 # ---------------- Streamlit Setup ----------------
@@ -39,14 +57,138 @@ st.title("🏢 CVR & Regnskabsanalyse")
 st.write("Indtast CVR og analyser XBRL samt udtræk Ledelsesberetning fra iXBRL.")
 
 
+# ---------------- Startup: remove leftovers from crashed runs ----------------
+@st.cache_resource
+def _sweep_orphan_workspaces() -> int:
+    return sweep_orphans()
+
+
+_sweep_orphan_workspaces()
+
+
+# ---------------- Cached lookups (shared across reruns and sessions) ----------------
+# Failed lookups raise LookupError (not found) or requests.RequestException
+# (network/service errors), so neither is cached.
+@st.cache_data(ttl=24 * 3600, show_spinner=False)
+def _company_data(cvr: int) -> dict:
+    company = hent_cvr_data(cvr)
+    if not company:
+        raise LookupError(f"CVR {cvr} not found")
+    return company
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _filings(cvr: int) -> list:
+    reports = hent_regnskaber(cvr)
+    if not reports:
+        raise LookupError(f"No filings for CVR {cvr}")
+    return reports
+
+
+# Sessions resolving the same filings at once share one download
+_instance_flight = SingleFlight("instance")
+INSTANCE_WAIT_S = 120
+
+
+def _resolve_instance(cvr: int, reports: list) -> tuple:
+    """
+    (sha256, suffix) of the instance find_valid_instance() resolves for
+    these filings; the file itself goes to the instance store.
+    """
+    def resolve():
+        with Workspace(use_ram=True) as ws:
+            path = find_valid_instance(pd.DataFrame(reports), workspace=ws)
+            if not path:
+                raise LookupError("No valid XBRL/iXBRL instance")
+            return store_instance(path), Path(path).suffix
+
+    filings = hashlib.sha256(json.dumps(reports, sort_keys=True, default=str).encode()).hexdigest()
+    return _instance_flight.do(("instance", cvr, filings), resolve, timeout=INSTANCE_WAIT_S)
+
+
+# Only the digest is cached; the instance file lives in the instance store
+@st.cache_data(ttl=24 * 3600, max_entries=20, show_spinner=False)
+def _instance_file(cvr: int, reports: list) -> tuple:
+    return _resolve_instance(cvr, reports)
+
+
+def _instance_path(cvr: int, reports: list) -> tuple:
+    """(sha256, path) of the stored instance for these filings."""
+    digest, suffix = _instance_file(cvr, reports)
+    path = get_instance(digest, suffix)
+    if path is None:
+        # Evicted from the store since the lookup was cached: fetch it again
+        digest, suffix = _resolve_instance(cvr, reports)
+        path = get_instance(digest, suffix)
+    if path is None:
+        raise LookupError("Instance file not in the instance store")
+    return digest, path
+
+
+# Finished analyses kept for other sessions; the oldest are dropped first
+XBRL_RESULTS_MAX = 50
+
+
+@st.cache_resource
+def _xbrl_results() -> dict:
+    """Finished XBRL analyses by instance sha256 (filled when a job completes)."""
+    return {}
+
+
+def _remember_xbrl_result(digest: str, result: dict) -> None:
+    results = _xbrl_results()
+    results[digest] = result
+    while len(results) > XBRL_RESULTS_MAX:
+        results.pop(next(iter(results)), None)
+
+
+def _in_script_ctx(ctx, fn):
+    # Worker threads get the script context so st.cache_data works in them
+    def run(*args):
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return fn(*args)
+    return run
+
+
+def _result_or_none(future):
+    try:
+        return future.result()
+    except LookupError:
+        return None
+
+
+# ---------------- Network errors ----------------
+def _show_fetch_error(e: RequestException, what: str, host: str) -> None:
+    # Raised by utils.resilience once its retries are used up (never cached)
+    print(f"[Fetch ERROR] {what}: {e}")
+    if isinstance(e, CircuitOpenError):
+        st.error(f"{what} er midlertidigt sat på pause efter flere fejl hos {host}. Prøv igen om lidt.")
+    else:
+        st.error(f"{what} fejlede (netværk eller {host}). Prøv igen.")
+
+
+# ---------------- LLM errors ----------------
+def _show_llm_error(e: LLMError) -> None:
+    # Raised by the scheduler once its retries are used up
+    if isinstance(e, LLMRateLimitError):
+        st.error("LLM'en afviser kald pga. kvote/rate limit. Prøv igen om lidt.")
+    else:
+        st.error(f"LLM-kaldet fejlede: {e}")
+
+
 # ---------------- Session State ----------------
 STATE_DEFAULTS = {
+    "cvr": None,
     "company": None,
     "reports": None,
     "xbrl_general": None,
     "xbrl_financial": None,
     "ledelsesberetning": None,
     "ledelsesberetning_summary": None,
+    "combined_summary": None,
+    "ledelsesberetning_job": None,
+    "xbrl_job": None,
+    "xbrl_digest": None,
 }
 
 for k, v in STATE_DEFAULTS.items():
@@ -54,9 +196,28 @@ for k, v in STATE_DEFAULTS.items():
         st.session_state[k] = v
 
 
+# =====================================================================
+#                     DISPLAY HELPERS
+# =====================================================================
+def _render_company(c: dict) -> None:
+    st.subheader("🧾 Virksomhedsoplysninger")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.write(f"**Navn:** {c.get('name')}")
+        st.write(f"**Startdato:** {c.get('startdate')}")
+        st.write(f"**Branche:** {c.get('industrydesc')}")
+    with col2:
+        st.write(f"**Adresse:** {c.get('address')}")
+        st.write(f"**By:** {c.get('zipcode')} {c.get('city')}")
+        st.write(f"**Status:** {c.get('status')}")
+
+
 # =====================================================================
 #                           SEARCH FLOW
 # =====================================================================
+company_rendered = False
+
 cvr_input = st.text_input("CVR-nummer", placeholder="Fx 10150817")
 search_btn = st.button("🔍 Søg virksomhed")
 
@@ -68,70 +229,141 @@ if search_btn:
 
     cvr = int(cvr_input)
 
-    # -------- Fetch CVR Data --------
-    with st.spinner("Henter virksomhedsdata..."):
-        company = hent_cvr_data(cvr)
+    # Results of the previous company must not leak into this one
+    for k in ("xbrl_general", "xbrl_financial", "ledelsesberetning",
+              "ledelsesberetning_summary", "combined_summary", "ledelsesberetning_job",
+              "xbrl_job", "xbrl_digest"):
+        st.session_state[k] = STATE_DEFAULTS[k]
+
+    # -------- CVR data and filings, fetched concurrently --------
+    ctx = get_script_run_ctx()
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        company_future = pool.submit(_in_script_ctx(ctx, _company_data), cvr)
+        filings_future = pool.submit(_in_script_ctx(ctx, _filings), cvr)
+
+        with st.spinner("Henter virksomhedsdata..."):
+            try:
+                company = _result_or_none(company_future)
+            except RequestException as e:
+                _show_fetch_error(e, "CVR-opslaget", "cvrapi.dk")
+                st.stop()
+
+        if not company:
+            st.error("Kunne ikke finde virksomheden.")
+            st.stop()
 
-    if not company:
-        st.error("Kunne ikke finde virksomheden.")
-        st.stop()
+        st.session_state.company = company
+        st.session_state.cvr = cvr
 
-    st.session_state.company = company
+        # Shown right away, while the filings are still loading
+        _render_company(company)
+        company_rendered = True
 
-    # -------- Fetch Regnskaber --------
-    with st.spinner("Henter regnskaber..."):
-        reports = hent_regnskaber(cvr)
+        with st.spinner("Henter regnskaber..."):
+            try:
+                reports = _result_or_none(filings_future)
+            except RequestException as e:
+                _show_fetch_error(e, "Hentningen af årsrapporter", "distribution.virk.dk")
+                st.stop()
 
     if not reports:
         st.error("Ingen årsrapporter fundet.")
         st.stop()
 
-    df = pd.DataFrame(reports)
-    st.session_state.reports = df
-
+    st.session_state.reports = pd.DataFrame(reports)
 
     # =====================================================================
     #   FIND ESEF XHTML OR ÅRL XML
     # =====================================================================
     with st.spinner("Finder XBRL / iXBRL instansfil..."):
-        instance_path = find_valid_instance(df)
+        try:
+            digest, instance_path = _instance_path(cvr, reports)
+        except LookupError:
+            st.error("Kunne ikke finde en gyldig XBRL/iXBRL instansfil.")
+            st.stop()
+        except SingleFlightTimeout:
+            st.error("Instansfilen hentes allerede i en anden session, men det tager for lang tid. Prøv igen om lidt.")
+            st.stop()
 
-    if not instance_path:
-        st.error("Kunne ikke finde en gyldig XBRL/iXBRL instansfil.")
-        st.stop()
+    # The jobs below copy the stored instance into their own workspaces.
+    # Both are keyed by the instance content, so sessions opening the same
+    # company at the same time share them.
 
+    # Ledelsesberetning is extracted in the background while the
+    # financials are analysed and read
+    try:
+        st.session_state.ledelsesberetning_job = start_ledelsesberetning_job(
+            instance_path, run_ai_model, dedupe_key=("ledelsesberetning", digest)
+        ).id
+    except Exception as e:
+        print(f"[JOB ERROR] could not start Ledelsesberetning job: {e}")
 
     # =====================================================================
-    #   LOAD XBRL / iXBRL WITH ARELLE
+    #   XBRL / iXBRL ANALYSIS WITH ARELLE (cached by file content)
     # =====================================================================
-    with st.spinner("Indlæser og analyserer XBRL/iXBRL..."):
-        try:
-            model = load_model(instance_path)
-        except Exception as e:
-            st.error("Arelle kunne ikke indlæse filen:\n" + str(e))
-            st.stop()
-
-        st.session_state.xbrl_general = extract_xbrl_data(instance_path)
-        st.session_state.xbrl_financial = extract_financials(instance_path)
+    cached = _xbrl_results().get(digest)
+    if cached:
+        st.session_state.xbrl_general = cached["general"]
+        st.session_state.xbrl_financial = cached["financial"]
+    else:
+        st.session_state.xbrl_digest = digest
+        st.session_state.xbrl_job = start_xbrl_analysis_job(
+            instance_path, dedupe_key=("xbrl", digest)
+        ).id
 
 
 # =====================================================================
 #                     DISPLAY: COMPANY INFO
 # =====================================================================
-if st.session_state.company:
-    c = st.session_state.company
+if st.session_state.company and not company_rendered:
+    _render_company(st.session_state.company)
 
-    st.subheader("🧾 Virksomhedsoplysninger")
 
-    col1, col2 = st.columns(2)
-    with col1:
-        st.write(f"**Navn:** {c.get('name')}")
-        st.write(f"**Startdato:** {c.get('startdate')}")
-        st.write(f"**Branche:** {c.get('industrydesc')}")
-    with col2:
-        st.write(f"**Adresse:** {c.get('address')}")
-        st.write(f"**By:** {c.get('zipcode')} {c.get('city')}")
-        st.write(f"**Status:** {c.get('status')}")
+# =====================================================================
+#              BACKGROUND JOBS (XBRL ANALYSIS, LEDERSESBERETNING)
+# =====================================================================
+@st.fragment(run_every=2)
+def _background_job_status():
+    xbrl_job = get_job(st.session_state.xbrl_job)
+    lb_job = get_job(st.session_state.ledelsesberetning_job)
+
+    finished = False
+    if xbrl_job is not None:
+        if not xbrl_job.done:
+            st.info(f"⏳ XBRL analyseres i baggrunden ({xbrl_job.elapsed_s:.0f}s) {xbrl_job.progress}")
+        else:
+            finished = True
+            st.session_state.xbrl_job = None
+            if xbrl_job.status == DONE:
+                _remember_xbrl_result(st.session_state.xbrl_digest, xbrl_job.result)
+                st.session_state.xbrl_general = xbrl_job.result["general"]
+                st.session_state.xbrl_financial = xbrl_job.result["financial"]
+            else:
+                st.session_state.job_note = xbrl_job.error
+
+    if lb_job is not None:
+        if not lb_job.done:
+            st.info(f"⏳ Ledelsesberetningen udtrækkes i baggrunden ({lb_job.elapsed_s:.0f}s) {lb_job.progress}")
+        else:
+            finished = True
+            st.session_state.ledelsesberetning_job = None
+            if lb_job.status == DONE and lb_job.result:
+                st.session_state.ledelsesberetning = lb_job.result
+            elif lb_job.status == DONE:
+                st.session_state.ledelsesberetning_auto_note = "Ingen ledelsesberetning fundet automatisk – indsæt den manuelt."
+            else:
+                st.session_state.ledelsesberetning_auto_note = f"Automatisk udtræk fejlede: {lb_job.error}"
+
+    # Hand finished results to the page; polling stops once no job is left
+    if finished:
+        st.rerun()
+
+
+if st.session_state.xbrl_job or st.session_state.ledelsesberetning_job:
+    _background_job_status()
+
+if st.session_state.get("job_note"):
+    st.error(st.session_state.pop("job_note"))
 
 
 # =====================================================================
@@ -199,15 +431,31 @@ if st.session_state.xbrl_general and st.session_state.xbrl_financial:
     st.subheader("🧠 LLM-sammenfatning af regnskabsdata")
 
     if st.button("Generer XBRL-sammenfatning"):
-        with st.spinner("Kører LLM..."):
-            json_payload = transform_xbrl_to_json(
-                st.session_state.xbrl_general,
-                st.session_state.xbrl_financial
-            )
+        json_payload = transform_xbrl_to_json(
+            st.session_state.xbrl_general,
+            st.session_state.xbrl_financial
+        )
 
-            prompt = build_summary_prompt(json_payload)
-            summary = run_ai_model(prompt)
-            st.write(summary)
+        prompt = build_summary_prompt(json_payload)
+
+        # Rendered progressively as Gemini streams the answer
+        try:
+            summary = st.write_stream(stream_ai_model(prompt))
+            if not summary:
+                st.error("LLM kunne ikke generere en sammenfatning.")
+        except LLMError as e:
+            _show_llm_error(e)
+
+
+# =====================================================================
+#     AUTOMATICALLY EXTRACTED LEDERSESBERETNING
+# =====================================================================
+if st.session_state.get("ledelsesberetning_auto_note"):
+    st.warning(st.session_state.pop("ledelsesberetning_auto_note"))
+
+if st.session_state.ledelsesberetning:
+    with st.expander("📄 Ledelsesberetning (tekst)"):
+        st.text(st.session_state.ledelsesberetning)
 
 
 # =====================================================================
@@ -237,10 +485,115 @@ if st.session_state.ledelsesberetning:
     st.subheader("✍️ LLM-Sammenfatning af Ledelsesberetning")
 
     if st.button("Generer sammenfatning"):
-        with st.spinner("Kører LLM..."):
-            summary = llm_summarize_ledelsesberetning(
+        text = st.session_state.ledelsesberetning
+        cvr = st.session_state.cvr
+        period = ((st.session_state.xbrl_financial or {}).get("Years", {}).get("CY", {}).get("end")) or None
+
+        # Last year's text and summary, if this company was summarised before.
+        # Until the XBRL job has found the period, the store is left alone: an
+        # entry without a period can't be placed before or after another year.
+        previous = None
+        if cvr and period:
+            try:
+                previous = get_summary_store().get_previous(cvr, period)
+            except Exception as e:
+                print(f"[Summary store ERROR] {e}")
+
+        summary, prompt, failed = None, None, False
+        with st.spinner("Forbereder tekst..."):
+            if previous:
+                # Only new or changed paragraphs go to the LLM
+                diff = diff_paragraphs(split_paragraphs(previous.text), split_paragraphs(text))
+                if diff.is_unchanged:
+                    summary = previous.summary
+                else:
+                    prompt = prepare_incremental_summary_prompt(
+                        diff, previous.summary, run_llm_fn=run_ai_model
+                    )
+            else:
+                # Long texts are first condensed part by part (map-reduce)
+                prompt = prepare_ledelsesberetning_summary_prompt(text, run_llm_fn=run_ai_model)
+
+        if summary:
+            st.info(f"Ledelsesberetningen er uændret siden {previous.period or 'sidste kørsel'}.")
+            st.markdown(summary)
+        elif prompt:
+            # Rendered progressively as Gemini streams the answer
+            try:
+                summary = st.write_stream(stream_ai_model(prompt))
+            except LLMError as e:
+                _show_llm_error(e)
+                failed = True
+
+        if summary:
+            st.session_state.ledelsesberetning_summary = summary
+            if cvr and period:
+                try:
+                    get_summary_store().save(cvr, period, text, summary)
+                except Exception as e:
+                    print(f"[Summary store ERROR] {e}")
+        elif not failed and prompt is None:
+            # The map step of a long text could not summarise every part
+            st.error("Fejl: Ikke alle dele af ledelsesberetningen kunne opsummeres. Prøv igen.")
+        elif not failed:
+            st.error("Fejl: LLM kunne ikke opsummere teksten.")
+
+
+# =====================================================================
+#    COMBINED SUMMARY (XBRL + LEDERSESBERETNING IN ONE LLM CALL)
+# =====================================================================
+def _render_combined(sections, xbrl_slot, lb_slot):
+    xbrl_slot.markdown(sections["xbrl"] or "…")
+    lb_slot.markdown(sections["ledelsesberetning"] or "…")
+
+
+if (
+    st.session_state.xbrl_general
+    and st.session_state.xbrl_financial
+    and st.session_state.ledelsesberetning
+):
+    st.subheader("🧩 Samlet sammenfatning (ét LLM-kald)")
+
+    st.markdown("#### 🧠 Regnskabsdata")
+    xbrl_slot = st.empty()
+    st.markdown("#### ✍️ Ledelsesberetning")
+    lb_slot = st.empty()
+
+    if st.button("Generer samlet sammenfatning"):
+        # Long reviews are condensed first so the single prompt stays within budget
+        with st.spinner("Forbereder tekst..."):
+            ledelsesberetning = condense_ledelsesberetning(
                 st.session_state.ledelsesberetning,
                 run_llm_fn=run_ai_model
             )
-            st.session_state.ledelsesberetning_summary = summary
-            st.write(summary)
+
+        answer = ""
+        if ledelsesberetning is None:
+            st.error("Fejl: Ikke alle dele af ledelsesberetningen kunne opsummeres. Prøv igen.")
+            answer = None
+        elif ledelsesberetning:
+            prompt = build_final_summary_prompt(
+                st.session_state.xbrl_general,
+                st.session_state.xbrl_financial,
+                ledelsesberetning,
+                structured=True
+            )
+
+            # Both panels fill in as the answer streams
+            try:
+                for part in stream_ai_model(prompt):
+                    answer += part
+                    _render_combined(split_combined_summary(answer, partial=True), xbrl_slot, lb_slot)
+            except LLMError as e:
+                _show_llm_error(e)
+                answer = None
+
+        sections = split_combined_summary(answer or "")
+        if sections["xbrl"] or sections["ledelsesberetning"]:
+            st.session_state.combined_summary = sections
+            st.session_state.ledelsesberetning_summary = sections["ledelsesberetning"] or None
+        elif answer is not None:
+            st.error("LLM kunne ikke generere en samlet sammenfatning.")
+
+    if st.session_state.combined_summary:
+        _render_combined(st.session_state.combined_summary, xbrl_slot, lb_slot)
@@ -0,0 +1,163 @@
+"""
+bench_extract_raw_text.py
+-------------------------
+Compares the narrative extractors on large reports:
+
+- bs4        : the original BeautifulSoup implementation (reference)
+- document   : shared lxml tree (extract_raw_text(load_document(path)))
+- streaming  : one linear lxml parser-target pass (extract_raw_text(path))
+- pages      : page-parallel extraction on all cores (extract_raw_text(path, workers=N))
+
+Every implementation runs in a fresh process so peak RSS is comparable.
+Outputs are compared byte for byte against the bs4 reference.
+
+Usage (from cvr_xbrl_app/):
+    python -m benchmarks.bench_extract_raw_text report1.xhtml report2.xhtml
+    python -m benchmarks.bench_extract_raw_text --synthetic-pages 2000
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+IMPLEMENTATIONS = ["bs4", "document", "streaming", "pages"]
+
+
+# ------------------------------------------------------------
+# Reference: the original BeautifulSoup extractor
+# ------------------------------------------------------------
+def _extract_raw_text_bs4(xhtml_path: str) -> str:
+    import warnings
+    from pathlib import Path
+
+    from bs4 import BeautifulSoup, XMLParsedAsHTMLWarning
+    from bs4.element import Tag
+
+    from xhtml_processing.xhtml_text import BLOCK_TAGS, HEADING_TAGS, clean_line
+
+    warnings.filterwarnings("ignore", category=XMLParsedAsHTMLWarning)
+
+    raw = Path(xhtml_path).read_text(encoding="utf-8", errors="ignore")
+    soup = BeautifulSoup(raw, "lxml")
+
+    for tag in soup(["script", "style", "meta", "link", "head", "title"]):
+        tag.decompose()
+
+    body = soup.body or soup
+    blocks = []
+
+    for node in body.find_all(True):
+        if not isinstance(node, Tag):
+            continue
+
+        name = node.name.lower()
+        is_heading = name in HEADING_TAGS
+        is_block = name in BLOCK_TAGS
+        if not (is_heading or is_block):
+            continue
+
+        if name in ["div", "section", "article", "span"]:
+            if any(
+                isinstance(child, Tag)
+                and (child.name.lower() in BLOCK_TAGS or child.name.lower() in HEADING_TAGS)
+                for child in node.children
+            ):
+                continue
+
+        text = node.get_text(" ", strip=True)
+        if not text:
+            continue
+
+        cleaned = clean_line(text, is_heading=is_heading)
+        if not cleaned:
+            continue
+
+        blocks.append(f"### {cleaned}" if is_heading else cleaned)
+
+    merged, last = [], None
+    for b in blocks:
+        if b != last:
+            merged.append(b)
+        last = b
+
+    return "\n\n".join(merged).strip()
+
+
+def _run_one(impl: str, path: str) -> dict:
+    from xhtml_processing.xhtml_document import load_document
+    from xhtml_processing.xhtml_text import extract_raw_text
+
+    t0 = time.perf_counter()
+    if impl == "bs4":
+        text = _extract_raw_text_bs4(path)
+    elif impl == "document":
+        text = extract_raw_text(load_document(path))
+    elif impl == "pages":
+        text = extract_raw_text(path, workers=os.cpu_count() or 1)
+    else:
+        text = extract_raw_text(path)
+    seconds = time.perf_counter() - t0
+
+    return {
+        "seconds": seconds,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "sha256": hashlib.sha256(text.encode("utf-8")).hexdigest(),
+        "chars": len(text),
+    }
+
+
+def _measure(impl: str, path: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_extract_raw_text", "--run", impl, path],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("reports", nargs="*")
+    ap.add_argument("--synthetic-pages", type=int, default=0)
+    ap.add_argument("--run", nargs=2, metavar=("IMPL", "PATH"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.run:
+        print(json.dumps(_run_one(*args.run)))
+        return
+
+    reports = list(args.reports)
+    synthetic = None
+    if args.synthetic_pages or not reports:
+        from benchmarks.synthetic_report import make_report
+
+        with tempfile.NamedTemporaryFile(suffix=".xhtml", delete=False) as tmp:
+            tmp.write(make_report(args.synthetic_pages or 1000).encode("utf-8"))
+        synthetic = tmp.name
+        reports.append(synthetic)
+
+    print(f"{'report':<40} {'impl':<10} {'MB':>7} {'sec':>8} {'peak RSS MB':>12}  identical")
+    for path in reports:
+        size_mb = os.path.getsize(path) / 1e6
+        results = {impl: _measure(impl, path) for impl in IMPLEMENTATIONS}
+        ref = results["bs4"]["sha256"]
+
+        for impl, r in results.items():
+            print(
+                f"{os.path.basename(path)[:40]:<40} {impl:<10} {size_mb:>7.1f} "
+                f"{r['seconds']:>8.2f} {r['peak_rss_mb']:>12.0f}  {r['sha256'] == ref}"
+            )
+
+    if synthetic:
+        os.unlink(synthetic)
+
+
+if __name__ == "__main__":
+    main()
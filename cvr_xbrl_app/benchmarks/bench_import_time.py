@@ -0,0 +1,148 @@
+"""
+bench_import_time.py
+--------------------
+Import-time profile of app.py: the cost of its top-level imports, which
+Streamlit pays in a cold container before anything is rendered (and,
+for modules not yet in sys.modules, on reruns).
+
+Every measurement runs in a fresh interpreter with `-X importtime`:
+
+- app imports : the import statements at the top of app.py, run in
+                order; wall time is the median over --repeat runs and is
+                compared with --target-ms (the import budget for
+                time-to-first-render)
+- slowest     : top-level packages by cumulative import time
+- heavy       : which heavy libraries the app imports eagerly; the
+                others are deferred to first use (utils.lazy, or imports
+                inside functions such as arelle_loader.load_model) and
+                their cost is shown for reference
+
+streamlit is excluded by default (--streamlit includes it), so the
+number is the app's own share. Libraries that are not installed are
+reported, not counted.
+
+Usage (from cvr_xbrl_app/):
+    python -m benchmarks.bench_import_time
+    python -m benchmarks.bench_import_time --repeat 10 --top 15 --streamlit
+"""
+
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+APP_PATH = Path(__file__).resolve().parent.parent / "app.py"
+
+# Libraries whose import alone costs tens of milliseconds or more
+HEAVY = ["arelle", "google.generativeai", "bs4", "pandas", "lxml.etree", "dotenv", "requests"]
+
+# Import budget for the first render of the search page, without streamlit
+TARGET_MS = 250.0
+
+_CHILD = """
+import json, sys, time
+t0 = time.perf_counter()
+exec(compile({source!r}, "app_imports", "exec"))
+elapsed = (time.perf_counter() - t0) * 1000
+print(json.dumps({{"ms": elapsed, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def _app_imports(with_streamlit: bool) -> str:
+    """The top-level import statements of app.py, in order."""
+    tree = ast.parse(APP_PATH.read_text(encoding="utf-8"))
+    lines = []
+    for node in tree.body:
+        if not isinstance(node, (ast.Import, ast.ImportFrom)):
+            continue
+        modules = [a.name for a in node.names] if isinstance(node, ast.Import) else [node.module or ""]
+        if not with_streamlit and any(m.split(".")[0] == "streamlit" for m in modules):
+            continue
+        lines.append(ast.unparse(node))
+    return "\n".join(lines)
+
+
+def _run(source: str):
+    """(result dict, -X importtime lines) of one fresh interpreter."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD.format(source=source, heavy=HEAVY)],
+        capture_output=True, text=True, cwd=APP_PATH.parent,
+        env={**os.environ, "PYTHONPATH": str(APP_PATH.parent)},
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    timings = [l for l in proc.stderr.splitlines() if l.startswith("import time:")]
+    return json.loads(proc.stdout.strip().splitlines()[-1]), timings
+
+
+def _top_level(timings: list, n: int, skip: set = frozenset()) -> list:
+    """(cumulative ms, package) of top-level imports, slowest first."""
+    rows = []
+    for line in timings[1:]:  # first line is the header
+        # "import time:       713 |     149086 | requests" (nested names are indented)
+        _, cumulative_us, name = line.split("|")
+        name = name[1:]
+        if name.startswith(" ") or name in skip:
+            continue  # imported by another module (counted in its parent) or at startup
+        rows.append((int(cumulative_us) / 1000, name))
+    return sorted(rows, reverse=True)[:n]
+
+
+def _standalone_ms(module: str):
+    """Cumulative import time of `module` on its own, or None if not installed."""
+    try:
+        result, timings = _run(f"import {module}")
+    except RuntimeError:
+        return None
+    return result["ms"]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--top", type=int, default=10)
+    ap.add_argument("--streamlit", action="store_true", help="include streamlit's own imports")
+    ap.add_argument("--target-ms", type=float, default=TARGET_MS)
+    args = ap.parse_args()
+
+    source = _app_imports(args.streamlit)
+    try:
+        runs = [_run(source) for _ in range(args.repeat)]
+    except RuntimeError as e:
+        print(f"app imports failed: {e}")
+        print("(run from cvr_xbrl_app/ with the app's requirements installed; "
+              "without streamlit, leave out --streamlit)")
+        sys.exit(1)
+
+    times = [r["ms"] for r, _ in runs]
+    median = statistics.median(times)
+    loaded = runs[0][0]["loaded"]
+
+    print(f"app imports ({'with' if args.streamlit else 'without'} streamlit), {args.repeat} fresh interpreters")
+    print(f"  median {median:.0f} ms (min {min(times):.0f}, max {max(times):.0f}), "
+          f"target {args.target_ms:.0f} ms: {'OK' if median <= args.target_ms else 'OVER'}")
+
+    # Interpreter startup and the measuring code itself
+    startup = {name for _, name in _top_level(_run("")[1], 10 ** 6)}
+    print("\nslowest top-level imports (cumulative):")
+    for ms, name in _top_level(runs[0][1], args.top, startup):
+        print(f"  {ms:>8.1f} ms  {name}")
+
+    print("\nheavy libraries:")
+    for module in HEAVY:
+        ms = _standalone_ms(module)
+        if ms is None:
+            state = "not installed"
+        elif module in loaded:
+            state = f"imported at startup ({ms:.0f} ms standalone)"
+        else:
+            state = f"deferred to first use ({ms:.0f} ms)"
+        print(f"  {module:<20} {state}")
+
+
+if __name__ == "__main__":
+    main()
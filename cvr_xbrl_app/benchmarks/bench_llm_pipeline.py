@@ -0,0 +1,94 @@
+"""
+bench_llm_pipeline.py
+---------------------
+Offline benchmark of the LLM pipeline against the local stand-in server
+(benchmarks/llm_standin_server.py):
+
+- chunk extraction (llm_extract_ledelsesberetning) at several concurrency
+  levels, with a cold and a warm LLM cache
+- time to first part and total time of stream_ai_model()
+- retries, 429s and the final concurrency limit of the scheduler
+
+Everything runs in-process with a fresh cache file, so results only
+depend on the stand-in settings and --seed.
+
+Usage (from cvr_xbrl_app/):
+    python -m benchmarks.bench_llm_pipeline
+    python -m benchmarks.bench_llm_pipeline --chunks 40 --latency 0.5 --rpm 120
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+
+def _raw_text(n_chunks: int, seed: int) -> str:
+    # About n_chunks chunks at the default budget; no headings, so every chunk goes to the LLM
+    r = random.Random(seed)
+    words = "selskabet omsætning resultat udvikling kunder markedet året aktiviteter".split()
+    paras = [" ".join(r.choice(words) for _ in range(70)) for _ in range(n_chunks * 18)]
+    return "\n\n".join(paras)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--chunks", type=int, default=24)
+    ap.add_argument("--concurrency", type=int, nargs="*", default=[1, 4, 8])
+    ap.add_argument("--latency", type=float, default=0.3, help="median stand-in latency (s)")
+    ap.add_argument("--rpm", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    # Fresh cache for this run (read by nlp.llm_cache at import)
+    os.environ["LLM_CACHE_PATH"] = tempfile.mktemp(suffix=".sqlite3")
+
+    from benchmarks.llm_standin_server import start_server
+    from nlp.llm_backend import HTTPBackend, set_backend
+    from nlp.llm_cache import get_cache, get_cache_stats
+    from nlp.llm_scheduler import LLMScheduler, get_scheduler_stats, set_scheduler
+    from nlp.llm_summary import run_ai_model, stream_ai_model
+    from xhtml_processing.xhtml_llm_extraction import llm_extract_ledelsesberetning
+
+    server, url = start_server(
+        latency_median=args.latency, rpm=args.rpm, error_rate=args.error_rate, seed=args.seed
+    )
+    set_backend(HTTPBackend(url))
+    # The scheduler gets the stand-in's request budget (0 = unlimited)
+    set_scheduler(LLMScheduler(rpm=args.rpm, tpm=0, max_in_flight=max(args.concurrency)))
+    raw = _raw_text(args.chunks, args.seed)
+
+    print(f"{'concurrency':>11} {'cache':>6} {'sec':>7} {'calls':>6} {'hit rate':>9}")
+    for c in args.concurrency:
+        get_cache().clear()
+        for label in ("cold", "warm"):
+            stats = {}
+            before = get_cache_stats()
+            t0 = time.perf_counter()
+            llm_extract_ledelsesberetning(
+                raw, run_ai_model, min_confidence=None, min_relevance=None,
+                stop_at_end=False, stats=stats, max_concurrency=c,
+            )
+            seconds = time.perf_counter() - t0
+            after = get_cache_stats()
+            lookups = (after["hits"] + after["misses"]) - (before["hits"] + before["misses"])
+            hit_rate = (after["hits"] - before["hits"]) / lookups if lookups else 0.0
+            print(f"{c:>11} {label:>6} {seconds:>7.2f} {stats['llm_calls']:>6} {hit_rate:>9.0%}")
+
+    t0 = time.perf_counter()
+    first = None
+    for _ in stream_ai_model("Opsummer ledelsesberetningen.", use_cache=False):
+        if first is None:
+            first = time.perf_counter() - t0
+    total = time.perf_counter() - t0
+    print(f"\nstream_ai_model: first part after {first or 0:.2f}s, complete after {total:.2f}s")
+    print(f"scheduler: {get_scheduler_stats()}")
+
+    server.shutdown()
+    os.unlink(os.environ["LLM_CACHE_PATH"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+bench_prompt_tokens.py
+----------------------
+Estimated prompt tokens per company (utils.tokens) for the summary
+prompts, before and after compact, prefix-first prompt construction:
+
+- xbrl:     build_summary_prompt() — indented JSON before; compact JSON
+            with [CY, PY] pairs after
+- ledelse:  three-theme Ledelsesberetning prompt — indented template before
+- samlet:   build_final_summary_prompt() — task after the data before,
+            instructions first after
+
+'prefix' is the static part of the new prompt, identical for every
+company and therefore reusable by backends with prefix caching. The
+token estimate ignores whitespace, so savings from dropped indentation
+only show in the character counts.
+Companies are synthetic (seeded), shaped like the output of
+extract_xbrl_data() / extract_financials().
+
+Usage (from cvr_xbrl_app/):
+    python -m benchmarks.bench_prompt_tokens
+    python -m benchmarks.bench_prompt_tokens --companies 10 --sections
+"""
+
+import argparse
+import json
+import random
+import textwrap
+
+from nlp.final_summary_prompt import TASK_COMBINED, build_final_summary_prompt
+from nlp.summary_prompt import SUMMARY_INSTRUCTIONS, build_summary_prompt
+from utils.tokens import estimate_tokens
+from xbrl_processing.json_transformer import transform_xbrl_to_json
+from xhtml_processing.xhtml_llm_summary import (
+    SUMMARY_INSTRUCTIONS as LB_INSTRUCTIONS,
+    build_ledelsesberetning_summary_prompt,
+)
+
+WORDS = (
+    "selskabet omsætning resultat udvikling forventninger risici året "
+    "aktiviteter strategi markedet kunder investeringer medarbejdere"
+).split()
+
+BANNER = "=" * 44
+
+
+def _company(r: random.Random, i: int):
+    scale = 10 ** r.randint(5, 9)
+    cy = {k: round(r.uniform(0.2, 1.0) * scale, 2 if r.random() < 0.3 else 0) for k in
+          ("rev", "gp", "op", "nr", "assets", "eq", "liab")}
+    py = {k: v * r.uniform(0.8, 1.2) for k, v in cy.items()}
+    pct = lambda a, b: a / b * 100 if b else None
+
+    general = {
+        "Revisionstype": r.choice(["Revision", "Udvidet gennemgang", "Review"]),
+        "Revisortype": "Statsautoriseret revisor",
+        "Going concern usikkerhed": None,
+        "Væsentlig aktivitet": "Selskabets aktivitet er " + " ".join(r.choice(WORDS) for _ in range(12)),
+        "Korrektion af væsentlig fejl": None,
+        "Anvendt regnskabsklasse": r.choice(["B", "C (mellemstor)", "C (stor)"]),
+        "Tilvalg af højere regnskabsklasse": None,
+    }
+    financial = {
+        "Valuta": "DKK",
+        "Years": {
+            "CY": {"start": "2024-01-01", "end": "2024-12-31"},
+            "PY": {"start": "2023-01-01", "end": "2023-12-31"},
+        },
+        "Indtjening": {
+            "Nettoomsætning": {"CY": cy["rev"], "PY": py["rev"]},
+            "Bruttofortjeneste": {"CY": cy["gp"], "PY": py["gp"]},
+            "Driftsresultat": {"CY": cy["op"], "PY": py["op"]},
+            "Årets resultat": {"CY": cy["nr"], "PY": py["nr"]},
+        },
+        "Balance": {
+            "Aktiver": {"CY": cy["assets"], "PY": py["assets"]},
+            "Egenkapital": {"CY": cy["eq"], "PY": py["eq"]},
+            "Gæld": {"CY": cy["liab"], "PY": py["liab"]},
+        },
+        "Nøgletal": {
+            "Overskudsgrad": {"CY": pct(cy["op"], cy["rev"]), "PY": pct(py["op"], py["rev"])},
+            "Soliditetsgrad": {"CY": pct(cy["eq"], cy["assets"]), "PY": pct(py["eq"], py["assets"])},
+            "Gældsgrad": {"CY": pct(cy["liab"], cy["eq"]), "PY": pct(py["liab"], py["eq"])},
+        },
+    }
+    paras = [" ".join(r.choice(WORDS) for _ in range(r.randint(40, 90))) for _ in range(r.randint(4, 14))]
+    return f"selskab-{i + 1}", general, financial, "\n\n".join(paras)
+
+
+# ---- Prompts as they were built before (for comparison) ----
+def _before_xbrl(payload: dict) -> str:
+    return "\n" + SUMMARY_INSTRUCTIONS.strip() + "\n```json\n" + json.dumps(
+        payload, ensure_ascii=False, indent=2
+    ) + "\n\n"
+
+
+def _before_ledelse(text: str) -> str:
+    return textwrap.indent(LB_INSTRUCTIONS.strip() + "\n\nTEKST:", "    ") + "\n    " + text + "\n    "
+
+
+def _before_samlet(prompt) -> str:
+    # Same content; banners around every part and the task after the data
+    parts = [f"{BANNER}\n{t}\n{BANNER}" for name, t in prompt.sections if name != "instruktioner"]
+    role = prompt.sections[0][1].split("OPGAVE")[0]
+    return role + "\n\n" + "\n\n".join(parts) + f"\n\n{BANNER}\nOPGAVE\n{BANNER}\n{TASK_COMBINED}\nStart nu.\n"
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--companies", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--sections", action="store_true", help="print tokens per section")
+    args = ap.parse_args()
+
+    r = random.Random(args.seed)
+    totals = {"before": 0, "after": 0, "chars_before": 0, "chars_after": 0}
+
+    print(
+        f"{'company':<12} {'prompt':<8} {'before':>7} {'after':>7} {'saved':>6} "
+        f"{'prefix':>7} {'chars':>13}"
+    )
+    for i in range(args.companies):
+        name, general, financial, text = _company(r, i)
+
+        new_xbrl = build_summary_prompt(transform_xbrl_to_json(general, financial))
+        new_ledelse = build_ledelsesberetning_summary_prompt(text)
+        new_samlet = build_final_summary_prompt(general, financial, text)
+
+        rows = [
+            ("xbrl", _before_xbrl(transform_xbrl_to_json(general, financial)), new_xbrl),
+            ("ledelse", _before_ledelse(text), new_ledelse),
+            ("samlet", _before_samlet(new_samlet), new_samlet),
+        ]
+        for label, before, after in rows:
+            b, a = estimate_tokens(before), estimate_tokens(after)
+            totals["before"] += b
+            totals["after"] += a
+            totals["chars_before"] += len(before)
+            totals["chars_after"] += len(after)
+            print(
+                f"{name:<12} {label:<8} {b:>7} {a:>7} {(b - a) / b:>6.0%} "
+                f"{estimate_tokens(after.prefix):>7} {len(before):>6}>{len(after):<6}"
+            )
+            if args.sections:
+                print(f"{'':<12} {after.token_counts()}")
+
+    b, a = totals["before"], totals["after"]
+    cb, ca = totals["chars_before"], totals["chars_after"]
+    print(f"\nall prompts: {b} -> {a} estimated tokens ({(b - a) / b:.0%} fewer), "
+          f"{cb} -> {ca} characters ({(cb - ca) / cb:.0%} fewer)")
+
+
+if __name__ == "__main__":
+    main()
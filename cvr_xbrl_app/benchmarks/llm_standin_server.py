@@ -0,0 +1,209 @@
+"""
+llm_standin_server.py
+---------------------
+Local HTTP stand-in for the LLM, for load tests without network access.
+Speaks the protocol of nlp.llm_backend.HTTPBackend:
+
+    POST /generate  {"model", "prompt", "settings"} -> {"text": "..."}
+    POST /stream    same body -> newline-delimited {"text": "..."} parts
+    GET  /health    -> {"ok": true, "requests": n, "rate_limited": n}
+
+Behaviour is deterministic for a given --seed:
+- Latency per request is drawn from a log-normal distribution
+  (--latency-median, --latency-sigma), seeded by the prompt
+- Streaming sends the first part after --ttft seconds, then the rest at
+  --tokens-per-s
+- Rate limits: a token bucket of --rpm requests per minute (burst
+  --burst) plus a random share of 429s (--error-rate), with Retry-After
+- Answers are pseudo-text derived from the prompt hash, so identical
+  prompts give identical answers
+
+Usage (from cvr_xbrl_app/):
+    python -m benchmarks.llm_standin_server --port 8765 --rpm 60
+    LLM_BACKEND=http LLM_BACKEND_URL=http://127.0.0.1:8765 streamlit run app.py
+
+    # or in-process:
+    server, url = start_server(latency_median=0.2)
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.resilience import TokenBucket
+
+WORDS = (
+    "selskabet har i året realiseret en omsætning og et resultat som ledelsen "
+    "anser for tilfredsstillende udviklingen forventes at fortsætte med fokus "
+    "på strategi kunder markedet og investeringer risici usikkerhed"
+).split()
+
+WORDS_PER_PART = 4
+
+
+class StandinConfig:
+    def __init__(
+        self,
+        latency_median: float = 1.0,
+        latency_sigma: float = 0.4,
+        ttft: float = 0.3,
+        tokens_per_s: float = 80.0,
+        rpm: float = 0.0,
+        burst: float = 5.0,
+        error_rate: float = 0.0,
+        answer_words: int = 120,
+        seed: int = 1,
+    ):
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.ttft = ttft
+        self.tokens_per_s = tokens_per_s
+        self.answer_words = answer_words
+        self.seed = seed
+        self.error_rate = error_rate
+        self.bucket = TokenBucket(rpm / 60.0, burst) if rpm else None
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.rate_limited = 0
+
+    def prompt_rng(self, prompt: str) -> random.Random:
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+        return random.Random(self.seed ^ int.from_bytes(digest[:8], "big"))
+
+    def admit(self) -> bool:
+        """False if this request should get a 429."""
+        with self.lock:
+            self.requests += 1
+            limited = self.rng.random() < self.error_rate
+        if not limited and self.bucket is not None:
+            limited = not self.bucket.acquire(timeout=0)
+        if limited:
+            with self.lock:
+                self.rate_limited += 1
+        return not limited
+
+
+def _answer_words(cfg: StandinConfig, rng: random.Random) -> list:
+    return [rng.choice(WORDS) for _ in range(cfg.answer_words)]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    cfg: StandinConfig = None
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _json(self, status: int, payload: dict, headers: dict = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != "/health":
+            self._json(404, {"error": "not found"})
+            return
+        self._json(200, {"ok": True, "requests": self.cfg.requests, "rate_limited": self.cfg.rate_limited})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            prompt = json.loads(self.rfile.read(length) or b"{}").get("prompt", "")
+        except ValueError:
+            self._json(400, {"error": "invalid JSON"})
+            return
+
+        if self.path not in ("/generate", "/stream"):
+            self._json(404, {"error": "not found"})
+            return
+
+        cfg = self.cfg
+        if not cfg.admit():
+            self._json(429, {"error": "rate limited"}, {"Retry-After": "1"})
+            return
+
+        rng = cfg.prompt_rng(prompt)
+        latency = cfg.latency_median * math.exp(cfg.latency_sigma * rng.gauss(0, 1))
+        words = _answer_words(cfg, rng)
+
+        if self.path == "/generate":
+            time.sleep(latency)
+            self._json(200, {"text": " ".join(words)})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        time.sleep(cfg.ttft)
+        for i in range(0, len(words), WORDS_PER_PART):
+            part = " ".join(words[i:i + WORDS_PER_PART]) + " "
+            line = (json.dumps({"text": part}) + "\n").encode("utf-8")
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+            self.wfile.flush()
+            time.sleep(WORDS_PER_PART / cfg.tokens_per_s)
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def start_server(host: str = "127.0.0.1", port: int = 0, **config):
+    """
+    Start the stand-in on a background thread. Returns (server, url);
+    call server.shutdown() when done. port=0 picks a free port.
+    """
+    handler = type("Handler", (_Handler,), {"cfg": StandinConfig(**config)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency-median", type=float, default=1.0)
+    ap.add_argument("--latency-sigma", type=float, default=0.4)
+    ap.add_argument("--ttft", type=float, default=0.3)
+    ap.add_argument("--tokens-per-s", type=float, default=80.0)
+    ap.add_argument("--rpm", type=float, default=0.0, help="0 = no rate limit")
+    ap.add_argument("--burst", type=float, default=5.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--answer-words", type=int, default=120)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    server, url = start_server(
+        args.host,
+        args.port,
+        latency_median=args.latency_median,
+        latency_sigma=args.latency_sigma,
+        ttft=args.ttft,
+        tokens_per_s=args.tokens_per_s,
+        rpm=args.rpm,
+        burst=args.burst,
+        error_rate=args.error_rate,
+        answer_words=args.answer_words,
+        seed=args.seed,
+    )
+    print(f"LLM stand-in listening on {url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+relevance_report.py
+-------------------
+Recall versus LLM call count of the chunk relevance scorer
+(xhtml_processing.chunk_scorer) on a labelled fixture set.
+
+Fixture format (JSON lines, one report per line):
+
+    {"doc_id": "...", "chunks": [{"text": "...", "relevant": true}, ...]}
+
+Chunks are in document order; "relevant" marks chunks that contain
+Ledelsesberetning text. For each threshold the report prints:
+
+- calls  : chunks that would be sent to the LLM (and share of all chunks)
+- recall : relevant chunks that would be sent
+- missed : reports with at least one relevant chunk skipped
+
+It also runs the heading locator (xhtml_processing.ledelsesberetning_locator)
+on each joined report: "ok" if the span it returns contains every
+relevant chunk and none of the others, "partial" if it misses some
+relevant text, "WRONG" if it contains text from other chunks. Spans at
+or above LOCATOR_MIN_CONFIDENCE are served without an LLM call. Labels
+are per chunk, so with full-size chunks (the fuld_laengde_* reports,
+chunked like production at CHUNK_MAX_TOKENS) a relevant chunk also holds
+text around the section and a correct span shows as "partial".
+
+Usage (from cvr_xbrl_app/):
+    python -m benchmarks.relevance_report
+    python -m benchmarks.relevance_report --fixture my_labels.jsonl --thresholds 0.2 0.3 0.5
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+from xhtml_processing.chunk_scorer import RELEVANCE_THRESHOLD, score_chunks
+from xhtml_processing.ledelsesberetning_locator import locate_ledelsesberetning
+from xhtml_processing.xhtml_llm_extraction import LOCATOR_MIN_CONFIDENCE
+
+DEFAULT_FIXTURE = Path(__file__).parent / "fixtures" / "relevance_chunks.jsonl"
+DEFAULT_THRESHOLDS = [0.0, 0.1, 0.2, RELEVANCE_THRESHOLD, 0.4, 0.5, 0.6, 0.7]
+
+
+def load_fixture(path: Path) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _paragraphs(chunk: dict) -> list:
+    return [p for p in chunk["text"].split("\n\n") if p.strip() and not p.startswith("### ")]
+
+
+def locator_check(doc: dict) -> tuple:
+    """(verdict, located) for the heading locator on the joined report."""
+    located = locate_ledelsesberetning("\n\n".join(c["text"] for c in doc["chunks"]))
+    inside = [p for c in doc["chunks"] if c["relevant"] for p in _paragraphs(c)]
+    outside = [p for c in doc["chunks"] if not c["relevant"] for p in _paragraphs(c)]
+    if located.confidence < LOCATOR_MIN_CONFIDENCE:
+        return "llm fallback", located
+    if any(p in located.text for p in outside):
+        return "WRONG", located
+    return ("ok" if all(p in located.text for p in inside) else "partial"), located
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--fixture", type=Path, default=DEFAULT_FIXTURE)
+    ap.add_argument("--thresholds", type=float, nargs="*", default=DEFAULT_THRESHOLDS)
+    ap.add_argument("--verbose", action="store_true", help="print every chunk score")
+    args = ap.parse_args()
+
+    docs = load_fixture(args.fixture)
+
+    # (score, relevant, doc_id) for every chunk
+    scored = []
+    for doc in docs:
+        chunks = doc["chunks"]
+        for chunk, s in zip(chunks, score_chunks([c["text"] for c in chunks])):
+            scored.append((s.score, chunk["relevant"], doc["doc_id"]))
+            if args.verbose:
+                first_line = chunk["text"].splitlines()[0][:60]
+                print(f"{doc['doc_id'][:28]:<28} {s.score:>6.3f} {str(chunk['relevant']):<6} {first_line}")
+
+    total = len(scored)
+    relevant = sum(1 for _, r, _ in scored if r)
+    print(f"\n{len(docs)} reports, {total} chunks, {relevant} relevant\n")
+
+    print(f"{'threshold':>9} {'calls':>6} {'share':>6} {'recall':>7} {'precision':>9} {'missed':>7}")
+    for t in sorted(args.thresholds):
+        kept = [(r, d) for s, r, d in scored if s >= t]
+        hits = sum(1 for r, _ in kept if r)
+        missed_docs = {d for s, r, d in scored if r and s < t}
+        marker = "  <- default" if t == RELEVANCE_THRESHOLD else ""
+        print(
+            f"{t:>9.2f} {len(kept):>6} {len(kept) / total:>6.0%} "
+            f"{hits / relevant if relevant else 1.0:>7.0%} "
+            f"{hits / len(kept) if kept else 0.0:>9.0%} {len(missed_docs):>7}{marker}"
+        )
+
+    print(f"\nheading locator (used at confidence >= {LOCATOR_MIN_CONFIDENCE}):")
+    for doc in docs:
+        verdict, located = locator_check(doc)
+        print(f"{doc['doc_id'][:40]:<40} {located.confidence:>5.2f} {verdict:<12} {located.start_heading}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+synthetic_report.py
+-------------------
+Generates a synthetic ESEF-style XHTML/iXBRL annual report for benchmarks
+when no real reports are at hand.
+
+The document mimics what the extractors see in real filings: one <div>
+per page, nested div/span/td structures, iXBRL facts, headings, bold
+pseudo-headings, tables, inline base64 images, comments and a hidden
+ix:header.
+
+Usage:
+    python -m benchmarks.synthetic_report out.xhtml --pages 300
+"""
+
+import argparse
+import random
+
+WORDS = (
+    "selskabet omsætning resultat udvikling forventninger risici året "
+    "aktiviteter strategi markedet kunder investeringer DKK mio kr"
+).split()
+
+HEADINGS = [
+    "Ledelsesberetning",
+    "Hoved- og nøgletal",
+    "Udvikling i aktiviteter og økonomiske forhold",
+    "Forventninger til fremtiden",
+    "Ledelsespåtegning",
+    "Den uafhængige revisors revisionspåtegning",
+    "Anvendt regnskabspraksis",
+    "Noter",
+]
+
+
+def _sentence(r: random.Random, n: int) -> str:
+    return " ".join(r.choice(WORDS) for _ in range(n))
+
+
+def make_report(pages: int = 300, seed: int = 1, image_kb: int = 20) -> str:
+    r = random.Random(seed)
+    image = "iVBORw0KGgo" + "A" * (image_kb * 1024)
+
+    out = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<html xmlns="http://www.w3.org/1999/xhtml" xmlns:ix="http://www.xbrl.org/2013/inlineXBRL">'
+        "<head><title>Årsrapport</title><meta charset=\"utf-8\"/>"
+        "<style>.p{page-break-after:always}</style><script>var x = 1;</script></head><body>",
+        '<div style="display:none"><ix:header><ix:references>'
+        '<link:schemaRef xlink:href="entry.xsd"/></ix:references></ix:header></div>',
+    ]
+
+    for p in range(pages):
+        out.append(f'<div class="p" id="page{p}"><div class="content">')
+
+        for _ in range(r.randint(4, 10)):
+            c = r.random()
+            if c < 0.12:
+                h = r.randint(1, 4)
+                out.append(f"<h{h}>{r.randint(1, 9)} {r.choice(HEADINGS)}</h{h}>")
+            elif c < 0.3:
+                cells = "".join(f"<td>{r.randint(0, 99999)},{r.randint(0, 9)}</td>" for _ in range(4))
+                out.append(
+                    f"<table><tr>{cells}</tr><tr><td>Omsætning <span>i alt</span></td>"
+                    f'<td><ix:nonFraction name="fsa:Revenue" contextRef="c1">{r.randint(1, 9999)}'
+                    "</ix:nonFraction></td></tr></table>"
+                )
+            elif c < 0.4:
+                out.append(f'<p><span style="font-weight:700">{r.choice(HEADINGS)}</span></p>')
+            elif c < 0.45:
+                out.append(
+                    f'<div><img src="data:image/png;base64,{image}"/> tekst efter billede '
+                    "<!-- kommentar --> mere tekst</div>"
+                )
+            elif c < 0.6:
+                out.append(
+                    '<ix:nonNumeric name="mrv:DescriptionOfActivities" contextRef="c1">'
+                    f"<p>{_sentence(r, 40)}</p><p>{_sentence(r, 25)}</p></ix:nonNumeric>"
+                )
+            else:
+                out.append(f"<p>{_sentence(r, r.randint(10, 80))} <b>fed</b> &amp; {r.randint(1, 100)}</p>")
+                out.append("<div><span>A</span> løs tekst <span>B<span>C</span></span></div>")
+
+        out.append("</div></div>")
+
+    out.append("</body></html>")
+    return "\n".join(out)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("output")
+    ap.add_argument("--pages", type=int, default=300)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        f.write(make_report(args.pages, args.seed))
@@ -4,9 +4,7 @@ cvr_api.py
 Module for fetching basic company information from the public CVR API (cvrapi.dk).
 """
 
-import json
-import contextlib
-import urllib.request as request
+from utils.resilience import http_request
 
 
 # --- Helper: Determine company status from CVR API fields ---
@@ -39,40 +37,49 @@ def hent_cvr_data(cvr: int, country: str = "dk") -> dict:
         country (str): Landekode (default = 'dk').
 
     Returns:
-        dict: Dictionary med originale CVR-data + tilføjet felt 'status'.
+        dict: Dictionary med originale CVR-data + tilføjet felt 'status',
+        eller None hvis CVR-nummeret ikke findes.
+
+    Raises:
+        requests.RequestException: Netværksfejl, HTTP-fejl efter de sidste
+        forsøg, eller CircuitOpenError når cvrapi.dk er lukket ned midlertidigt.
+        Fejlene sendes videre, så de ikke forveksles med et ukendt CVR-nummer.
     """
-    try:
-        req = request.Request(
-            url=f"https://cvrapi.dk/api?search={cvr}&country={country}",
-            headers={
-                "User-Agent": (
-                    "Hjerresen Multiservice - MVP CVR lookup "
-                    "- Kontakt: danielhjerresen@hotmail.dk"
-                )
-            },
-        )
-
-        with contextlib.closing(request.urlopen(req)) as response:
-            data = json.loads(response.read())
-
-        # --- Add derived status field ---
-        data["status"] = _derive_status(data)
-
-        # --- Make sure missing fields return None instead of crashing UI ---
-        safe_fields = {
-            "name": None,
-            "address": None,
-            "zipcode": None,
-            "city": None,
-            "industrydesc": None,
-            "startdate": None,
-        }
-
-        for key in safe_fields:
-            data.setdefault(key, safe_fields[key])
-
-        return data
-
-    except Exception as e:
-        print(f"[Fejl] Kunne ikke hente CVR-data: {e}")
+    resp = http_request(
+        "GET",
+        f"https://cvrapi.dk/api?search={cvr}&country={country}",
+        headers={
+            "User-Agent": (
+                "Hjerresen Multiservice - MVP CVR lookup "
+                "- Kontakt: danielhjerresen@hotmail.dk"
+            )
+        },
+        timeout=10,
+    )
+
+    # --- cvrapi.dk answers an unknown CVR with 404 / {"error": "NOT_FOUND"} ---
+    if resp.status_code == 404:
+        return None
+    resp.raise_for_status()
+
+    data = resp.json()
+    if not isinstance(data, dict) or data.get("error"):
         return None
+
+    # --- Add derived status field ---
+    data["status"] = _derive_status(data)
+
+    # --- Make sure missing fields return None instead of crashing UI ---
+    safe_fields = {
+        "name": None,
+        "address": None,
+        "zipcode": None,
+        "city": None,
+        "industrydesc": None,
+        "startdate": None,
+    }
+
+    for key in safe_fields:
+        data.setdefault(key, safe_fields[key])
+
+    return data
@@ -1,6 +1,6 @@
 # data_fetch/regnskab_api.py
 
-import requests
+from utils.resilience import http_request
 
 def classify_filetype(mime: str, url: str) -> str:
     """
@@ -22,6 +22,13 @@ def classify_filetype(mime: str, url: str) -> str:
 
 
 def hent_regnskaber(cvr: int) -> list[dict]:
+    """
+    Henter virksomhedens offentliggjorte regnskaber fra distribution.virk.dk,
+    nyeste først. En tom liste betyder, at der ikke er nogen.
+
+    Netværksfejl, HTTP-fejl og CircuitOpenError (requests.RequestException)
+    sendes videre, så de ikke forveksles med "ingen regnskaber".
+    """
     base_url = "http://distribution.virk.dk/offentliggoerelser/_search"
     query = {
         "query": {
@@ -41,38 +48,33 @@ def hent_regnskaber(cvr: int) -> list[dict]:
         "size": 40
     }
 
-    try:
-        resp = requests.post(base_url, json=query, timeout=10)
-        resp.raise_for_status()
-
-        data = resp.json()
-        hits = data.get("hits", {}).get("hits", [])
-
-        if not hits:
-            return []
+    resp = http_request("POST", base_url, json=query, timeout=10)
+    resp.raise_for_status()
 
-        regnskaber = []
-        for hit in hits:
-            src = hit.get("_source", {})
-            periode = src.get("regnskab", {}).get("regnskabsperiode", {})
-            offentliggjort = src.get("offentliggoerelsesTidspunkt", "")
-            dokumenter = src.get("dokumenter", [])
+    data = resp.json()
+    hits = data.get("hits", {}).get("hits", [])
 
-            for d in dokumenter:
-                mime = d.get("dokumentMimeType", "")
-                url = d.get("dokumentUrl", "")
-                filetype = classify_filetype(mime, url)
-
-                regnskaber.append({
-                    "Startdato": periode.get("startDato"),
-                    "Slutdato": periode.get("slutDato"),
-                    "Offentliggjort": offentliggjort,
-                    "Filtype": filetype,
-                    "Url": url,
-                })
-
-        return regnskaber
-
-    except requests.RequestException as e:
-        print(f"[Fejl] Kunne ikke hente regnskaber: {e}")
+    if not hits:
         return []
+
+    regnskaber = []
+    for hit in hits:
+        src = hit.get("_source", {})
+        periode = src.get("regnskab", {}).get("regnskabsperiode", {})
+        offentliggjort = src.get("offentliggoerelsesTidspunkt", "")
+        dokumenter = src.get("dokumenter", [])
+
+        for d in dokumenter:
+            mime = d.get("dokumentMimeType", "")
+            url = d.get("dokumentUrl", "")
+            filetype = classify_filetype(mime, url)
+
+            regnskaber.append({
+                "Startdato": periode.get("startDato"),
+                "Slutdato": periode.get("slutDato"),
+                "Offentliggjort": offentliggjort,
+                "Filtype": filetype,
+                "Url": url,
+            })
+
+    return regnskaber
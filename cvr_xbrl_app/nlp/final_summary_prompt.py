@@ -8,14 +8,68 @@ Creates one unified LLM prompt combining:
 - Ledelsesberetning (raw text)
 
 No formatting or logic is stored in app.py.
+
+With structured=True the model answers in two marked sections (one per
+UI panel), which split_combined_summary() separates again, so the XBRL
+summary and the Ledelsesberetning summary come from a single call.
+
+The instructions and the task come first and are the same for every
+company (one prefix per variant); the data parts follow.
 """
 
+import re
+
 from utils.formatting import dk_number, dk_percent
+from utils.prompts import Prompt
+
+# Section markers of the structured answer, in answer order
+SECTION_MARKERS = {
+    "xbrl": "<<REGNSKABSDATA>>",
+    "ledelsesberetning": "<<LEDELSESBERETNING>>",
+}
+
+ROLE = """
+Du er en professionel økonom, der skriver en samlet dansk regnskabsmæssig sammenfatning.
+
+BRUG KUN DATA, der står nedenfor — ingen gæt, ingen antagelser.
+"""
+
+TASK_COMBINED = """
+Skriv en struktureret, klar og neutral sammenfatning, opdelt i disse afsnit:
+
+1) Virksomhedens aktivitet, regnskabsklasse, revisorforhold og bemærkninger  
+2) Udviklingen i de centrale økonomiske nøgletal  
+3) De vigtigste pointer fra ledelsesberetningen  
+4) En samlet konklusion om virksomhedens økonomiske situation
+
+Ingen gæt, ingen eksterne oplysninger. Kun data nedenfor.
+"""
+
+TASK_STRUCTURED = f"""
+Svar i PRÆCIS to dele. Hver del starter med sin markør alene på en linje.
+Skriv intet før den første markør.
+
+{SECTION_MARKERS["xbrl"]}
+To afsnit i prosa (ingen overskrifter, ingen punktopstillinger):
+- Virksomhedens aktivitet, regnskabsklasse, erklærings- og revisorforhold og bemærkninger
+- Udviklingen i de centrale økonomiske nøgletal (dansk tusindtalsformat, ingen decimaler)
 
-def build_final_summary_prompt(xbrl_general, xbrl_financial, ledelsesberetning_raw):
+{SECTION_MARKERS["ledelsesberetning"]}
+- De **3 vigtigste temaer** fra ledelsesberetningen med en kort og præcis
+  punktopsummering af hvert tema (maks. 5 linjer pr. tema)
+- Afslut med én sætning med en samlet konklusion om virksomhedens økonomiske situation
+
+Ingen gæt, ingen eksterne oplysninger. Kun data nedenfor.
+"""
+
+
+def build_final_summary_prompt(xbrl_general, xbrl_financial, ledelsesberetning_raw, structured=False) -> Prompt:
     """
     Build the full LLM prompt used for the final combined summary.
     The prompt is intentionally deterministic, structured and neutral.
+
+    structured=True asks for the two marked sections of SECTION_MARKERS
+    instead of one four-part text.
     """
 
     # --------- GENERAL XBRL FIELDS ----------
@@ -66,45 +120,61 @@ def build_final_summary_prompt(xbrl_general, xbrl_financial, ledelsesberetning_r
     gg_py_f = dk_percent(gg_py)
 
     # ---------- PROMPT ----------
-    return f"""
-Du er en professionel økonom, der skriver en samlet dansk regnskabsmæssig sammenfatning.
-
-BRUG KUN DATA, der står herunder — ingen gæt, ingen antagelser.
-
-============================================
+    task = TASK_STRUCTURED if structured else TASK_COMBINED
+    return Prompt(
+        [("instruktioner", ROLE + "\nOPGAVE\n" + task)],
+        [
+            ("xbrl_generelt", f"""
 DATADEL 1 — XBRL: GENEREL INFORMATION
-============================================
 Aktivitet: {aktivitet}
 Regnskabsklasse: {klass}
 Erklæringstype: {erkl}
 Revisortype: {revisor}
 Bemærkninger: {bemaerkning}
-
-============================================
+"""),
+            ("xbrl_finansielt", f"""
 DATADEL 2 — XBRL: FINANSIELLE DATA
-============================================
 Indtjeningsudvikling (Årets resultat): {res_py} → {res_cy}
 Egenkapital: {eq_py} → {eq_cy}
 Soliditetsgrad: {sg_py_f} → {sg_cy_f}
 Gældsgrad: {gg_py_f} → {gg_cy_f}
+"""),
+            ("ledelsesberetning", "DATADEL 3 — LEDELSESBERETNING (råtekst)\n" + ledelsesberetning_raw),
+        ],
+    )
 
-============================================
-DATADEL 3 — LEDELSESBERETNING (råtekst)
-============================================
-{ledelsesberetning_raw}
-
-============================================
-OPGAVE
-============================================
 
-Skriv en struktureret, klar og neutral sammenfatning, opdelt i disse afsnit:
-
-1) Virksomhedens aktivitet, regnskabsklasse, revisorforhold og bemærkninger  
-2) Udviklingen i de centrale økonomiske nøgletal  
-3) De vigtigste pointer fra ledelsesberetningen  
-4) En samlet konklusion om virksomhedens økonomiske situation
-
-Ingen gæt, ingen eksterne oplysninger. Kun data ovenfor.
+def split_combined_summary(answer: str, partial: bool = False) -> dict:
+    """
+    Split a structured answer into {"xbrl": ..., "ledelsesberetning": ...}.
 
-Start nu.
-"""
\ No newline at end of file
+    Markers are matched leniently (surrounding '#', '*' or spaces). Without
+    any marker the whole answer goes to "xbrl". With partial=True (while
+    streaming) a marker that has only partly arrived is held back.
+    """
+    sections = {key: "" for key in SECTION_MARKERS}
+    text = answer or ""
+
+    if partial:
+        # Drop a trailing, incomplete '<<...' so it never flashes in a panel
+        cut = text.rfind("<<")
+        if cut >= 0 and ">>" not in text[cut:]:
+            text = text[:cut]
+
+    pattern = re.compile(
+        "|".join(re.escape(m) for m in SECTION_MARKERS.values()), re.IGNORECASE
+    )
+    by_marker = {m.lower(): key for key, m in SECTION_MARKERS.items()}
+
+    matches = list(pattern.finditer(text))
+    if not matches:
+        sections["xbrl"] = text.strip()
+        return sections
+
+    for i, m in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        body = text[m.end():end].strip().strip("#*").strip()
+        key = by_marker[m.group().lower()]
+        sections[key] = (sections[key] + "\n\n" + body).strip()
+
+    return sections
\ No newline at end of file
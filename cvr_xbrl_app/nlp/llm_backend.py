@@ -0,0 +1,248 @@
+# llm_backend.py
+"""
+Pluggable LLM backends.
+
+Every backend turns a prompt into text, either in one piece (generate) or
+as a stream of parts (stream), and raises LLMRateLimitError on rate
+limiting and LLMError on any other failure. Failures that cannot succeed
+on a retry (invalid request, bad API key, blocked by safety filters) are
+raised with retryable=False.
+
+Backends:
+- GeminiBackend : Google Gemini (google.generativeai). The SDK is imported,
+                  .env is loaded and the client configured on first use,
+                  not at import time.
+- HTTPBackend   : a plain JSON-over-HTTP endpoint, e.g. the local stand-in
+                  server in benchmarks/llm_standin_server.py
+
+Selected through configuration:
+    LLM_BACKEND=gemini                 (default)
+    LLM_BACKEND=http LLM_BACKEND_URL=http://127.0.0.1:8765
+
+Usage:
+    backend = get_backend()
+    text = backend.generate(prompt)
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from typing import Iterator, Optional
+
+import requests
+
+# The ONE model used by the project (LLM_MODEL overrides it)
+DEFAULT_MODEL = "gemini-2.5-flash"
+DEFAULT_HTTP_URL = "http://127.0.0.1:8765"
+HTTP_TIMEOUT = 120
+
+# Client errors that may succeed on a retry: request timeout, rate limit
+RETRYABLE_4XX = {408, 429}
+
+# Gemini SDK exceptions for prompts or answers blocked by safety filters
+BLOCKED_EXCEPTIONS = {"BlockedPromptException", "StopCandidateException"}
+
+
+class LLMError(Exception):
+    """An LLM call failed. retryable=False: repeating the same call will fail again."""
+
+    def __init__(self, message: str = "", retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def _retryable_status(status: int) -> bool:
+    return not 400 <= status < 500 or status in RETRYABLE_4XX
+
+
+class LLMRateLimitError(LLMError):
+    """The backend rejected the call because of rate limits (HTTP 429 / quota)."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMBackend:
+    """Interface of an LLM backend."""
+
+    name = "base"
+
+    def __init__(self, model: str = DEFAULT_MODEL):
+        self.model = model
+
+    @property
+    def model_id(self) -> str:
+        """Identifies backend + model (e.g. in cache keys)."""
+        return self.model if self.name == "gemini" else f"{self.name}:{self.model}"
+
+    def generate(self, prompt: str, settings: Optional[dict] = None) -> str:
+        raise NotImplementedError
+
+    def stream(self, prompt: str, settings: Optional[dict] = None) -> Iterator[str]:
+        # Backends without native streaming yield the full answer once
+        yield self.generate(prompt, settings)
+
+
+# ------------------------------------------------------------
+# GEMINI
+# ------------------------------------------------------------
+class GeminiBackend(LLMBackend):
+    name = "gemini"
+
+    def __init__(self, model: str = DEFAULT_MODEL):
+        super().__init__(model)
+        self._client = None
+        self._lock = threading.Lock()
+
+    def _get_client(self):
+        with self._lock:
+            if self._client is None:
+                from dotenv import load_dotenv
+                import google.generativeai as genai
+
+                load_dotenv()
+                genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+                self._client = genai.GenerativeModel(self.model)
+            return self._client
+
+    @staticmethod
+    def _translate(e: Exception) -> LLMError:
+        # google.api_core.exceptions.ResourceExhausted is Gemini's 429
+        status = getattr(e, "code", None)
+        if type(e).__name__ == "ResourceExhausted" or status == 429:
+            return LLMRateLimitError(str(e))
+        # google.api_core errors carry the HTTP status (400 InvalidArgument,
+        # 403 PermissionDenied, ...); response.text raises ValueError when
+        # the answer was blocked
+        if isinstance(status, int) and not _retryable_status(status):
+            return LLMError(str(e), retryable=False)
+        if isinstance(e, ValueError) or type(e).__name__ in BLOCKED_EXCEPTIONS:
+            return LLMError(str(e), retryable=False)
+        return LLMError(str(e))
+
+    def generate(self, prompt: str, settings: Optional[dict] = None) -> str:
+        try:
+            response = self._get_client().generate_content(
+                prompt, generation_config=settings or None
+            )
+            # Gemini returns a response object with .text
+            return response.text.strip()
+        except Exception as e:
+            raise self._translate(e) from e
+
+    def stream(self, prompt: str, settings: Optional[dict] = None) -> Iterator[str]:
+        try:
+            response = self._get_client().generate_content(
+                prompt, generation_config=settings or None, stream=True
+            )
+            for chunk in response:
+                # Chunks without text (e.g. safety metadata) raise on .text
+                try:
+                    text = chunk.text
+                except ValueError:
+                    continue
+                if text:
+                    yield text
+        except Exception as e:
+            raise self._translate(e) from e
+
+
+# ------------------------------------------------------------
+# HTTP
+# ------------------------------------------------------------
+class HTTPBackend(LLMBackend):
+    """
+    Minimal JSON protocol:
+
+        POST {url}/generate  {"model", "prompt", "settings"} -> {"text": "..."}
+        POST {url}/stream    same body -> newline-delimited {"text": "..."} parts
+
+    HTTP 429 (with optional Retry-After) raises LLMRateLimitError.
+    """
+
+    name = "http"
+
+    def __init__(self, url: str = DEFAULT_HTTP_URL, model: str = DEFAULT_MODEL, timeout: float = HTTP_TIMEOUT):
+        super().__init__(model)
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self._session = requests.Session()
+
+    def _post(self, path: str, prompt: str, settings: Optional[dict], stream: bool = False):
+        body = {"model": self.model, "prompt": prompt, "settings": settings or {}}
+        try:
+            resp = self._session.post(
+                self.url + path, json=body, timeout=self.timeout, stream=stream
+            )
+        except requests.RequestException as e:
+            raise LLMError(str(e)) from e
+
+        if resp.status_code == 429:
+            retry_after = resp.headers.get("Retry-After")
+            raise LLMRateLimitError(
+                "429 Too Many Requests", float(retry_after) if retry_after else None
+            )
+        if resp.status_code >= 400:
+            raise LLMError(
+                f"HTTP {resp.status_code}: {resp.text[:200]}",
+                retryable=_retryable_status(resp.status_code),
+            )
+        return resp
+
+    def generate(self, prompt: str, settings: Optional[dict] = None) -> str:
+        resp = self._post("/generate", prompt, settings)
+        return resp.json().get("text", "").strip()
+
+    def stream(self, prompt: str, settings: Optional[dict] = None) -> Iterator[str]:
+        with self._post("/stream", prompt, settings, stream=True) as resp:
+            try:
+                for line in resp.iter_lines(decode_unicode=True):
+                    if line:
+                        text = json.loads(line).get("text", "")
+                        if text:
+                            yield text
+            except (requests.RequestException, ValueError) as e:
+                raise LLMError(str(e)) from e
+
+
+# ------------------------------------------------------------
+# SELECTION
+# ------------------------------------------------------------
+BACKENDS = {
+    "gemini": GeminiBackend,
+    "http": HTTPBackend,
+}
+
+_backend: Optional[LLMBackend] = None
+_backend_lock = threading.Lock()
+
+
+def make_backend(name: str, model: str = DEFAULT_MODEL, url: Optional[str] = None) -> LLMBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown LLM backend '{name}' (choose from {', '.join(BACKENDS)})")
+    if name == "http":
+        return HTTPBackend(url or DEFAULT_HTTP_URL, model)
+    return BACKENDS[name](model)
+
+
+def get_backend() -> LLMBackend:
+    """The process-wide backend chosen by LLM_BACKEND / LLM_BACKEND_URL / LLM_MODEL."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            _backend = make_backend(
+                os.getenv("LLM_BACKEND", "gemini").lower(),
+                os.getenv("LLM_MODEL", DEFAULT_MODEL),
+                os.getenv("LLM_BACKEND_URL"),
+            )
+        return _backend
+
+
+def set_backend(backend: Optional[LLMBackend]) -> None:
+    """Replace the process-wide backend (benchmarks); None re-reads the configuration."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
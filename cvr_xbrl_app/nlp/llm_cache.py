@@ -0,0 +1,345 @@
+# llm_cache.py
+"""
+Persistent cache of LLM answers in a SQLite file.
+
+Key: sha256 over model name, generation settings and the normalised
+prompt (line endings, trailing whitespace and runs of blank lines do not
+change the key). Entries expire after LLM_CACHE_TTL_S and the least
+recently used ones are evicted once the cached answers exceed
+LLM_CACHE_MAX_BYTES.
+
+Only non-empty answers are stored, so failed calls are retried.
+
+Concurrent misses for the same key are coalesced (utils.singleflight):
+one caller runs the model, the others wait up to LLM_SINGLEFLIGHT_WAIT_S
+for its answer (or its error) and then fall back to their own call.
+
+Usage:
+    answer = cached_call(MODEL, settings, prompt, lambda: call_model(prompt))
+    for part in cached_stream(MODEL, settings, prompt, lambda: stream_model(prompt)):
+        ...
+    get_cache_stats()   # hits, misses, hit_rate, saved_latency_s, ...
+
+Set LLM_CACHE_DISABLED=1 to bypass the cache for the whole process.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional
+
+from utils.singleflight import SingleFlight, SingleFlightTimeout
+
+LLM_CACHE_PATH = Path(
+    os.getenv("LLM_CACHE_PATH", Path(tempfile.gettempdir()) / "cvr_xbrl_llm_cache.sqlite3")
+)
+LLM_CACHE_TTL_S = float(os.getenv("LLM_CACHE_TTL_S", 7 * 24 * 3600))
+LLM_CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", 200 * 1024 * 1024))
+LLM_CACHE_DISABLED = os.getenv("LLM_CACHE_DISABLED", "") not in ("", "0", "false")
+LLM_SINGLEFLIGHT_WAIT_S = float(os.getenv("LLM_SINGLEFLIGHT_WAIT_S", 300))
+
+# Expired entries are swept and the size recounted every this many puts
+EVICT_EVERY_PUTS = 50
+
+# Identical prompts in flight at the same time (across sessions) share one call
+_flight = SingleFlight("llm")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key        TEXT PRIMARY KEY,
+    model      TEXT NOT NULL,
+    response   TEXT NOT NULL,
+    bytes      INTEGER NOT NULL,
+    latency_s  REAL NOT NULL,
+    created    REAL NOT NULL,
+    last_used  REAL NOT NULL,
+    hits       INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS llm_cache_last_used ON llm_cache (last_used);
+"""
+
+_BLANK_RUNS = re.compile(r"\n{3,}")
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Whitespace-insensitive form of a prompt used for the cache key."""
+    text = prompt.replace("\r\n", "\n").replace("\r", "\n")
+    text = "\n".join(line.rstrip() for line in text.split("\n"))
+    return _BLANK_RUNS.sub("\n\n", text).strip()
+
+
+def cache_key(model: str, settings: Optional[dict], prompt: str) -> str:
+    head = json.dumps({"model": model, "settings": settings or {}}, sort_keys=True)
+    return hashlib.sha256((head + "\n" + normalize_prompt(prompt)).encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    SQLite-backed answer cache. Safe to share between threads (every
+    operation opens its own short-lived connection).
+    """
+
+    def __init__(
+        self,
+        path: Path = LLM_CACHE_PATH,
+        ttl_s: float = LLM_CACHE_TTL_S,
+        max_bytes: int = LLM_CACHE_MAX_BYTES,
+    ):
+        self.path = Path(path)
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._bytes: Optional[int] = None  # running estimate of SUM(bytes), None until counted
+        self._puts = 0
+        self.hits = 0
+        self.misses = 0
+        self.saved_latency_s = 0.0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # A sqlite3 connection's own context manager only commits; close it too
+        with closing(sqlite3.connect(self.path, timeout=10)) as conn:
+            with conn:
+                yield conn
+
+    # ------------------------------------------------------------
+    # LOOKUP / STORE
+    # ------------------------------------------------------------
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT response, latency_s, created FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None or now - row[2] > self.ttl_s:
+                if row is not None:
+                    conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                with self._lock:
+                    self.misses += 1
+                return None
+
+            conn.execute(
+                "UPDATE llm_cache SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key)
+            )
+
+        with self._lock:
+            self.hits += 1
+            self.saved_latency_s += row[1]
+        return row[0]
+
+    def put(self, key: str, model: str, response: str, latency_s: float) -> None:
+        now = time.time()
+        size = len(response.encode("utf-8"))
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache "
+                "(key, model, response, bytes, latency_s, created, last_used, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                (key, model, response, size, latency_s, now, now),
+            )
+
+            # A replaced row or another process' puts/deletes make the
+            # estimate drift, so it is recounted periodically and before
+            # anything is evicted because of it.
+            with self._lock:
+                self._puts += 1
+                sweep = self._bytes is None or self._puts % EVICT_EVERY_PUTS == 0
+                if self._bytes is not None:
+                    self._bytes += size
+                over = self._bytes is not None and self._bytes > self.max_bytes
+            if sweep or over:
+                self._evict(conn, now)
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM llm_cache WHERE created < ?", (now - self.ttl_s,))
+
+        total = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM llm_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            self._set_bytes(total)
+            return
+
+        # Least recently used first, until the rest fits
+        victims = []
+        for key, size in conn.execute("SELECT key, bytes FROM llm_cache ORDER BY last_used"):
+            if total <= self.max_bytes:
+                break
+            victims.append((key,))
+            total -= size
+        conn.executemany("DELETE FROM llm_cache WHERE key = ?", victims)
+        self._set_bytes(total)
+
+    def _set_bytes(self, total: int) -> None:
+        with self._lock:
+            self._bytes = total
+
+    def clear(self) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM llm_cache")
+        self._set_bytes(0)
+
+    # ------------------------------------------------------------
+    # STATS
+    # ------------------------------------------------------------
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            entries, size, total_hits = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(bytes), 0), COALESCE(SUM(hits), 0) FROM llm_cache"
+            ).fetchone()
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "saved_latency_s": round(self.saved_latency_s, 2),
+                "entries": entries,
+                "bytes": size,
+                "hits_all_time": total_hits,
+            }
+
+
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> LLMCache:
+    """The process-wide cache (created on first use)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache()
+        return _cache
+
+
+def cached_call(
+    model: str,
+    settings: Optional[dict],
+    prompt: str,
+    call: Callable[[], str],
+    bypass: bool = False,
+) -> str:
+    """
+    Return the cached answer for (model, settings, prompt), or run `call()`
+    and store its answer. With `bypass` the cache is neither read nor
+    written.
+    """
+    if bypass or LLM_CACHE_DISABLED:
+        return call()
+
+    try:
+        cache = get_cache()
+        key = cache_key(model, settings, prompt)
+        hit = cache.get(key)
+    except sqlite3.Error as e:
+        print(f"[LLM cache ERROR] {e}")
+        return call()
+
+    if hit is not None:
+        return hit
+
+    def call_and_store() -> str:
+        t0 = time.perf_counter()
+        answer = call()
+        _store(cache, key, model, answer, time.perf_counter() - t0)
+        return answer
+
+    try:
+        return _flight.do(key, call_and_store, timeout=LLM_SINGLEFLIGHT_WAIT_S)
+    except SingleFlightTimeout as e:
+        print(f"[LLM cache] {e}; calling directly")
+        return call()
+
+
+def _store(cache: LLMCache, key: str, model: str, answer: str, latency: float) -> None:
+    if answer:
+        try:
+            cache.put(key, model, answer, latency)
+        except sqlite3.Error as e:
+            print(f"[LLM cache ERROR] {e}")
+
+
+def cached_stream(
+    model: str,
+    settings: Optional[dict],
+    prompt: str,
+    stream: Callable[[], Iterable[str]],
+    bypass: bool = False,
+) -> Iterator[str]:
+    """
+    Streaming counterpart of cached_call(): a cached answer is yielded in
+    one piece; otherwise the parts of `stream()` are passed through and the
+    full answer is stored once the stream has been consumed to the end.
+    """
+    if bypass or LLM_CACHE_DISABLED:
+        yield from stream()
+        return
+
+    try:
+        cache = get_cache()
+        key = cache_key(model, settings, prompt)
+        hit = cache.get(key)
+    except sqlite3.Error as e:
+        print(f"[LLM cache ERROR] {e}")
+        yield from stream()
+        return
+
+    if hit is not None:
+        yield hit
+        return
+
+    flight, leader = _flight.join(key)
+    if not leader:
+        # Same prompt already streaming elsewhere: its answer arrives in one piece
+        try:
+            answer = _flight.wait(flight, timeout=LLM_SINGLEFLIGHT_WAIT_S)
+        except SingleFlightTimeout as e:
+            print(f"[LLM cache] {e}; streaming directly")
+            answer = None
+        if answer is None:
+            # Timed out, or the leader's stream was abandoned
+            yield from stream()
+        elif answer:
+            yield answer
+        return
+
+    t0 = time.perf_counter()
+    parts = []
+    try:
+        for part in stream():
+            parts.append(part)
+            yield part
+    except GeneratorExit:
+        _flight.finish(key, flight, None)
+        raise
+    except BaseException as e:
+        _flight.finish(key, flight, error=e)
+        raise
+    latency = time.perf_counter() - t0
+
+    answer = "".join(parts).strip()
+    _flight.finish(key, flight, answer)
+    _store(cache, key, model, answer, latency)
+
+
+def get_cache_stats() -> dict:
+    """Hit rate and saved latency of this process, plus on-disk size and coalesced calls."""
+    stats = get_cache().stats()
+    stats["coalesced"] = _flight.stats()["shared"]
+    return stats
@@ -0,0 +1,280 @@
+# llm_scheduler.py
+"""
+Scheduler in front of the LLM backend: every uncached call goes through it.
+
+- Budgets: requests per minute (LLM_RPM) and estimated tokens per minute
+  (LLM_TPM) as token buckets (utils.resilience.TokenBucket); 0 disables one
+- Concurrency: at most `limit` calls in flight, adapted AIMD style:
+  +1/limit after each call within LLM_LATENCY_TARGET_S (about +1 per
+  round of calls), x0.9 after a slower call, x0.5 after a 429. Decreases
+  are applied at most once per DECREASE_COOLDOWN_S, so one burst of 429s
+  counts once. A Retry-After pauses all new calls for that long.
+- Retries: rate limits and other LLMErrors are retried up to
+  LLM_MAX_RETRIES times with jittered exponential backoff (or the
+  Retry-After); after that the last error is raised. Errors marked
+  retryable=False (invalid request, bad key, safety block) are raised
+  at once
+- Priority: INTERACTIVE calls (answers the user is watching) are admitted
+  before queued BATCH calls (chunk extraction, map step). Admission takes
+  a slot and the budget together, in priority order, so batch calls never
+  hold a slot while they wait for budget
+
+Streams only retry until their first part has arrived; a failure after
+that is raised to the consumer.
+
+Usage:
+    text = get_scheduler().call(lambda: backend.generate(prompt), prompt, priority=BATCH)
+    for part in get_scheduler().stream(lambda: backend.stream(prompt), prompt):
+        ...
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import os
+import threading
+import time
+from typing import Callable, Iterable, Iterator, Optional
+
+from nlp.llm_backend import LLMError, LLMRateLimitError
+from utils.resilience import TokenBucket, backoff_delay
+from utils.tokens import estimate_tokens
+
+LLM_RPM = float(os.getenv("LLM_RPM", 60))
+LLM_TPM = float(os.getenv("LLM_TPM", 1_000_000))
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", 8))
+LLM_LATENCY_TARGET_S = float(os.getenv("LLM_LATENCY_TARGET_S", 30))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 4))
+
+INTERACTIVE = 0
+BATCH = 1
+
+# Buckets hold this many seconds of budget (the allowed burst)
+BURST_SECONDS = 10
+
+# Answer tokens counted against LLM_TPM on top of the prompt estimate
+OUTPUT_TOKENS_ESTIMATE = 500
+
+INITIAL_LIMIT = 4
+RATE_LIMIT_DECREASE = 0.5
+LATENCY_DECREASE = 0.9
+DECREASE_COOLDOWN_S = 1.0
+
+
+def _bucket(per_minute: float) -> Optional[TokenBucket]:
+    if not per_minute:
+        return None
+    return TokenBucket(per_minute / 60.0, max(1.0, per_minute * BURST_SECONDS / 60.0))
+
+
+class LLMScheduler:
+    def __init__(
+        self,
+        rpm: float = LLM_RPM,
+        tpm: float = LLM_TPM,
+        max_in_flight: int = LLM_MAX_IN_FLIGHT,
+        min_in_flight: int = 1,
+        latency_target_s: Optional[float] = LLM_LATENCY_TARGET_S,
+        max_retries: int = LLM_MAX_RETRIES,
+    ):
+        self.max_in_flight = max(1, max_in_flight)
+        self.min_in_flight = max(1, min(min_in_flight, self.max_in_flight))
+        self.latency_target_s = latency_target_s
+        self.max_retries = max_retries
+        self.limit = float(min(self.max_in_flight, max(self.min_in_flight, INITIAL_LIMIT)))
+
+        self._rpm = _bucket(rpm)
+        self._tpm = _bucket(tpm)
+
+        self._cond = threading.Condition()
+        self._queue: list = []            # heap of (priority, seq) tickets
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+
+        self.calls = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.failed = 0
+
+    # ------------------------------------------------------------
+    # ADMISSION
+    # ------------------------------------------------------------
+    def _acquire_slot(self, priority: int, tokens: int) -> None:
+        """Wait until this call is first in line, a slot is free and the budget allows it."""
+        with self._cond:
+            ticket = (priority, next(self._seq))
+            heapq.heappush(self._queue, ticket)
+            while True:
+                now = time.monotonic()
+                timeout = None
+                if now < self._paused_until:
+                    timeout = self._paused_until - now
+                elif self._queue[0] == ticket and self._in_flight < int(self.limit):
+                    # Only the head of the queue takes budget, so the buckets
+                    # are never touched by two tickets at once
+                    timeout = self._budget_wait(tokens)
+                    if timeout <= 0:
+                        self._take_budget(tokens)
+                        heapq.heappop(self._queue)
+                        self._in_flight += 1
+                        self._cond.notify_all()
+                        return
+                self._cond.wait(timeout)
+
+    def _release_slot(self) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def _budget_wait(self, tokens: int) -> float:
+        """Seconds until both buckets allow the call."""
+        waits = [0.0]
+        if self._rpm is not None:
+            waits.append(self._rpm.wait_time(1))
+        if self._tpm is not None:
+            waits.append(self._tpm.wait_time(tokens))
+        return max(waits)
+
+    def _take_budget(self, tokens: int) -> None:
+        # Called right after _budget_wait() returned 0, so this does not block
+        if self._rpm is not None:
+            self._rpm.acquire(1)
+        if self._tpm is not None:
+            self._tpm.acquire(tokens)
+
+    # ------------------------------------------------------------
+    # AIMD
+    # ------------------------------------------------------------
+    def _decrease(self, factor: float, now: float) -> None:
+        if now - self._last_decrease >= DECREASE_COOLDOWN_S:
+            self.limit = max(float(self.min_in_flight), self.limit * factor)
+            self._last_decrease = now
+
+    def _on_success(self, latency: Optional[float]) -> None:
+        with self._cond:
+            self.calls += 1
+            if latency is not None and self.latency_target_s and latency > self.latency_target_s:
+                self._decrease(LATENCY_DECREASE, time.monotonic())
+            else:
+                self.limit = min(float(self.max_in_flight), self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+    def _on_error(self, e: LLMError, attempt: int) -> float:
+        """Record a failed attempt; returns the delay before the next one."""
+        with self._cond:
+            if not isinstance(e, LLMRateLimitError):
+                return backoff_delay(attempt)
+
+            now = time.monotonic()
+            self.rate_limited += 1
+            self._decrease(RATE_LIMIT_DECREASE, now)
+            if e.retry_after:
+                self._paused_until = max(self._paused_until, now + e.retry_after)
+                self._cond.notify_all()
+                return e.retry_after
+            return backoff_delay(attempt)
+
+    def _retry_or_raise(self, e: LLMError, attempt: int, delay: float) -> None:
+        if attempt >= self.max_retries or not e.retryable:
+            with self._cond:
+                self.failed += 1
+            raise e
+        with self._cond:
+            self.retries += 1
+        print(f"[LLM RETRY {attempt + 1}/{self.max_retries}] {e} (next attempt in {delay:.1f}s)")
+        time.sleep(delay)
+
+    # ------------------------------------------------------------
+    # CALLS
+    # ------------------------------------------------------------
+    def call(self, fn: Callable[[], str], prompt: str, priority: int = BATCH) -> str:
+        """Run `fn` (one backend call for `prompt`) under the limits; raises LLMError after the last retry."""
+        tokens = estimate_tokens(prompt) + OUTPUT_TOKENS_ESTIMATE
+        attempt = 0
+        while True:
+            self._acquire_slot(priority, tokens)
+            try:
+                t0 = time.monotonic()
+                try:
+                    result = fn()
+                except LLMError as e:
+                    error, delay = e, self._on_error(e, attempt)
+                else:
+                    self._on_success(time.monotonic() - t0)
+                    return result
+            finally:
+                self._release_slot()
+
+            self._retry_or_raise(error, attempt, delay)
+            attempt += 1
+
+    def stream(
+        self, open_stream: Callable[[], Iterable[str]], prompt: str, priority: int = INTERACTIVE
+    ) -> Iterator[str]:
+        """Streaming counterpart of call(); the slot is held until the stream is consumed or closed."""
+        tokens = estimate_tokens(prompt) + OUTPUT_TOKENS_ESTIMATE
+        attempt = 0
+        while True:
+            self._acquire_slot(priority, tokens)
+            try:
+                parts = iter(open_stream())
+                try:
+                    first = next(parts)
+                except StopIteration:
+                    self._on_success(None)
+                    return
+                except LLMError as e:
+                    error, delay = e, self._on_error(e, attempt)
+                else:
+                    yield first
+                    yield from parts
+                    # Stream duration says little about load; no latency signal
+                    self._on_success(None)
+                    return
+            finally:
+                self._release_slot()
+
+            self._retry_or_raise(error, attempt, delay)
+            attempt += 1
+
+    # ------------------------------------------------------------
+    # STATS
+    # ------------------------------------------------------------
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self._in_flight,
+                "queued": len(self._queue),
+                "calls": self.calls,
+                "retries": self.retries,
+                "rate_limited": self.rate_limited,
+                "failed": self.failed,
+            }
+
+
+_scheduler: Optional[LLMScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> LLMScheduler:
+    """The process-wide scheduler (created on first use)."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LLMScheduler()
+        return _scheduler
+
+
+def set_scheduler(scheduler: Optional[LLMScheduler]) -> None:
+    """Replace the process-wide scheduler (benchmarks); None re-reads the configuration."""
+    global _scheduler
+    with _scheduler_lock:
+        _scheduler = scheduler
+
+
+def get_scheduler_stats() -> dict:
+    return get_scheduler().stats()
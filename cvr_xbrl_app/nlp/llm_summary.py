@@ -1,35 +1,58 @@
 # llm_summary.py
-import os
-from dotenv import load_dotenv
-import google.generativeai as genai
+from typing import Iterator
 
-# Load .env file
-load_dotenv()
+from nlp.llm_backend import get_backend
+from nlp.llm_cache import cached_call, cached_stream
+from nlp.llm_scheduler import BATCH, INTERACTIVE, get_scheduler
+from utils.prompts import Prompt
 
-# Read API key
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+# Generation settings (part of the cache key)
+GENERATION_CONFIG: dict = {}
 
-# Configure Gemini client
-genai.configure(api_key=GEMINI_API_KEY)
 
-# The ONE model used by the project
-MODEL = "gemini-2.5-flash"
+def _log_tokens(prompt: str) -> None:
+    # Prompts built from sections (utils.prompts) report tokens per section
+    if isinstance(prompt, Prompt):
+        print(f"LLM prompt tokens: {prompt.token_counts()}")
 
-def run_ai_model(prompt: str) -> str:
+
+def run_ai_model(prompt: str, use_cache: bool = True, priority: int = BATCH) -> str:
     """
-    Sends a prompt to Google's Gemini API using the single fixed model.
-    Used globally for:
+    Sends a prompt to the configured LLM backend (Gemini by default, see
+    nlp.llm_backend). Used globally for:
     - XBRL summary
     - XHTML extraction
     - XHTML summarization
+
+    Answers are cached on disk (nlp.llm_cache); use_cache=False forces
+    a fresh call and does not store the answer. Uncached calls log their
+    estimated tokens per section (utils.prompts) and go through
+    the scheduler (nlp.llm_scheduler), which applies rate limits and
+    retries; raises LLMError once the retries are used up.
+    """
+    backend = get_backend()
+
+    def send() -> str:
+        _log_tokens(prompt)
+        return get_scheduler().call(
+            lambda: backend.generate(prompt, GENERATION_CONFIG), prompt, priority
+        )
+
+    return cached_call(backend.model_id, GENERATION_CONFIG, prompt, send, bypass=not use_cache)
+
+
+def stream_ai_model(prompt: str, use_cache: bool = True, priority: int = INTERACTIVE) -> Iterator[str]:
+    """
+    Like run_ai_model(), but yields the answer in parts as the backend
+    produces them (for st.write_stream). A cached answer is yielded in one
+    piece. Interactive priority by default; raises LLMError while iterating.
     """
-    try:
-        model = genai.GenerativeModel(MODEL)
-        response = model.generate_content(prompt)
+    backend = get_backend()
 
-        # Gemini returns a response object with .text
-        return response.text.strip()
+    def send() -> Iterator[str]:
+        _log_tokens(prompt)
+        return get_scheduler().stream(
+            lambda: backend.stream(prompt, GENERATION_CONFIG), prompt, priority
+        )
 
-    except Exception as e:
-        print(f"[Gemini ERROR] {e}")
-        return ""
+    return cached_stream(backend.model_id, GENERATION_CONFIG, prompt, send, bypass=not use_cache)
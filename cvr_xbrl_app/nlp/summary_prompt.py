@@ -1,10 +1,15 @@
 # summary_prompt.py
-import json
+from utils.prompts import Prompt, compact_json
 
-def build_summary_prompt(xbrl_json: dict):
-    json_text = json.dumps(xbrl_json, ensure_ascii=False, indent=2)
+# Line items are sent as [CY, PY] pairs instead of {"CY": .., "PY": ..}
+VALUE_ORDER = ["CY", "PY"]
 
-    return f"""
+# Ratios are fractions (0.4383); they are sent in percent (43.83) so that
+# compact_json's 2-decimal rounding keeps the precision the summary shows
+RATIO_SECTIONS = {"ratios": "ratios_percent"}
+
+# Identical on every call, so it forms the cacheable prefix of the prompt
+SUMMARY_INSTRUCTIONS = """
 Du får her strukturerede XBRL-data fra en årsrapport i JSON-format. Du skal skrive en kort, faglig og præcis sammenfatning opdelt i to afsnit: et kvalitativt afsnit og et finansielt afsnit. Outputtet skal være i præcis samme stil og struktur som eksemplet nedenfor.
 
 ────────────────────────────────────────
@@ -53,7 +58,43 @@ Sætningerne skal følge samme stil som i eksemplet.
 
 ────────────────────────────────────────
 HER ER JSON-DATA:
-```json
-{json_text}
+"""
+
+
+def _percent(value):
+    return value * 100 if isinstance(value, (int, float)) else value
+
+
+def _compact_payload(xbrl_json: dict) -> dict:
+    """
+    transform_xbrl_to_json() output without derived fields, line items as
+    [CY, PY] and ratios in percent.
+    """
+    fin = dict(xbrl_json.get("financial_analysis", {}))
+    fin.pop("periods", None)
+    periods = {
+        key: {k: v for k, v in period.items() if k != "period_string"}
+        for key, period in xbrl_json.get("financial_analysis", {}).get("periods", {}).items()
+        if isinstance(period, dict)
+    }
+
+    compact_fin = {"currency": fin.pop("currency", None), "periods": periods, "value_order": VALUE_ORDER}
+    for section, items in fin.items():
+        if section in RATIO_SECTIONS:
+            compact_fin[RATIO_SECTIONS[section]] = {
+                label: [_percent(values.get(k)) for k in VALUE_ORDER] for label, values in items.items()
+            }
+            continue
+        compact_fin[section] = {
+            label: [values.get(k) for k in VALUE_ORDER] for label, values in items.items()
+        }
+
+    return {"general_analysis": xbrl_json.get("general_analysis", {}), "financial_analysis": compact_fin}
+
 
-"""
\ No newline at end of file
+def build_summary_prompt(xbrl_json: dict) -> Prompt:
+    """Static instructions first, then the payload as compact JSON."""
+    return Prompt(
+        [("instruktioner", SUMMARY_INSTRUCTIONS)],
+        [("json", "```json\n" + compact_json(_compact_payload(xbrl_json)) + "\n```")],
+    )
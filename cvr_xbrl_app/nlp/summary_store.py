@@ -0,0 +1,116 @@
+# summary_store.py
+"""
+Persistent store of each company's Ledelsesberetning and its summary,
+per financial period, in a SQLite file. The previous year's entry is
+the baseline for incremental summaries (xhtml_llm_summary).
+
+Usage:
+    store = get_summary_store()
+    prev = store.get_previous(cvr, "2024-12-31")   # latest entry before that period
+    store.save(cvr, "2024-12-31", text, summary)
+
+SUMMARY_STORE_PATH sets the file (default: next to the LLM cache).
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import closing, contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Optional
+
+SUMMARY_STORE_PATH = Path(
+    os.getenv("SUMMARY_STORE_PATH", Path(tempfile.gettempdir()) / "cvr_xbrl_summaries.sqlite3")
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS summaries (
+    cvr        TEXT NOT NULL,
+    period     TEXT NOT NULL,
+    text       TEXT NOT NULL,
+    summary    TEXT NOT NULL,
+    updated    REAL NOT NULL,
+    PRIMARY KEY (cvr, period)
+);
+"""
+
+
+@dataclass
+class StoredSummary:
+    cvr: str
+    period: str       # end date of the financial year (ISO), '' if unknown
+    text: str         # the Ledelsesberetning that was summarised
+    summary: str
+
+
+class SummaryStore:
+    """SQLite-backed store; every operation opens its own short-lived connection."""
+
+    def __init__(self, path: Path = SUMMARY_STORE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # Commit (or roll back) and close; the connection's own `with` only commits
+        with closing(sqlite3.connect(self.path, timeout=10)) as conn:
+            with conn:
+                yield conn
+
+    def save(self, cvr, period: Optional[str], text: str, summary: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO summaries (cvr, period, text, summary, updated) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (str(cvr), period or "", text, summary, time.time()),
+            )
+
+    def get(self, cvr, period: Optional[str]) -> Optional[StoredSummary]:
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT cvr, period, text, summary FROM summaries WHERE cvr = ? AND period = ?",
+                (str(cvr), period or ""),
+            ).fetchone()
+        return StoredSummary(*row) if row else None
+
+    def get_previous(self, cvr, period: Optional[str] = None) -> Optional[StoredSummary]:
+        """
+        The latest entry of `cvr` for a period before `period`. Without a
+        period, the most recently saved entry.
+        """
+        with self._connect() as conn:
+            if period:
+                row = conn.execute(
+                    "SELECT cvr, period, text, summary FROM summaries "
+                    "WHERE cvr = ? AND period != '' AND period < ? "
+                    "ORDER BY period DESC LIMIT 1",
+                    (str(cvr), period),
+                ).fetchone()
+            else:
+                row = conn.execute(
+                    "SELECT cvr, period, text, summary FROM summaries "
+                    "WHERE cvr = ? ORDER BY updated DESC LIMIT 1",
+                    (str(cvr),),
+                ).fetchone()
+        return StoredSummary(*row) if row else None
+
+
+_store: Optional[SummaryStore] = None
+_store_lock = threading.Lock()
+
+
+def get_summary_store() -> SummaryStore:
+    """The process-wide store (created on first use)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SummaryStore()
+        return _store
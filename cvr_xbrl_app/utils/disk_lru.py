@@ -0,0 +1,61 @@
+"""
+disk_lru.py
+-----------
+Size bound for the file caches in the temp directory (instance store,
+section cache, ...).
+
+An entry is one file or a group of files that belong together (e.g.
+<digest>.txt and <digest>.index.json); `key` maps a file to its entry.
+Entries are ordered by the newest mtime of their files, so a cache marks
+an entry as used with os.utime(). The least recently used entries are
+removed until the directory fits in `max_bytes`, but never one used in
+the last `min_age_s` seconds (a reader may be about to open it).
+
+Files whose name starts with "." are copies in progress and are skipped.
+
+Usage:
+    evict_lru(CACHE_DIR, MAX_BYTES, MIN_AGE_S, keep={digest}, key=lambda p: p.name.split(".")[0])
+"""
+
+from __future__ import annotations
+
+import time
+from pathlib import Path
+from typing import Callable, Iterable
+
+
+def evict_lru(
+    directory: Path,
+    max_bytes: int,
+    min_age_s: float,
+    keep: Iterable[str] = (),
+    key: Callable[[Path], str] = lambda p: p.name,
+) -> int:
+    """Remove least recently used entries until `directory` fits in `max_bytes`; returns bytes freed."""
+    keep = set(keep)
+    entries: dict[str, list] = {}   # key -> [newest mtime, bytes, files]
+    for p in Path(directory).iterdir():
+        if p.name.startswith("."):
+            continue
+        try:
+            st = p.stat()
+        except FileNotFoundError:
+            continue
+        entry = entries.setdefault(key(p), [0.0, 0, []])
+        entry[0] = max(entry[0], st.st_mtime)
+        entry[1] += st.st_size
+        entry[2].append(p)
+
+    total = sum(size for _, size, _ in entries.values())
+    now = time.time()
+    freed = 0
+    for k, (mtime, size, files) in sorted(entries.items(), key=lambda kv: kv[1][0]):
+        if total <= max_bytes:
+            break
+        if k in keep or now - mtime < min_age_s:
+            continue
+        for p in files:
+            p.unlink(missing_ok=True)
+        total -= size
+        freed += size
+    return freed
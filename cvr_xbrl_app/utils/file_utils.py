@@ -6,26 +6,35 @@ and simple caching if needed.
 """
 
 import tempfile
-import requests
 from pathlib import Path
 
+from utils.resilience import hedged_get
+from utils.workspace import Workspace
 
-def download_to_temp(url: str, suffix: str = "") -> str:
+
+def download_to_temp(url: str, suffix: str = "", workspace: Workspace | None = None) -> str:
     """
-    Downloads a file to a NamedTemporaryFile and returns the file path.
+    Downloads a file to a temporary file and returns the file path.
 
     Args:
         url (str): URL to download.
         suffix (str): File extension, e.g., '.xhtml', '.xml'
+        workspace (Workspace, optional): Owner of the file. If None, a
+                                         NamedTemporaryFile is created and
+                                         the caller must delete it.
 
     Returns:
         str: Path to temporary downloaded file.
     """
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-    response = requests.get(url, timeout=15)
-    tmp.write(response.content)
-    tmp.flush()
-    return tmp.name
+    response = hedged_get(url, timeout=15)
+    response.raise_for_status()
+
+    if workspace is not None:
+        return workspace.write_bytes(response.content, suffix=suffix)
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        tmp.write(response.content)
+        return tmp.name
 
 
 def save_text_to_file(text: str, filename: str) -> str:
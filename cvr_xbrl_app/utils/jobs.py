@@ -0,0 +1,172 @@
+"""
+jobs.py
+-------
+Minimal background jobs for work the UI should not wait for.
+
+A job runs a function on a daemon thread and records its status,
+progress message, result or error. Jobs live in a process-wide registry,
+so they survive Streamlit reruns; the session only keeps the job id and
+polls it:
+
+    job = start_job("ledelsesberetning", fn, path)   # fn(job, path)
+    st.session_state.job_id = job.id
+    ...
+    job = get_job(st.session_state.job_id)
+    if job and job.done:
+        use(job.result)
+
+The job function receives the Job as its first argument and may call
+job.set_progress(). It must not call Streamlit itself (it runs outside
+the script thread).
+
+start_file_job() is for jobs that read a file owned by the request (e.g.
+the instance in the request's Workspace): the file is copied into a
+job-owned Workspace first, which is closed when the job ends.
+
+With a dedupe_key, a job is only started if no job with the same key is
+still running; otherwise the running job is returned, so sessions asking
+for the same work (e.g. the same instance file) share one job.
+"""
+
+from __future__ import annotations
+
+import shutil
+import threading
+import time
+import traceback
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, Hashable, Optional
+
+from utils.workspace import Workspace
+
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Finished jobs are dropped from the registry after this many seconds
+JOB_MAX_AGE_S = 3600
+
+
+class Job:
+    def __init__(self, name: str):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.status = RUNNING
+        self.progress = ""
+        self.result = None
+        self.error: Optional[str] = None
+        self.started = time.time()
+        self.finished: Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status != RUNNING
+
+    @property
+    def elapsed_s(self) -> float:
+        return (self.finished or time.time()) - self.started
+
+    def set_progress(self, message: str) -> None:
+        self.progress = message
+
+
+_jobs: Dict[str, Job] = {}
+_running: Dict[Hashable, Job] = {}   # dedupe_key -> running job
+_jobs_lock = threading.Lock()
+
+
+def _prune(now: float) -> None:
+    for job_id, job in list(_jobs.items()):
+        if job.finished is not None and now - job.finished > JOB_MAX_AGE_S:
+            del _jobs[job_id]
+
+
+def _running_job(dedupe_key: Optional[Hashable]) -> Optional[Job]:
+    if dedupe_key is None:
+        return None
+    with _jobs_lock:
+        job = _running.get(dedupe_key)
+        return job if job is not None and not job.done else None
+
+
+def start_job(name: str, fn: Callable, *args, dedupe_key: Optional[Hashable] = None, **kwargs) -> Job:
+    """
+    Run fn(job, *args, **kwargs) on a daemon thread; returns the Job at once.
+    If a job with the same dedupe_key is still running, that job is returned
+    instead.
+    """
+    return _start(name, fn, args, kwargs, dedupe_key)[0]
+
+
+def _start(name: str, fn: Callable, args: tuple, kwargs: dict, dedupe_key: Optional[Hashable]):
+    """(job, started): started is False if a running job was reused."""
+    job = Job(name)
+
+    def run():
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.status = DONE
+        except Exception as e:
+            print(f"[JOB ERROR {name}] {e}\n{traceback.format_exc()}")
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished = time.time()
+            if dedupe_key is not None:
+                with _jobs_lock:
+                    if _running.get(dedupe_key) is job:
+                        del _running[dedupe_key]
+
+    with _jobs_lock:
+        _prune(time.time())
+        if dedupe_key is not None:
+            running = _running.get(dedupe_key)
+            if running is not None and not running.done:
+                return running, False
+            _running[dedupe_key] = job
+        _jobs[job.id] = job
+
+    threading.Thread(target=run, name=f"job-{name}", daemon=True).start()
+    return job, True
+
+
+def get_job(job_id: Optional[str]) -> Optional[Job]:
+    if not job_id:
+        return None
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def start_file_job(
+    name: str, fn: Callable, path: str, *args, dedupe_key: Optional[Hashable] = None, **kwargs
+) -> Job:
+    """
+    Copy `path` into a job-owned workspace and run fn(job, copy, *args,
+    **kwargs) in the background. The copy is made before returning
+    (and skipped if a job with the same dedupe_key is already running).
+    """
+    running = _running_job(dedupe_key)
+    if running is not None:
+        return running
+
+    workspace = Workspace(use_ram=True)
+    try:
+        copy = workspace.path(Path(path).suffix)
+        shutil.copyfile(path, copy)
+        workspace.track(copy)
+    except Exception:
+        workspace.close()
+        raise
+
+    def run(job: Job):
+        try:
+            return fn(job, copy, *args, **kwargs)
+        finally:
+            workspace.close()
+
+    job, started = _start(name, run, (), {}, dedupe_key)
+    if not started:
+        # Lost a race with another session starting the same job
+        workspace.close()
+    return job
@@ -0,0 +1,55 @@
+"""
+lazy.py
+-------
+Thin module facades that import on first attribute access.
+
+Heavy libraries (lxml, pandas, ...) cost tens to hundreds of milliseconds
+to import. Streamlit re-executes app.py on every rerun and a cold
+container imports everything before the first render, so modules that
+are only needed once a company has been looked up are bound lazily:
+
+    etree = lazy_import("lxml.etree")   # nothing imported yet
+    ...
+    etree.HTMLParser(...)               # lxml.etree imported here, once
+
+The facade is only a stand-in for attribute access at call time. Names
+needed while a module is being defined (base classes, decorators,
+annotations without `from __future__ import annotations`) must still be
+imported normally.
+"""
+
+import importlib
+import threading
+from types import ModuleType
+
+
+class LazyModule(ModuleType):
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_lock"] = threading.Lock()
+        self.__dict__["_lazy_module"] = None
+
+    def _load(self) -> ModuleType:
+        module = self.__dict__["_lazy_module"]
+        if module is None:
+            with self.__dict__["_lazy_lock"]:
+                module = self.__dict__["_lazy_module"]
+                if module is None:
+                    module = importlib.import_module(self.__name__)
+                    self.__dict__["_lazy_module"] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.__dict__["_lazy_module"] is not None else "not loaded"
+        return f"<lazy module {self.__name__!r} ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """A facade for module `name` that imports it on first attribute access."""
+    return LazyModule(name)
@@ -0,0 +1,357 @@
+"""
+resilience.py
+-------------
+Shared resilience layer for every outbound HTTP call in the app
+(cvrapi.dk, distribution.virk.dk and the document hosts behind the filings).
+
+Provides:
+- Token-bucket rate limits per host
+- Retries with jittered exponential backoff (429, 5xx and network errors)
+- A circuit breaker per host (5xx and network errors; a 429 only backs off)
+- Hedged GET requests for slow document downloads
+- Simple in-process metrics (see get_metrics())
+
+Usage:
+    resp = http_request("GET", url, timeout=10)
+    resp = hedged_get(url, timeout=15)
+"""
+
+from __future__ import annotations
+
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from urllib.parse import urlparse
+
+import requests
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+DEFAULT_TIMEOUT = 15
+HEDGE_AFTER_S = 4.0
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised when a host's circuit breaker is open and the call is short-circuited."""
+
+
+# ------------------------------------------------------------
+# BUILDING BLOCKS
+# ------------------------------------------------------------
+class TokenBucket:
+    """
+    Classic token bucket: `rate` tokens are added per second, up to `capacity`.
+    acquire() blocks until enough tokens are available (or the timeout expires).
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """Seconds until `tokens` are available (0 if they are now); takes nothing."""
+        tokens = min(tokens, self.capacity)
+        with self._lock:
+            self._refill(time.monotonic())
+            return max(0.0, (tokens - self._tokens) / self.rate)
+
+    def acquire(self, tokens: float = 1.0, timeout: float | None = None) -> bool:
+        tokens = min(tokens, self.capacity)
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return True
+                wait_s = (tokens - self._tokens) / self.rate
+
+            if deadline is not None and now + wait_s > deadline:
+                return False
+            time.sleep(wait_s)
+
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker.
+
+    - closed:    calls pass through; consecutive failures are counted
+    - open:      calls fail fast until `reset_timeout` has passed
+    - half_open: a single trial call is let through; success closes the
+                 circuit again, failure re-opens it
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = "half_open"
+                self._trial_in_flight = False
+
+            if self.state == "half_open":
+                if self._trial_in_flight:
+                    return False
+                self._trial_in_flight = True
+
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def release_trial(self) -> None:
+        """End a half-open trial without an outcome (e.g. a 429); the next call is the trial."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 8.0) -> float:
+    """Exponential backoff with full jitter: uniform(0, min(cap, base * 2**attempt))."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def _retry_after_seconds(resp: requests.Response) -> float:
+    """Parse a numeric Retry-After header (seconds). Returns 0 if absent/unparseable."""
+    try:
+        return max(0.0, float(resp.headers.get("Retry-After", 0)))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+# ------------------------------------------------------------
+# PER-HOST POLICIES
+# ------------------------------------------------------------
+@dataclass(frozen=True)
+class HostPolicy:
+    rate: float                  # requests per second (token refill rate)
+    burst: float                 # bucket capacity
+    max_retries: int = 3
+    failure_threshold: int = 5
+    reset_timeout: float = 30.0
+
+
+# cvrapi.dk is a small free service with strict limits; the virk.dk
+# search endpoint and the document hosts tolerate more traffic.
+HOST_POLICIES = {
+    "cvrapi.dk": HostPolicy(rate=1.0, burst=3),
+    "distribution.virk.dk": HostPolicy(rate=5.0, burst=10),
+}
+DEFAULT_POLICY = HostPolicy(rate=10.0, burst=20)
+
+
+class _HostState:
+    def __init__(self, policy: HostPolicy):
+        self.policy = policy
+        self.bucket = TokenBucket(policy.rate, policy.burst)
+        self.breaker = CircuitBreaker(policy.failure_threshold, policy.reset_timeout)
+        self.metrics = {
+            "requests": 0,
+            "retries": 0,
+            "failures": 0,
+            "rate_limited": 0,
+            "short_circuited": 0,
+            "hedged": 0,
+            "hedge_wins": 0,
+        }
+
+
+_hosts: dict[str, _HostState] = {}
+_hosts_lock = threading.Lock()
+_local = threading.local()
+_hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hedge")
+
+
+def _host_of(url: str) -> str:
+    return (urlparse(url).hostname or "").lower()
+
+
+def _host_state(host: str) -> _HostState:
+    with _hosts_lock:
+        state = _hosts.get(host)
+        if state is None:
+            state = _HostState(HOST_POLICIES.get(host, DEFAULT_POLICY))
+            _hosts[host] = state
+        return state
+
+
+def _count(state: _HostState, key: str) -> None:
+    with _hosts_lock:
+        state.metrics[key] += 1
+
+
+def _session() -> requests.Session:
+    """One requests.Session per thread, so connections are pooled and reused."""
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        _local.session = session
+    return session
+
+
+def get_metrics() -> dict:
+    """
+    Snapshot of the per-host counters and circuit breaker states, e.g.
+
+        {"cvrapi.dk": {"requests": 3, "retries": 1, ..., "circuit": "closed"}}
+    """
+    with _hosts_lock:
+        return {
+            host: {**state.metrics, "circuit": state.breaker.state}
+            for host, state in _hosts.items()
+        }
+
+
+# ------------------------------------------------------------
+# PUBLIC API
+# ------------------------------------------------------------
+def http_request(method: str, url: str, *, max_retries: int | None = None, **kwargs) -> requests.Response:
+    """
+    Drop-in replacement for requests.request() with rate limiting,
+    retries and circuit breaking applied for the URL's host.
+
+    Retryable responses (429/5xx) that still fail after the last attempt
+    raise requests.HTTPError. Other responses are returned unchanged, so
+    callers keep using resp.raise_for_status() as before.
+    """
+    host = _host_of(url)
+    state = _host_state(host)
+    retries = state.policy.max_retries if max_retries is None else max_retries
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+
+    for attempt in range(retries + 1):
+        if not state.breaker.allow():
+            _count(state, "short_circuited")
+            raise CircuitOpenError(f"Circuit open for {host}")
+
+        state.bucket.acquire()
+        _count(state, "requests")
+
+        try:
+            resp = _session().request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            state.breaker.record_failure()
+            _count(state, "failures")
+            if attempt >= retries:
+                raise
+            delay = backoff_delay(attempt)
+        except Exception:
+            # Not retried (ChunkedEncodingError, TooManyRedirects, ...), but the
+            # outcome must still be recorded or a half-open trial never ends
+            state.breaker.record_failure()
+            _count(state, "failures")
+            raise
+        except BaseException:
+            # KeyboardInterrupt, SystemExit: not the host's fault, but a
+            # half-open trial has to be released
+            state.breaker.release_trial()
+            raise
+        else:
+            if resp.status_code not in RETRY_STATUS_CODES:
+                state.breaker.record_success()
+                return resp
+
+            if resp.status_code == 429:
+                # The host is up but asks us to slow down: back off (Retry-After),
+                # don't open the circuit for everyone
+                state.breaker.release_trial()
+                _count(state, "rate_limited")
+            else:
+                state.breaker.record_failure()
+                _count(state, "failures")
+            if attempt >= retries:
+                resp.raise_for_status()
+            delay = max(backoff_delay(attempt), _retry_after_seconds(resp))
+            resp.close()  # with stream=True the connection is held until closed
+
+        _count(state, "retries")
+        time.sleep(delay)
+
+    raise AssertionError("unreachable")
+
+
+def _close_response(fut) -> None:
+    """Done-callback for the losing request of a hedge: drop its connection."""
+    if not fut.cancelled() and fut.exception() is None:
+        fut.result().close()
+
+
+def hedged_get(url: str, *, hedge_after: float = HEDGE_AFTER_S, **kwargs) -> requests.Response:
+    """
+    GET with request hedging on time to first byte.
+
+    Requests are sent with stream=True. If the response headers of the
+    first request have not arrived after `hedge_after` seconds, a second
+    identical request is started and whichever responds first wins; the
+    other one is closed as soon as it responds. A slow body download is
+    never duplicated. The winning body is read before returning, unless
+    the caller passed stream=True itself.
+    """
+    state = _host_state(_host_of(url))
+    stream = kwargs.pop("stream", False)
+
+    first = _hedge_pool.submit(http_request, "GET", url, stream=True, **kwargs)
+    done, _ = wait([first], timeout=hedge_after)
+    if done:
+        resp = first.result()
+    else:
+        _count(state, "hedged")
+        second = _hedge_pool.submit(http_request, "GET", url, stream=True, **kwargs)
+        resp, winner = None, None
+        pending = {first, second}
+        last_error: BaseException | None = None
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                try:
+                    resp = fut.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+                winner = fut
+                break
+
+        if winner is None:
+            raise last_error
+        if winner is second:
+            _count(state, "hedge_wins")
+        for fut in (first, second):
+            if fut is not winner:
+                fut.add_done_callback(_close_response)
+
+    if not stream:
+        try:
+            resp.content  # read the body now, like a non-streamed request
+        finally:
+            resp.close()
+    return resp
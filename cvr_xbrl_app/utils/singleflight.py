@@ -0,0 +1,114 @@
+"""
+singleflight.py
+---------------
+Request coalescing: concurrent calls with the same key share one
+execution. The first caller (the leader) runs the function; callers that
+arrive while it runs wait for its result instead of repeating the work.
+
+- Waiting is bounded: after `timeout` seconds a waiter gets
+  SingleFlightTimeout (the leader keeps running)
+- Failures propagate: if the leader raises, every waiter gets the same
+  exception
+- Nothing is cached: once the leader is done the key is free again
+  (results are cached elsewhere, e.g. st.cache_data or nlp.llm_cache)
+
+Instances are process-wide, so in Streamlit they coalesce across sessions.
+
+Usage:
+    flight = SingleFlight("instance")
+    data = flight.do(("instance", cvr, filing), resolve, timeout=120)
+
+    # Leader/waiter split, e.g. when only the leader can stream:
+    call, leader = flight.join(key)
+    if leader:
+        try:
+            result = work()
+        except Exception as e:
+            flight.finish(key, call, error=e)
+            raise
+        flight.finish(key, call, result)
+    else:
+        result = flight.wait(call, timeout=60)
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Callable, Hashable, Optional, Tuple
+
+
+class SingleFlightTimeout(TimeoutError):
+    """A waiter gave up on the leader's result."""
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    def __init__(self, name: str = ""):
+        self.name = name
+        self._calls: dict = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.shared = 0
+        self.timeouts = 0
+
+    def join(self, key: Hashable) -> Tuple[_Call, bool]:
+        """The in-flight call for `key` and whether the caller leads it."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.shared += 1
+                return call, False
+            call = _Call()
+            self._calls[key] = call
+            self.leaders += 1
+            return call, True
+
+    def finish(self, key: Hashable, call: _Call, result=None, error: Optional[BaseException] = None) -> None:
+        """Publish the leader's outcome and free the key."""
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        call.result = result
+        call.error = error
+        call.event.set()
+
+    def wait(self, call: _Call, timeout: Optional[float] = None):
+        """The leader's result (or its exception), waiting at most `timeout` seconds."""
+        if not call.event.wait(timeout):
+            with self._lock:
+                self.timeouts += 1
+            raise SingleFlightTimeout(
+                f"{self.name or 'singleflight'}: no result after {timeout:g}s"
+            )
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def do(self, key: Hashable, fn: Callable[[], object], timeout: Optional[float] = None):
+        """Run fn() once for concurrent callers with the same key."""
+        call, leader = self.join(key)
+        if not leader:
+            return self.wait(call, timeout)
+
+        try:
+            result = fn()
+        except BaseException as e:
+            self.finish(key, call, error=e)
+            raise
+        self.finish(key, call, result)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "leaders": self.leaders,
+                "shared": self.shared,
+                "timeouts": self.timeouts,
+                "in_flight": len(self._calls),
+            }
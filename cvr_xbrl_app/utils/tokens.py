@@ -0,0 +1,28 @@
+"""
+tokens.py
+---------
+Fast local estimate of LLM token counts, for budgeting prompts and chunks
+without calling a tokenizer or the API.
+
+Sub-word tokenizers split long words into pieces of roughly four
+characters and give punctuation its own token. The estimate follows that:
+every word costs one token per started four characters, every
+punctuation mark one token. It is an approximation, so budgets built
+on it should leave some headroom below the model's hard limits.
+"""
+
+import re
+
+CHARS_PER_TOKEN = 4
+
+_PIECE = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate number of LLM tokens in `text`."""
+    if not text:
+        return 0
+    return sum(
+        (len(piece) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+        for piece in _PIECE.findall(text)
+    )
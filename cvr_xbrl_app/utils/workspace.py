@@ -0,0 +1,232 @@
+"""
+workspace.py
+------------
+Per-request temporary workspace that owns every intermediate file
+(downloaded instances, cleaned XHTML, ...).
+
+- All files live in one directory per request and are deleted on close()
+  (used as a context manager this also happens when the request crashes)
+- A disk quota is enforced on every write
+- Workspaces left behind by dead processes are swept on startup
+- Small files can optionally be placed in a RAM-backed directory (/dev/shm)
+  so the parse path avoids disk I/O
+
+Usage:
+    with Workspace(use_ram=True) as ws:
+        path = ws.write_bytes(data, suffix=".xhtml")
+        ...
+    # everything under ws is gone here
+"""
+
+from __future__ import annotations
+
+import atexit
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import weakref
+from pathlib import Path
+
+WORKSPACE_PREFIX = "cvr-ws-"
+
+DISK_ROOT = Path(tempfile.gettempdir()) / "cvr_xbrl_workspaces"
+RAM_ROOT = Path("/dev/shm") / "cvr_xbrl_workspaces"
+
+DEFAULT_QUOTA_BYTES = 512 * 1024 * 1024
+RAM_MAX_FILE_BYTES = 16 * 1024 * 1024
+ORPHAN_MAX_AGE_S = 6 * 3600
+
+
+class WorkspaceQuotaExceeded(OSError):
+    """Raised when a write would push a workspace over its disk quota."""
+
+
+_open_workspaces: "weakref.WeakSet[Workspace]" = weakref.WeakSet()
+
+
+class Workspace:
+    """
+    Owns a private temp directory (and optionally a RAM-backed one).
+
+    Args:
+        quota_bytes (int): Max total bytes written through this workspace.
+        use_ram (bool): Place files up to `ram_max_file_bytes` in /dev/shm
+                        when available.
+        ram_max_file_bytes (int): Size limit for RAM-backed files.
+    """
+
+    def __init__(
+        self,
+        quota_bytes: int = DEFAULT_QUOTA_BYTES,
+        use_ram: bool = False,
+        ram_max_file_bytes: int = RAM_MAX_FILE_BYTES,
+    ):
+        self.quota_bytes = quota_bytes
+        self.ram_max_file_bytes = ram_max_file_bytes
+        self.used_bytes = 0
+        self.closed = False
+        self._lock = threading.Lock()
+
+        name = f"{WORKSPACE_PREFIX}{os.getpid()}-{uuid.uuid4().hex[:12]}"
+
+        self.disk_dir = DISK_ROOT / name
+        self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+        self.ram_dir = None
+        if use_ram and RAM_ROOT.parent.is_dir() and os.access(RAM_ROOT.parent, os.W_OK):
+            self.ram_dir = RAM_ROOT / name
+
+        _open_workspaces.add(self)
+
+    # ------------------------------------------------------------
+    # QUOTA
+    # ------------------------------------------------------------
+    def _reserve(self, nbytes: int) -> None:
+        with self._lock:
+            if self.used_bytes + nbytes > self.quota_bytes:
+                raise WorkspaceQuotaExceeded(
+                    f"Workspace quota exceeded: {self.used_bytes + nbytes} > {self.quota_bytes} bytes"
+                )
+            self.used_bytes += nbytes
+
+    def track(self, path: str) -> str:
+        """
+        Account for a file written into the workspace by someone else
+        (e.g. a downloader given a path from path()). The file is removed
+        again if it pushes the workspace over quota.
+        """
+        try:
+            self._reserve(os.path.getsize(path))
+        except WorkspaceQuotaExceeded:
+            Path(path).unlink(missing_ok=True)
+            raise
+        return path
+
+    # ------------------------------------------------------------
+    # FILES
+    # ------------------------------------------------------------
+    def path(self, suffix: str = "", size_hint: int | None = None) -> str:
+        """
+        Return a fresh, unused file path inside the workspace.
+        Files with a known size below the RAM limit go to /dev/shm.
+        """
+        if self.closed:
+            raise RuntimeError("Workspace is closed")
+
+        base = self.disk_dir
+        if self.ram_dir is not None and size_hint is not None and size_hint <= self.ram_max_file_bytes:
+            self.ram_dir.mkdir(parents=True, exist_ok=True)
+            base = self.ram_dir
+
+        return str(base / f"{uuid.uuid4().hex}{suffix}")
+
+    def write_bytes(self, data: bytes, suffix: str = "") -> str:
+        """Write `data` to a new workspace file and return its path."""
+        self._reserve(len(data))
+        path = self.path(suffix, size_hint=len(data))
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def open_write(self, suffix: str = "", size_hint: int | None = None):
+        """
+        Open a new workspace file for streaming writes. Every write() is
+        checked against the quota. Returns (path, file object).
+        """
+        path = self.path(suffix, size_hint=size_hint)
+        return path, _QuotaWriter(open(path, "wb"), self)
+
+    # ------------------------------------------------------------
+    # LIFECYCLE
+    # ------------------------------------------------------------
+    def close(self) -> None:
+        """Delete every file owned by the workspace. Safe to call twice."""
+        if self.closed:
+            return
+        self.closed = True
+        for d in (self.disk_dir, self.ram_dir):
+            if d is not None:
+                shutil.rmtree(d, ignore_errors=True)
+        _open_workspaces.discard(self)
+
+    def __enter__(self) -> "Workspace":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+class _QuotaWriter:
+    """Thin file wrapper that charges every write against a workspace quota."""
+
+    def __init__(self, f, workspace: Workspace):
+        self._f = f
+        self._ws = workspace
+
+    def write(self, data: bytes) -> int:
+        self._ws._reserve(len(data))
+        return self._f.write(data)
+
+    def close(self) -> None:
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+@atexit.register
+def _close_open_workspaces() -> None:
+    for ws in list(_open_workspaces):
+        ws.close()
+
+
+# ------------------------------------------------------------
+# ORPHAN SWEEP
+# ------------------------------------------------------------
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def sweep_orphans(max_age_s: float = ORPHAN_MAX_AGE_S) -> int:
+    """
+    Remove workspaces left behind by crashed processes: the owning PID is
+    no longer alive, or the directory is older than `max_age_s`.
+    Returns the number of directories removed.
+    """
+    removed = 0
+    now = time.time()
+
+    for root in (DISK_ROOT, RAM_ROOT):
+        if not root.is_dir():
+            continue
+
+        for d in root.iterdir():
+            if not d.name.startswith(WORKSPACE_PREFIX):
+                continue
+
+            try:
+                pid = int(d.name[len(WORKSPACE_PREFIX):].split("-", 1)[0])
+                age = now - d.stat().st_mtime
+            except (ValueError, OSError):
+                continue
+
+            if pid == os.getpid() and age < max_age_s:
+                continue
+
+            if not _pid_alive(pid) or age > max_age_s:
+                shutil.rmtree(d, ignore_errors=True)
+                removed += 1
+
+    return removed
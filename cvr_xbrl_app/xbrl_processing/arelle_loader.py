@@ -1,7 +1,6 @@
 # xbrl_processing/arelle_loader.py
 
 import os
-from arelle import Cntlr, ModelManager, FileSource
 
 # Path to your local taxonomy directory
 TAXONOMY_DIR = os.path.join(
@@ -15,6 +14,8 @@ def load_model(filepath: str):
     Universal loader for XML/XBRL/iXBRL/ESEF XHTML.
     Forces Arelle to use local taxonomies.
     """
+    # Arelle is slow to import; only the XBRL analysis job needs it
+    from arelle import Cntlr, ModelManager, FileSource
 
     abs_path = os.path.abspath(filepath)
     cntlr = Cntlr.Cntlr(logFileName="arelle-log.txt")
@@ -1,12 +1,14 @@
 # xbrl_processing/downloader.py
 import requests
 
+from utils.resilience import hedged_get
+
 def download_xbrl(url: str, save_path: str) -> str:
     """
     Download an XBRL/iXBRL file and save to disk.
     """
     try:
-        resp = requests.get(url, timeout=15)
+        resp = hedged_get(url, timeout=15)
         resp.raise_for_status()
 
         with open(save_path, "wb") as f:
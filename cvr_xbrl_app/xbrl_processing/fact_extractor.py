@@ -4,7 +4,9 @@ from __future__ import annotations
 from types import SimpleNamespace
 from typing import Iterator, Optional
 
-from lxml import etree
+from utils.lazy import lazy_import
+
+etree = lazy_import("lxml.etree")
 
 
 def _iter_facts(model_xbrl) -> Iterator:
@@ -184,15 +184,17 @@ def _select_two_years(period_dict: dict) -> Tuple[
 # MAIN PARSER
 # ---------------------------------------------------------
 
-def extract_financials(filepath: str) -> dict:
+def extract_financials(filepath: str, model=None) -> dict:
     """
     Extract two-year financial statements + KPIs.
     Handles missing revenue (ÅRL §32) by returning 'Ukendt'.
 
     RELIES EXCLUSIVELY ON DCCA PERIOD TAGS FOR FULL DATES.
+    Pass an already loaded Arelle `model` to avoid loading the file again.
     """
     try:
-        model = load_model(filepath)
+        if model is None:
+            model = load_model(filepath)
 
         # Detect currency
         currency = _get_currency_from_units(model)
@@ -2,11 +2,11 @@
 
 import tempfile
 import zipfile
-import requests
 import io
 import os
 
-from xbrl_processing.downloader import download_xbrl
+from utils.resilience import http_request, hedged_get
+from utils.workspace import Workspace
 
 
 # ------------------------------------------
@@ -38,12 +38,26 @@ def file_contains_xbrl_xml(text: str) -> bool:
     )
 
 
+# ------------------------------------------
+# Helper: store instance bytes (workspace or temp)
+# ------------------------------------------
+def _store_instance(data: bytes, suffix: str, workspace: Workspace | None) -> str:
+    if workspace is not None:
+        return workspace.write_bytes(data, suffix=suffix)
+
+    # Legacy path: the caller owns (and must delete) the returned file
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+        tmp.write(data)
+        return tmp.name
+
+
 # ------------------------------------------
 # Detect correct ESEF XHTML inside ZIP
 # ------------------------------------------
 def find_esef_xhtml_in_zip(url: str):
     try:
-        resp = requests.get(url, timeout=15)
+        resp = hedged_get(url, timeout=15)
+        resp.raise_for_status()
         z = zipfile.ZipFile(io.BytesIO(resp.content))
 
         # List XHTML/HTML files only
@@ -81,12 +95,15 @@ def find_esef_xhtml_in_zip(url: str):
 # ------------------------------------------
 # MAIN ENTRY POINT DETECTOR
 # ------------------------------------------
-def find_valid_instance(df):
+def find_valid_instance(df, workspace: Workspace | None = None):
     """
     Returns a local filepath to a valid XBRL/iXBRL instance file.
     Handles:
       - IFRS/ESEF XHTML (inside ZIP)
       - ÅRL XML
+
+    If a workspace is given, the file is owned by it and deleted when the
+    workspace closes. Otherwise a temp file is created that the caller owns.
     """
 
     # ===============================
@@ -98,10 +115,7 @@ def find_valid_instance(df):
         for _, row in zip_rows.iterrows():
             zfile, entry = find_esef_xhtml_in_zip(row["Url"])
             if entry:
-                with tempfile.NamedTemporaryFile(suffix=".xhtml", delete=False) as tmp:
-                    tmp.write(zfile.read(entry))
-                    tmp.flush()
-                    return tmp.name  # FOUND XHTML instance
+                return _store_instance(zfile.read(entry), ".xhtml", workspace)  # FOUND XHTML instance
 
 
     # ===============================
@@ -116,13 +130,12 @@ def find_valid_instance(df):
     if not xml_rows.empty:
         for _, row in xml_rows.iterrows():
             try:
-                resp = requests.get(row["Url"], timeout=10)
+                resp = http_request("GET", row["Url"], timeout=10)
                 chunk = resp.content[:200000].decode("utf-8", errors="ignore")
 
                 if file_contains_xbrl_xml(chunk):
-                    with tempfile.NamedTemporaryFile(suffix=".xml", delete=False) as tmp:
-                        download_xbrl(row["Url"], tmp.name)
-                        return tmp.name  # FOUND XML instance
+                    # Reuse the body we already downloaded instead of fetching it twice
+                    return _store_instance(resp.content, ".xml", workspace)  # FOUND XML instance
 
             except Exception:
                 pass
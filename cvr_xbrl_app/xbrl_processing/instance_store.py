@@ -0,0 +1,89 @@
+# xbrl_processing/instance_store.py
+"""
+Content-addressed store for resolved instance files.
+
+find_valid_instance() downloads a ZIP and extracts the instance into a
+request Workspace, which is deleted with the request. Instances that
+other reruns and sessions should reuse are copied here, named by their
+sha256:
+
+    <store>/<sha256><suffix>
+
+so a cache (st.cache_data) only has to keep the digest, not the file
+contents. The store is bounded by INSTANCE_STORE_MAX_BYTES; the least
+recently used files are removed first (utils.disk_lru), but never one
+used in the last INSTANCE_MIN_AGE_S seconds (a job may be about to copy it).
+
+Usage:
+    digest = store_instance(path)
+    path = get_instance(digest, ".xhtml")   # None once evicted
+"""
+
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from utils.disk_lru import evict_lru
+
+INSTANCE_STORE_DIR = Path(
+    os.getenv("INSTANCE_STORE_DIR", Path(tempfile.gettempdir()) / "cvr_xbrl_instances")
+)
+INSTANCE_STORE_MAX_BYTES = int(os.getenv("INSTANCE_STORE_MAX_BYTES", 512 * 1024 * 1024))
+INSTANCE_MIN_AGE_S = 300
+
+_CHUNK = 1024 * 1024
+
+_lock = threading.Lock()
+
+
+def _digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_CHUNK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _path(digest: str, suffix: str) -> Path:
+    return INSTANCE_STORE_DIR / f"{digest}{suffix.lower()}"
+
+
+def store_instance(path: str) -> str:
+    """Copy the instance at `path` into the store (once per content); returns its sha256."""
+    digest = _digest(path)
+    target = _path(digest, Path(path).suffix)
+    INSTANCE_STORE_DIR.mkdir(parents=True, exist_ok=True)
+
+    with _lock:
+        if target.exists():
+            os.utime(target)
+            return digest
+
+        # Copy under a temporary name, so readers never see a partial file
+        tmp = INSTANCE_STORE_DIR / f".{uuid.uuid4().hex}{target.suffix}"
+        try:
+            shutil.copyfile(path, tmp)
+            os.replace(tmp, target)
+        finally:
+            tmp.unlink(missing_ok=True)
+        evict_lru(INSTANCE_STORE_DIR, INSTANCE_STORE_MAX_BYTES, INSTANCE_MIN_AGE_S, keep={target.name})
+
+    return digest
+
+
+def get_instance(digest: str, suffix: str) -> Optional[str]:
+    """Path of a stored instance (marked as recently used), or None if it is not stored."""
+    target = _path(digest, suffix)
+    with _lock:
+        try:
+            os.utime(target)
+        except FileNotFoundError:
+            return None
+    return str(target)
@@ -184,13 +184,15 @@ def _normalize_revisortype(value: str) -> str:
     # -------------------------
     return "Andet"
 
-def extract_xbrl_data(filepath: str) -> dict:
+def extract_xbrl_data(filepath: str, model=None) -> dict:
     """
     Parse XBRL/iXBRL file with Arelle and extract general qualitative facts.
     No ML, no SBERT — pure taxonomy-based extraction.
+    Pass an already loaded Arelle `model` to avoid loading the file again.
     """
     try:
-        model = load_model(filepath)
+        if model is None:
+            model = load_model(filepath)
 
         data = {
             # Revision info
@@ -0,0 +1,51 @@
+# xbrl_processing/xbrl_analysis.py
+"""
+XBRL analysis of one instance file: Arelle loads the file once and both
+extractors (general facts, financials) work on that model.
+
+start_xbrl_analysis_job() runs it as a background job (utils.jobs) on a
+job-owned copy of the instance, so the page can render while Arelle works.
+The job result is {"general": ..., "financial": ...}; a file Arelle cannot
+load, or an extractor reporting {"Fejl": ...}, fails the job.
+"""
+
+from utils.jobs import Job, start_file_job
+from .arelle_loader import load_model
+from .financial_parser import extract_financials
+from .parser import extract_xbrl_data
+
+
+def analyze_instance(instance_path: str, progress=None) -> dict:
+    progress = progress or (lambda message: None)
+
+    progress("Indlæser XBRL/iXBRL med Arelle...")
+    try:
+        model = load_model(instance_path)
+    except Exception as e:
+        raise RuntimeError(f"Arelle kunne ikke indlæse filen: {e}") from e
+
+    progress("Analyserer XBRL-data...")
+    result = {
+        "general": extract_xbrl_data(instance_path, model=model),
+        "financial": extract_financials(instance_path, model=model),
+    }
+    # The extractors report failures as {"Fejl": ...} instead of raising
+    for part, data in result.items():
+        if "Fejl" in data:
+            raise RuntimeError(f"XBRL-analysen fejlede ({part}): {data['Fejl']}")
+    return result
+
+
+def _run(job: Job, path: str) -> dict:
+    result = analyze_instance(path, job.set_progress)
+    print(f"Background XBRL analysis done in {job.elapsed_s:.1f}s")
+    return result
+
+
+def start_xbrl_analysis_job(instance_path: str, dedupe_key=None) -> Job:
+    """
+    Analyse a copy of the instance in the background. Returns immediately.
+    Sessions passing the same dedupe_key (e.g. the instance digest) while
+    the analysis runs get the running job.
+    """
+    return start_file_job("xbrl", _run, instance_path, dedupe_key=dedupe_key)
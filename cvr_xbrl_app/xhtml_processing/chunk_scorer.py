@@ -0,0 +1,229 @@
+# chunk_scorer.py
+"""
+Cheap local relevance scoring of text chunks for the Ledelsesberetning.
+
+Before a chunk is sent to the LLM it gets a score in [0, 1] built from:
+
+- Vocabulary: weighted Danish/English management-review terms versus
+  terms from notes, accounting policies and auditor statements
+- Heading context: the section the chunk starts in (carried over from
+  the previous chunks) and any headings inside the chunk
+- Position: the management review sits in the first part of the report
+- Number density: tables of figures are rarely narrative
+
+A chunk that starts with text of the open section holds the section's
+end, so its score is never below the threshold, however little review
+text it has.
+
+Chunks below RELEVANCE_THRESHOLD are skipped. The threshold is a trade-off
+between LLM calls and recall; benchmarks/relevance_report.py measures both
+on a labelled fixture set.
+
+Usage:
+    scores = score_chunks(chunks)
+    keep = [c for c, s in zip(chunks, scores) if s.score >= RELEVANCE_THRESHOLD]
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from dataclasses import dataclass
+from typing import List, Optional
+
+from .ledelsesberetning_locator import is_end_heading, normalize_heading, start_match
+
+RELEVANCE_THRESHOLD = 0.3
+
+# Management-review vocabulary (weight per occurrence)
+POSITIVE_TERMS = {
+    "ledelsesberetning": 3.0,
+    "management review": 3.0,
+    "hovedaktivitet": 2.0,
+    "selskabets aktiviteter": 2.0,
+    "udvikling i aktiviteter": 2.0,
+    "økonomiske forhold": 1.5,
+    "forventninger": 1.5,
+    "forventet udvikling": 2.0,
+    "begivenheder efter": 1.5,
+    "væsentlige begivenheder": 1.5,
+    "usikkerhed": 1.0,
+    "risici": 1.0,
+    "tilfredsstillende": 1.0,
+    "årets resultat": 1.0,
+    "omsætning": 0.5,
+    "strategi": 0.5,
+    "medarbejdere": 0.5,
+    "bæredygtighed": 0.5,
+    "samfundsansvar": 1.0,
+    "videnressourcer": 1.0,
+    "outlook": 1.5,
+    "financial review": 2.0,
+    "principal activities": 2.0,
+    "events after": 1.5,
+}
+
+# Vocabulary of sections that can never be part of the management review
+NEGATIVE_TERMS = {
+    "anvendt regnskabspraksis": 3.0,
+    "accounting policies": 3.0,
+    "revisionspåtegning": 3.0,
+    "den uafhængige revisor": 3.0,
+    "independent auditor": 3.0,
+    "ledelsespåtegning": 2.0,
+    "statement by management": 2.0,
+    "vores konklusion": 2.0,
+    "revisors ansvar": 2.0,
+    "indregnes": 1.0,
+    "måles": 1.0,
+    "afskrives lineært": 1.5,
+    "dagsværdi": 0.5,
+    "kostpris": 0.5,
+    "note": 0.5,
+}
+
+# Subheadings that continue the management review after its start heading.
+# Outside the section they say nothing: the auditor's report has headings
+# like "Væsentlig usikkerhed vedrørende fortsat drift" too
+CONTINUATION_HEADINGS = [
+    "hoved- og nøgletal",
+    "hovedaktivitet",
+    "udvikling i aktiviteter",
+    "økonomiske forhold",
+    "væsentlige begivenheder",
+    "usikkerhed",
+    "risici",
+    "forventninger",
+    "begivenheder efter",
+    "brev til aktionærer",
+    "samfundsansvar",
+    "financial highlights",
+    "outlook",
+    "events after",
+]
+
+# A heading line in extract_raw_text() output; group 1 is the title
+HEADING_LINE = re.compile(r"^### (.+)$", re.MULTILINE)
+_DIGIT = re.compile(r"\d")
+_NON_SPACE = re.compile(r"\S")
+
+# Raw-score weights (combined through a logistic into [0, 1])
+BIAS = -0.5
+HEADING_START = 3.0
+SECTION_INSIDE = 2.0
+SECTION_OUTSIDE = -2.0
+POSITION_WEIGHT = 0.75
+DIGIT_RATIO_LIMIT = 0.25
+DIGIT_PENALTY = 1.0
+SECTION_END_FLOOR = 0.0   # raw-score floor (0.5) for a chunk that starts inside the section
+
+
+@dataclass
+class ChunkScore:
+    index: int
+    score: float
+    section: Optional[str] = None   # governing heading at the start of the chunk
+
+
+def heading_state(title: str, started: bool = False) -> Optional[str]:
+    """
+    'inside', 'outside' or None (a heading that says nothing). Continuation
+    headings only count as 'inside' while the section is open (`started`:
+    a start heading has been seen and no end heading since).
+    """
+    if start_match(title):
+        return "inside"
+    if is_end_heading(title):
+        return "outside"
+    t = normalize_heading(title)
+    if started and any(h in t for h in CONTINUATION_HEADINGS):
+        return "inside"
+    return None
+
+
+def _term_score(text: str) -> float:
+    lowered = text.lower()
+    pos = sum(w * lowered.count(t) for t, w in POSITIVE_TERMS.items())
+    neg = sum(w * lowered.count(t) for t, w in NEGATIVE_TERMS.items())
+    # Saturate so one long chunk cannot dominate through sheer length
+    return math.log1p(pos) - math.log1p(neg)
+
+
+def _digit_ratio(text: str) -> float:
+    chars = len(_NON_SPACE.findall(text))
+    return len(_DIGIT.findall(text)) / chars if chars else 0.0
+
+
+class ChunkScorer:
+    """
+    Scores chunks one at a time, in document order (the section state is
+    carried from chunk to chunk). `total` is the number of chunks if known;
+    without it (streamed input) the position term is left out.
+    """
+
+    def __init__(self, total: Optional[int] = None):
+        self.total = total
+        self.index = 0
+        self.section_title: Optional[str] = None
+        self.section_state: Optional[str] = None
+        self.started = False   # the section is open (start heading seen, not ended)
+
+    def score(self, chunk: str) -> ChunkScore:
+        idx = self.index
+        self.index += 1
+
+        raw = BIAS + _term_score(chunk)
+
+        headings = list(HEADING_LINE.finditer(chunk))
+        starts = [bool(start_match(h.group(1))) for h in headings]
+        if any(starts):
+            raw += HEADING_START
+
+        # Share of the chunk's text that sits under an inside/outside heading
+        inside = outside = 0
+        state, pos, started = self.section_state, 0, self.started
+        for h, is_start in zip(headings + [None], starts + [False]):
+            end = h.start() if h else len(chunk)
+            if state == "inside":
+                inside += end - pos
+            elif state == "outside":
+                outside += end - pos
+            if h:
+                hs = heading_state(h.group(1), started or is_start)
+                started = (started or is_start) and hs != "outside"
+                state, pos = hs or state, h.start()
+        if chunk:
+            raw += (SECTION_INSIDE * inside + SECTION_OUTSIDE * outside) / len(chunk)
+
+        # +POSITION_WEIGHT at the start of the report, -POSITION_WEIGHT at the end
+        if self.total is not None:
+            rel = idx / (self.total - 1) if self.total > 1 else 0.0
+            raw += POSITION_WEIGHT * (1 - 2 * rel)
+
+        if _digit_ratio(chunk) > DIGIT_RATIO_LIMIT:
+            raw -= DIGIT_PENALTY
+
+        # Review text before the first heading: the chunk holds the section's end
+        first = headings[0].start() if headings else len(chunk)
+        if self.started and self.section_state == "inside" and chunk[:first].strip():
+            raw = max(raw, SECTION_END_FLOOR)
+
+        result = ChunkScore(idx, round(1 / (1 + math.exp(-raw)), 3), self.section_title)
+
+        # Carry the section state into the next chunk
+        for h, is_start in zip(headings, starts):
+            hs = heading_state(h.group(1), self.started or is_start)
+            self.started = (self.started or is_start) and hs != "outside"
+            if hs:
+                self.section_title, self.section_state = h.group(1), hs
+
+        return result
+
+
+def score_chunks(chunks: List[str]) -> List[ChunkScore]:
+    """
+    Score every chunk in document order. Scores depend on neighbouring
+    chunks (the section a chunk starts in), so score the whole list.
+    """
+    scorer = ChunkScorer(total=len(chunks))
+    return [scorer.score(chunk) for chunk in chunks]
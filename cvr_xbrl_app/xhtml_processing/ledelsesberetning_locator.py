@@ -0,0 +1,141 @@
+# ledelsesberetning_locator.py
+"""
+Rule-based locator for the Ledelsesberetning / Management Review.
+
+Works on the output of extract_raw_text(), where headings are marked as
+'### Overskrift'. The section starts at a heading matching HEADING_MARKERS
+and ends at the next heading matching END_HEADING_MARKERS (Ledelses-
+påtegning, Revisionspåtegning, Noter, ...).
+
+Every candidate start heading is tried (the table of contents usually
+mentions 'Ledelsesberetning' too) and the longest span wins. Headings
+from the auditor's report that merely mention the section ('Udtalelse
+om ledelsesberetningen') are not start headings. The result
+carries a confidence score so callers can fall back to the LLM only for
+documents where the headings are unclear.
+
+The heading tests (start_match, is_end_heading, normalize_heading) are
+shared with chunk_scorer.
+
+Usage:
+    located = locate_ledelsesberetning(raw_text)
+    if located.confidence >= 0.8:
+        text = located.text
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+from .xhtml_text import END_HEADING_MARKERS, HEADING_MARKERS
+
+# Plausible size of a Management Review in characters
+MIN_SECTION_CHARS = 500
+MAX_SECTION_SHARE = 0.6   # of the whole document
+
+# Start headings longer than this are sentences, not section titles
+MAX_HEADING_CHARS = 80
+
+# Headings that mention a marker in the auditor's report, not the section itself
+AUDITOR_CONTEXT = ("udtalelse om", "erklæring om", "revisors")
+
+
+@dataclass
+class LocatedSection:
+    text: str
+    confidence: float
+    start_heading: Optional[str] = None
+    end_heading: Optional[str] = None
+
+
+def normalize_heading(title: str) -> str:
+    """'5. LEDELSESBERETNING' -> 'ledelsesberetning'"""
+    t = title.lower().strip()
+    t = re.sub(r"^[\d\s.,:)\-–]+", "", t)
+    return t.strip(" .:")
+
+
+def start_match(title: str) -> float:
+    """1.0 for an exact marker heading, 0.6 if it merely contains one, else 0."""
+    t = normalize_heading(title)
+    if not t or len(t) > MAX_HEADING_CHARS:
+        return 0.0
+    if any(c in t for c in AUDITOR_CONTEXT):
+        return 0.0
+    if t in HEADING_MARKERS:
+        return 1.0
+    if any(m in t for m in HEADING_MARKERS):
+        return 0.6
+    return 0.0
+
+
+# Prefixes allowed in front of an end marker ('Koncernbalance', 'Consolidated income statement')
+_END_PREFIX = r"(?:koncern|moderselskab(?:ets)?\s*|consolidated\s+|parent company\s+)?"
+_END_HEADING = re.compile(
+    r"^" + _END_PREFIX + "(?:" + "|".join(re.escape(m) for m in END_HEADING_MARKERS) + ")"
+)
+
+
+def is_end_heading(title: str) -> bool:
+    """Heading that starts with an end marker ('Balance 31.12' but not 'Events after the balance sheet date')."""
+    t = normalize_heading(title)
+    return bool(_END_HEADING.match(t)) and not any(m in t for m in HEADING_MARKERS)
+
+
+def locate_ledelsesberetning(raw_text: str) -> LocatedSection:
+    """
+    Find the Ledelsesberetning span in extract_raw_text() output.
+
+    Confidence (0-1) adds up:
+        0.4  start heading is exactly a marker (0.25 if it only contains one)
+        0.3  an explicit terminating heading was found
+        0.2  the span has a plausible size
+        0.1  no competing candidate of similar size
+    """
+    if not raw_text:
+        return LocatedSection("", 0.0)
+
+    blocks = [b.strip() for b in raw_text.split("\n\n") if b.strip()]
+    headings = [(i, b[4:].strip()) for i, b in enumerate(blocks) if b.startswith("### ")]
+
+    # One candidate per end position: repeated start headings inside the
+    # same section (e.g. running page headers) are not competitors. The
+    # first exact heading is kept; without one, the latest partial match
+    # (the one closest to the section body)
+    candidates = {}
+    for pos, (i, title) in enumerate(headings):
+        start_score = start_match(title)
+        if not start_score:
+            continue
+
+        end_i, end_title = len(blocks), None
+        for j, other in headings[pos + 1:]:
+            if is_end_heading(other):
+                end_i, end_title = j, other
+                break
+
+        previous = candidates.get(end_i)
+        if previous is not None and (previous[1] == 1.0 or start_score < previous[1]):
+            continue
+
+        body = [b[4:].strip() if b.startswith("### ") else b for b in blocks[i + 1:end_i]]
+        text = "\n\n".join(body)
+        candidates[end_i] = (len(text), start_score, title, end_title, text)
+
+    if not candidates:
+        return LocatedSection("", 0.0)
+
+    candidates = sorted(candidates.values(), key=lambda c: c[0], reverse=True)
+    length, start_score, title, end_title, text = candidates[0]
+
+    confidence = 0.4 if start_score == 1.0 else 0.25
+    if end_title:
+        confidence += 0.3
+    if MIN_SECTION_CHARS <= length <= MAX_SECTION_SHARE * len(raw_text):
+        confidence += 0.2
+    if len(candidates) == 1 or candidates[1][0] < 0.2 * length:
+        confidence += 0.1
+
+    return LocatedSection(text, round(confidence, 2), title, end_title)
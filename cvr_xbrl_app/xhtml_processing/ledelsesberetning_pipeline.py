@@ -0,0 +1,69 @@
+"""
+ledelsesberetning_pipeline.py
+-----------------------------
+Automatic Ledelsesberetning extraction from a resolved instance file,
+run as a background job (utils.jobs) so the UI stays responsive:
+
+1. Extract the raw text of the iXBRL/XHTML report
+2. Locate the section by its headings (no LLM) or, if that is not
+   confident enough, extract it chunk by chunk with the LLM
+
+The job owns its own Workspace with a copy of the instance, so the
+request that found the instance can close its workspace right away.
+ÅRL XML instances have no narrative text; the job then returns "".
+
+    job = start_ledelsesberetning_job(instance_path, run_ai_model)
+    ...
+    job.done, job.progress, job.result
+"""
+
+from pathlib import Path
+from typing import Callable, Optional
+
+from utils.jobs import Job, start_file_job
+from .xhtml_llm_extraction import llm_extract_ledelsesberetning
+from .xhtml_text import extract_raw_text
+
+XHTML_SUFFIXES = (".xhtml", ".html", ".htm")
+
+
+def extract_ledelsesberetning_from_instance(
+    instance_path: str,
+    run_llm_fn: Callable[[str], str],
+    progress: Optional[Callable[[str], None]] = None,
+    stats: Optional[dict] = None,
+) -> str:
+    """Ledelsesberetning of an instance file, or "" (XML instance or nothing found)."""
+    progress = progress or (lambda message: None)
+
+    if Path(instance_path).suffix.lower() not in XHTML_SUFFIXES:
+        return ""
+
+    progress("Læser årsrapporten...")
+    raw_text = extract_raw_text(instance_path)
+    if not raw_text.strip():
+        return ""
+
+    progress("Finder ledelsesberetningen...")
+    return llm_extract_ledelsesberetning(raw_text, run_llm_fn, stats=stats).strip()
+
+
+def _run(job: Job, path: str, run_llm_fn: Callable[[str], str]) -> str:
+    stats = {}
+    text = extract_ledelsesberetning_from_instance(path, run_llm_fn, job.set_progress, stats)
+    print(
+        f"Background Ledelsesberetning: {len(text)} chars in {job.elapsed_s:.1f}s "
+        f"(located: {stats.get('located')}, LLM calls: {stats.get('llm_calls', 0)})"
+    )
+    return text
+
+
+def start_ledelsesberetning_job(
+    instance_path: str, run_llm_fn: Callable[[str], str], dedupe_key=None
+) -> Job:
+    """
+    Copy the instance into a job-owned workspace and start the extraction
+    in the background. Returns immediately; sessions passing the same
+    dedupe_key while it runs share the job.
+    """
+    return start_file_job("ledelsesberetning", _run, instance_path, run_llm_fn, dedupe_key=dedupe_key)
@@ -0,0 +1,165 @@
+"""
+paragraph_diff.py
+-----------------
+Paragraph-level diff of two versions of a text (typically this year's
+and last year's Ledelsesberetning), tolerant of small rewordings.
+
+Paragraphs whose words are identical (ignoring case, whitespace and
+punctuation) to a previous paragraph are unchanged; that is a dict
+lookup. The rest are reduced to word shingles (SHINGLE_WORDS consecutive
+normalised words) and a MinHash signature of NUM_PERM values. Signatures
+are bucketed by bands (LSH), so only paragraphs sharing a band are
+compared; the share of equal signature values estimates their Jaccard
+similarity. Each remaining current paragraph is then:
+
+- changed: its best previous match has similarity >= CHANGED_SIMILARITY
+  (same paragraph with new wording or figures)
+- new:     no sufficiently similar previous paragraph
+
+A changed figure always makes a paragraph 'changed', never 'unchanged'.
+
+Previous paragraphs that no current paragraph matched are 'removed'.
+
+    diff = diff_paragraphs(split_paragraphs(old), split_paragraphs(new))
+    diff.delta_paragraphs()   # what the LLM still has to read
+"""
+
+import hashlib
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+SHINGLE_WORDS = 3
+
+# Signature length = BANDS * ROWS_PER_BAND
+NUM_PERM = 64
+BANDS = 32
+ROWS_PER_BAND = NUM_PERM // BANDS
+
+CHANGED_SIMILARITY = 0.4
+
+_MERSENNE = (1 << 61) - 1
+_WORD = re.compile(r"\w+")
+
+# Fixed permutation parameters, so signatures are stable between runs
+_PERMS = [
+    (
+        int.from_bytes(hashlib.blake2b(b"a%d" % i, digest_size=8).digest(), "big") % _MERSENNE | 1,
+        int.from_bytes(hashlib.blake2b(b"b%d" % i, digest_size=8).digest(), "big") % _MERSENNE,
+    )
+    for i in range(NUM_PERM)
+]
+
+
+def _words(text: str) -> list:
+    return _WORD.findall(text.lower())
+
+
+def shingles(text: str, k: int = SHINGLE_WORDS) -> Set[str]:
+    """Lower-cased k-word shingles of `text` (the whole text if it is shorter)."""
+    words = _words(text)
+    if len(words) <= k:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+
+def minhash(shingle_set: Set[str]) -> Tuple[int, ...]:
+    """MinHash signature of a shingle set (NUM_PERM values)."""
+    if not shingle_set:
+        return tuple([_MERSENNE] * NUM_PERM)
+    hashes = [
+        int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big")
+        for s in shingle_set
+    ]
+    return tuple(min((a * h + b) % _MERSENNE for h in hashes) for a, b in _PERMS)
+
+
+def similarity(sig_a: Tuple[int, ...], sig_b: Tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+@dataclass
+class ParagraphDiff:
+    paragraphs: List[str]                                     # current paragraphs
+    unchanged: List[int] = field(default_factory=list)        # indices into paragraphs
+    changed: List[int] = field(default_factory=list)
+    new: List[int] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)          # previous paragraphs
+    matches: Dict[int, Tuple[int, float]] = field(default_factory=dict)  # current -> (previous, sim)
+
+    @property
+    def changed_share(self) -> float:
+        """Share of current characters in changed or new paragraphs."""
+        total = sum(len(p) for p in self.paragraphs)
+        if not total:
+            return 0.0
+        return sum(len(self.paragraphs[i]) for i in self.changed + self.new) / total
+
+    @property
+    def is_unchanged(self) -> bool:
+        return not (self.changed or self.new or self.removed)
+
+    def delta_paragraphs(self) -> List[str]:
+        """Changed and new paragraphs, in document order."""
+        return [self.paragraphs[i] for i in sorted(self.changed + self.new)]
+
+
+def diff_paragraphs(
+    previous: List[str],
+    current: List[str],
+    changed_similarity: float = CHANGED_SIMILARITY,
+) -> ParagraphDiff:
+    """Classify the `current` paragraphs against the `previous` ones (see module doc)."""
+    diff = ParagraphDiff(paragraphs=list(current))
+    matched_prev: Set[int] = set()
+
+    # Exact matches on the normalised words first
+    exact: Dict[Tuple[str, ...], List[int]] = defaultdict(list)
+    for j, p in enumerate(previous):
+        exact[tuple(_words(p))].append(j)
+
+    pending: List[int] = []
+    for i, para in enumerate(current):
+        same = [j for j in exact.get(tuple(_words(para)), ()) if j not in matched_prev]
+        if same:
+            diff.unchanged.append(i)
+            diff.matches[i] = (same[0], 1.0)
+            matched_prev.add(same[0])
+        else:
+            pending.append(i)
+
+    # LSH index over the previous paragraphs still unmatched: band -> indices
+    prev_sigs: Dict[int, Tuple[int, ...]] = {}
+    buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = defaultdict(list)
+    if pending:
+        for j, p in enumerate(previous):
+            if j in matched_prev:
+                continue
+            prev_sigs[j] = sig = minhash(shingles(p))
+            for b in range(BANDS):
+                buckets[(b, sig[b * ROWS_PER_BAND:(b + 1) * ROWS_PER_BAND])].append(j)
+
+    for i in pending:
+        sig = minhash(shingles(current[i]))
+        candidates: Set[int] = set()
+        for b in range(BANDS):
+            candidates.update(buckets.get((b, sig[b * ROWS_PER_BAND:(b + 1) * ROWS_PER_BAND]), ()))
+
+        best: Optional[Tuple[int, float]] = None
+        for j in candidates:
+            sim = similarity(sig, prev_sigs[j])
+            if best is None or sim > best[1]:
+                best = (j, sim)
+
+        if best is None or best[1] < changed_similarity:
+            diff.new.append(i)
+            continue
+
+        diff.changed.append(i)
+        diff.matches[i] = best
+        matched_prev.add(best[0])
+
+    diff.removed = [p for j, p in enumerate(previous) if j not in matched_prev]
+    return diff
@@ -0,0 +1,216 @@
+# section_index.py
+"""
+Persisted section index for random access into reports.
+
+The first time a report is seen, its narrative text (exactly the output of
+extract_raw_text()) is written to the section cache together with an
+index of every heading:
+
+    <cache>/<sha256>.txt          the extracted text
+    <cache>/<sha256>.index.json   level, title and byte/char span per heading
+
+A section spans from its heading line to the next heading of the same or
+a higher level (h2 ends at the next h1/h2, ...). get_section() then
+memory-maps the text file and decodes only that span, so pulling e.g. the
+Ledelsesberetning out of an already-seen report takes milliseconds.
+
+The cache is bounded by SECTION_CACHE_MAX_BYTES: entries (text + index)
+are marked as used on every lookup and the least recently used ones are
+removed first (utils.disk_lru), but never one used in the last
+SECTION_MIN_AGE_S seconds.
+
+Usage:
+    text = get_section("/path/to/report.xhtml", r"ledelsesberetning")
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import re
+import tempfile
+import threading
+from pathlib import Path
+from typing import Optional
+
+from utils.disk_lru import evict_lru
+from .xhtml_document import ParsedDocument, file_digest
+from .xhtml_text import _document_blocks, format_block, iter_narrative_blocks, merge_blocks
+
+SECTION_CACHE_DIR = Path(
+    os.getenv("SECTION_CACHE_DIR", Path(tempfile.gettempdir()) / "cvr_xbrl_sections")
+)
+SECTION_CACHE_MAX_BYTES = int(os.getenv("SECTION_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+SECTION_MIN_AGE_S = 300
+
+INDEX_VERSION = 1
+
+_SEPARATOR = "\n\n"
+
+_lock = threading.Lock()
+
+
+def _paths(digest: str) -> tuple[Path, Path]:
+    return (
+        SECTION_CACHE_DIR / f"{digest}.txt",
+        SECTION_CACHE_DIR / f"{digest}.index.json",
+    )
+
+
+def _entry_key(path: Path) -> str:
+    # <digest>.txt and <digest>.index.json are one entry
+    return path.name.split(".", 1)[0]
+
+
+def _touch(text_path: Path, index_path: Path) -> bool:
+    """Mark an entry as recently used; False if a file of it is gone."""
+    with _lock:
+        try:
+            os.utime(text_path)
+            os.utime(index_path)
+        except FileNotFoundError:
+            return False
+    return True
+
+
+def _digest_of(xhtml: str | ParsedDocument) -> str:
+    return xhtml.digest if isinstance(xhtml, ParsedDocument) else file_digest(str(xhtml))
+
+
+def _blocks_of(xhtml: str | ParsedDocument):
+    if isinstance(xhtml, ParsedDocument):
+        return merge_blocks(_document_blocks(xhtml))
+    return iter_narrative_blocks(str(xhtml))
+
+
+# ------------------------------------------------------------
+# BUILD
+# ------------------------------------------------------------
+def build_section_index(xhtml: str | ParsedDocument) -> dict:
+    """
+    Return the section index for a report, building and persisting it
+    (text + index) on first use.
+
+    Index format:
+        {
+            "version": 1,
+            "digest": "<sha256 of the report>",
+            "chars": 123456, "bytes": 130000,
+            "sections": [
+                {"level": 1, "title": "Ledelsesberetning",
+                 "char_start": 0, "char_end": 5120,
+                 "byte_start": 0, "byte_end": 5301},
+                ...
+            ]
+        }
+    """
+    digest = _digest_of(xhtml)
+    text_path, index_path = _paths(digest)
+
+    index = _load_index(index_path)
+    if index is not None and _touch(text_path, index_path):
+        return index
+
+    SECTION_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+
+    sections = []
+    char_pos = 0
+    byte_pos = 0
+
+    # Write the text while streaming blocks, tracking offsets as we go
+    fd, tmp_text = tempfile.mkstemp(dir=SECTION_CACHE_DIR, suffix=".tmp")
+    with os.fdopen(fd, "wb") as out:
+        for i, block in enumerate(_blocks_of(xhtml)):
+            line = (_SEPARATOR if i else "") + format_block(block)
+            encoded = line.encode("utf-8")
+
+            level, title = block
+            if level:
+                offset = len(_SEPARATOR) if i else 0
+                sections.append({
+                    "level": level,
+                    "title": title,
+                    "char_start": char_pos + offset,
+                    "byte_start": byte_pos + offset,
+                })
+
+            out.write(encoded)
+            char_pos += len(line)
+            byte_pos += len(encoded)
+
+    # Close each section at the next heading of the same or higher level
+    for i, sec in enumerate(sections):
+        end = next(
+            (s for s in sections[i + 1:] if s["level"] <= sec["level"]),
+            None,
+        )
+        if end is None:
+            sec["char_end"], sec["byte_end"] = char_pos, byte_pos
+        else:
+            sec["char_end"] = end["char_start"] - len(_SEPARATOR)
+            sec["byte_end"] = end["byte_start"] - len(_SEPARATOR)
+
+    index = {
+        "version": INDEX_VERSION,
+        "digest": digest,
+        "chars": char_pos,
+        "bytes": byte_pos,
+        "sections": sections,
+    }
+
+    # Text first, index last: an index on disk always has its text
+    os.replace(tmp_text, text_path)
+    fd, tmp_index = tempfile.mkstemp(dir=SECTION_CACHE_DIR, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(tmp_index, index_path)
+
+    with _lock:
+        evict_lru(SECTION_CACHE_DIR, SECTION_CACHE_MAX_BYTES, SECTION_MIN_AGE_S,
+                  keep={digest}, key=_entry_key)
+
+    return index
+
+
+def _load_index(index_path: Path) -> Optional[dict]:
+    try:
+        with open(index_path, encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return index if index.get("version") == INDEX_VERSION else None
+
+
+# ------------------------------------------------------------
+# LOOKUP
+# ------------------------------------------------------------
+def _read_span(text_path: Path, byte_start: int, byte_end: int) -> str:
+    if byte_end <= byte_start:
+        return ""
+    with open(text_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        return data[byte_start:byte_end].decode("utf-8")
+
+
+def get_section(xhtml: str | ParsedDocument, title_pattern: str) -> Optional[str]:
+    """
+    Return the text of the first section whose heading matches
+    `title_pattern` (regex, case-insensitive), including the heading line
+    and its subsections. Returns None if no heading matches.
+    """
+    index = build_section_index(xhtml)
+    text_path, _ = _paths(index["digest"])
+
+    pattern = re.compile(title_pattern, re.IGNORECASE)
+    for sec in index["sections"]:
+        if pattern.search(sec["title"]):
+            return _read_span(text_path, sec["byte_start"], sec["byte_end"])
+
+    return None
+
+
+def get_raw_text(xhtml: str | ParsedDocument) -> str:
+    """The full extract_raw_text() output, served from the section cache."""
+    index = build_section_index(xhtml)
+    text_path, _ = _paths(index["digest"])
+    return _read_span(text_path, 0, index["bytes"])
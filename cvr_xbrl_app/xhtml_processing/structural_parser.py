@@ -4,15 +4,15 @@ Optional: Build a nested hierarchical structure (tree)
 where h1 contains h2 contains h3 etc.
 """
 
-from bs4 import BeautifulSoup
-from pathlib import Path
+from .xhtml_document import ParsedDocument, load_document
 
 HEADING_ORDER = {"h1": 1, "h2": 2, "h3": 3, "h4": 4}
 
 
-def parse_structure(xhtml_path: str) -> list:
+def parse_structure(xhtml: str | ParsedDocument) -> list:
     """
     Returns a tree-like structure for the XHTML document.
+    Accepts a file path or a ParsedDocument from load_document().
 
     Example:
     [
@@ -29,19 +29,20 @@ def parse_structure(xhtml_path: str) -> list:
         }
     ]
     """
-    soup = BeautifulSoup(Path(xhtml_path).read_text(encoding="utf-8"), "lxml")
+    doc = load_document(xhtml)
+    view = doc.view("document")
 
     root = []
     stack = []
 
-    for el in soup.find_all(True):
-        tag = el.name.lower()
+    for el in view.nodes:
+        tag = el.tag
 
         if tag not in HEADING_ORDER:
             continue
 
         level = HEADING_ORDER[tag]
-        title = el.get_text(" ", strip=True)
+        title = view.text(el)
 
         node = {"title": title, "level": level, "children": []}
 
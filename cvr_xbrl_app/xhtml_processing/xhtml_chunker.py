@@ -5,45 +5,202 @@ for LLM processing.
 
 We chunk on paragraph boundaries (blank lines) to keep structure,
 not in the middle of sentences.
+
+With numbered=True every paragraph is prefixed with its 1-based ID in
+the whole document ('[17] Selskabets aktiviteter ...'), so an LLM can
+answer with IDs and the text can be rebuilt from split_paragraphs().
+
+iter_token_chunks() is the token-budgeted variant: it packs paragraphs up
+to `max_tokens` (estimated locally, see utils.tokens), repeats the last
+`overlap` paragraphs at the start of the next chunk, splits oversize
+paragraphs at sentence boundaries and works lazily on a paragraph stream:
+
+    blocks = iter_raw_paragraphs("/path/to/report.xhtml")
+    for chunk in iter_token_chunks(blocks, max_tokens=2500, overlap=1):
+        ...   # chunk 1 is ready before the rest of the report is parsed
 """
 
-from typing import List
+from typing import Iterable, Iterator, List, Tuple, Union
 import re
 
+from utils.tokens import CHARS_PER_TOKEN, estimate_tokens
 
-def chunk_text(text: str, max_chars: int = 9000) -> List[str]:
-    """
-    Split text into chunks of approximately max_chars characters,
-    using paragraph boundaries.
 
-    - We split on blank lines (one or more newlines with optional spaces)
-    - We then greedily pack paragraphs until the chunk would exceed max_chars
-    - No overlap by default (can be added later if needed)
-    """
+def split_paragraphs(text: str) -> List[str]:
+    """Non-empty paragraphs (split on blank lines); paragraph ID n is index n - 1."""
     if not text:
         return []
-
     paragraphs = re.split(r"\n\s*\n", text)
-    paragraphs = [p.strip() for p in paragraphs if p.strip()]
+    return [p.strip() for p in paragraphs if p.strip()]
+
+
+def number_paragraph(pid: int, para: str) -> str:
+    return f"[{pid}] {para}"
 
-    chunks: List[str] = []
-    current_paras: List[str] = []
+
+def chunk_paragraphs(
+    text: str, max_chars: int = 9000, numbered: bool = False
+) -> List[List[Tuple[int, str]]]:
+    """
+    Group the paragraphs of `text` into chunks of approximately max_chars
+    characters. Returns (paragraph ID, paragraph) pairs per chunk. With
+    `numbered`, the '[ID] ' prefixes count towards max_chars.
+    """
+    chunks: List[List[Tuple[int, str]]] = []
+    current: List[Tuple[int, str]] = []
     current_len = 0
 
-    for para in paragraphs:
+    for pid, para in enumerate(split_paragraphs(text), start=1):
+        size = len(number_paragraph(pid, para)) if numbered else len(para)
         # +2 for the blank lines we re-insert between paragraphs
-        added_len = len(para) + (2 if current_paras else 0)
+        added_len = size + (2 if current else 0)
 
-        if current_paras and current_len + added_len > max_chars:
+        if current and current_len + added_len > max_chars:
             # flush current chunk
-            chunks.append("\n\n".join(current_paras))
-            current_paras = [para]
-            current_len = len(para)
+            chunks.append(current)
+            current = [(pid, para)]
+            current_len = size
         else:
-            current_paras.append(para)
+            current.append((pid, para))
             current_len += added_len
 
-    if current_paras:
-        chunks.append("\n\n".join(current_paras))
+    if current:
+        chunks.append(current)
 
     return chunks
+
+
+def chunk_text(text: str, max_chars: int = 9000, numbered: bool = False) -> List[str]:
+    """
+    Split text into chunks of approximately max_chars characters,
+    using paragraph boundaries.
+
+    - We split on blank lines (one or more newlines with optional spaces)
+    - We then greedily pack paragraphs until the chunk would exceed max_chars
+    - No overlap by default (can be added later if needed)
+    - numbered=True prefixes each paragraph with '[ID] '
+    """
+    return [
+        "\n\n".join(number_paragraph(pid, p) if numbered else p for pid, p in chunk)
+        for chunk in chunk_paragraphs(text, max_chars, numbered)
+    ]
+
+
+# ------------------------------------------------------------
+# TOKEN-BUDGETED, STREAMING
+# ------------------------------------------------------------
+_SENTENCE_END = re.compile(r"(?<=[.!?;:])\s+")
+
+# Tokens reserved for the '[ID] ' prefix of numbered paragraphs
+_ID_PREFIX_TOKENS = 4
+
+
+def _split_oversize(para: str, max_tokens: int) -> List[str]:
+    """Split a paragraph above max_tokens at sentence boundaries (words as a last resort)."""
+    pieces: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+
+    def flush():
+        nonlocal current, current_tokens
+        if current:
+            pieces.append(" ".join(current))
+        current, current_tokens = [], 0
+
+    for sentence in _SENTENCE_END.split(para):
+        parts = [sentence]
+        if estimate_tokens(sentence) > max_tokens:
+            # A single sentence over budget: cut between words
+            parts, words = [], []
+            for word in sentence.split():
+                if estimate_tokens(word) > max_tokens:
+                    # Not even a word boundary (e.g. a long number run): cut characters
+                    step = max_tokens * CHARS_PER_TOKEN
+                    if words:
+                        parts.append(" ".join(words))
+                        words = []
+                    parts.extend(word[i:i + step] for i in range(0, len(word), step))
+                    continue
+                if words and estimate_tokens(" ".join(words + [word])) > max_tokens:
+                    parts.append(" ".join(words))
+                    words = []
+                words.append(word)
+            if words:
+                parts.append(" ".join(words))
+
+        for part in parts:
+            tokens = estimate_tokens(part)
+            if current and current_tokens + tokens > max_tokens:
+                flush()
+            current.append(part)
+            current_tokens += tokens
+
+    flush()
+    return pieces
+
+
+def iter_token_chunk_paragraphs(
+    source: Union[str, Iterable[str]],
+    max_tokens: int = 2500,
+    overlap: int = 0,
+    numbered: bool = False,
+) -> Iterator[List[Tuple[int, str]]]:
+    """
+    Lazily group paragraphs into chunks of at most ~max_tokens estimated
+    tokens. Yields (paragraph ID, paragraph) pairs per chunk; the last
+    `overlap` paragraphs of a chunk are repeated (same IDs) at the start
+    of the next one if they fit.
+
+    `source` is a text (split on blank lines) or any iterable of
+    paragraphs, e.g. a generator still reading the report. Paragraphs
+    over budget are split at sentence boundaries; every piece gets its
+    own ID, so IDs count the pieces actually sent.
+    """
+    paragraphs = split_paragraphs(source) if isinstance(source, str) else source
+    budget = max(1, max_tokens - (_ID_PREFIX_TOKENS if numbered else 0))
+
+    current: List[Tuple[int, str, int]] = []   # (id, text, tokens)
+    current_tokens = 0
+    has_new = False
+    pid = 0
+
+    for para in paragraphs:
+        para = para.strip()
+        if not para:
+            continue
+
+        tokens = estimate_tokens(para)
+        pieces = [para] if tokens <= budget else _split_oversize(para, budget)
+
+        for piece in pieces:
+            pid += 1
+            piece_tokens = tokens if len(pieces) == 1 else estimate_tokens(piece)
+            if numbered:
+                piece_tokens += _ID_PREFIX_TOKENS
+
+            if has_new and current_tokens + piece_tokens > max_tokens:
+                yield [(i, t) for i, t, _ in current]
+
+                # Carry the overlap, dropping from the front until the new piece fits
+                current = current[len(current) - overlap:] if overlap else []
+                current_tokens = sum(t for _, _, t in current)
+                while current and current_tokens + piece_tokens > max_tokens:
+                    current_tokens -= current.pop(0)[2]
+
+            current.append((pid, piece, piece_tokens))
+            current_tokens += piece_tokens
+            has_new = True
+
+    if has_new:
+        yield [(i, t) for i, t, _ in current]
+
+
+def iter_token_chunks(
+    source: Union[str, Iterable[str]],
+    max_tokens: int = 2500,
+    overlap: int = 0,
+    numbered: bool = False,
+) -> Iterator[str]:
+    """Chunks of iter_token_chunk_paragraphs() as text ('[ID] ' prefixes with numbered)."""
+    for chunk in iter_token_chunk_paragraphs(source, max_tokens, overlap, numbered):
+        yield "\n\n".join(number_paragraph(i, p) if numbered else p for i, p in chunk)
@@ -1,47 +1,141 @@
 # xhtml_cleaner.py
 """
 Utility for cleaning and shrinking large XHTML/iXBRL reports by
-removing images, inline base64 content, and unnecessary heavy tags.
+removing images and inline base64 content.
 
-This version keeps all iXBRL tags intact for Arelle/NLP processing.
+The file is filtered as raw bytes in fixed-size windows and written out
+progressively, so memory use is constant regardless of report size. Only
+<img> elements and data:image/...;base64 payloads are cut out; every other
+byte (including all iXBRL markup) is passed through untouched.
 """
 
-from bs4 import BeautifulSoup
-from pathlib import Path
+import os
 import re
+from pathlib import Path
+
+from utils.workspace import Workspace
+from .xhtml_document import ParsedDocument
+
+CHUNK_SIZE = 1 << 20
+
+# Longest prefix of a token that can be cut by a window boundary without
+# the regex seeing it (e.g. "<im", "</img  ", "data:image/svg")
+_CARRY = 64
+
+_TOKEN = re.compile(
+    rb"(?P<img><img(?=[\s/>]))"
+    rb"|(?P<close></img\s*>)"
+    rb"|(?P<data>data:image/[a-zA-Z]+;base64,)",
+    re.IGNORECASE,
+)
+_TAG_SPECIAL = re.compile(rb"[\"'>]")
+_NOT_BASE64 = re.compile(rb"[^A-Za-z0-9+/=]")
 
+_TEXT, _IN_IMG, _IN_BASE64 = range(3)
 
-def remove_images_and_base64(xhtml_path: str, output_path: str | None = None) -> str:
+
+class _ImageStripper:
+    """
+    Incremental filter: feed() byte windows, get back the bytes to keep.
+    State (inside an <img> tag, inside a quoted attribute, inside a base64
+    payload, or a possibly cut-off token) is carried across windows.
+    """
+
+    def __init__(self):
+        self.state = _TEXT
+        self.quote = None
+        self.carry = b""
+
+    def feed(self, chunk: bytes, final: bool = False) -> bytes:
+        buf = self.carry + chunk
+        self.carry = b""
+        out = []
+        i, n = 0, len(buf)
+
+        while i < n:
+            if self.state == _IN_IMG:
+                # Skip to the end of the tag, ignoring '>' inside quotes
+                if self.quote:
+                    j = buf.find(self.quote, i)
+                    if j < 0:
+                        break
+                    i, self.quote = j + 1, None
+                    continue
+
+                m = _TAG_SPECIAL.search(buf, i)
+                if not m:
+                    break
+                i = m.end()
+                if m.group() == b">":
+                    self.state = _TEXT
+                else:
+                    self.quote = m.group()
+
+            elif self.state == _IN_BASE64:
+                m = _NOT_BASE64.search(buf, i)
+                if not m:
+                    break
+                i = m.start()
+                self.state = _TEXT
+
+            else:
+                m = _TOKEN.search(buf, i)
+                if not m:
+                    keep_until = n if final else max(i, n - _CARRY)
+                    out.append(buf[i:keep_until])
+                    self.carry = buf[keep_until:]
+                    break
+
+                out.append(buf[i:m.start()])
+                i = m.end()
+                if m.lastgroup == "img":
+                    self.state = _IN_IMG
+                elif m.lastgroup == "data":
+                    self.state = _IN_BASE64
+
+        return b"".join(out)
+
+
+def remove_images_and_base64(
+    xhtml: str | ParsedDocument,
+    output_path: str | None = None,
+    workspace: Workspace | None = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> str:
     """
     Removes <img> tags and inline base64 images from an XHTML file.
     Dramatically reduces file size (70MB → ~3MB).
 
     Args:
-        xhtml_path (str): Path to input XHTML file.
+        xhtml (str | ParsedDocument): Path to input XHTML file, or an
+                                      already parsed document (its file is
+                                      streamed; the tree is not needed).
         output_path (str, optional): Path to save cleaned file.
-                                     If None → creates '{name}_clean.xhtml'.
+                                     If None → written into `workspace`, or
+                                     '{name}_clean.xhtml' next to the input.
+        workspace (Workspace, optional): Owner of the cleaned file.
+        chunk_size (int): Window size in bytes.
 
     Returns:
         str: Path to cleaned XHTML.
     """
-    xhtml_path = Path(xhtml_path)
-    content = xhtml_path.read_text(encoding="utf-8")
-    soup = BeautifulSoup(content, "lxml")
-
-    # Remove all <img> tags
-    for img in soup.find_all("img"):
-        img.decompose()
-
-    # Remove inline base64 images
-    cleaned = re.sub(
-        r"data:image\/[a-zA-Z]+;base64,[A-Za-z0-9+/=]+",
-        "",
-        str(soup)
-    )
-
-    # Save output
-    if output_path is None:
-        output_path = str(xhtml_path.with_name(xhtml_path.stem + "_clean.xhtml"))
-
-    Path(output_path).write_text(cleaned, encoding="utf-8")
+    xhtml_path = Path(xhtml.path if isinstance(xhtml, ParsedDocument) else xhtml)
+
+    # Open output
+    if output_path is None and workspace is not None:
+        output_path, out = workspace.open_write(
+            suffix="_clean.xhtml", size_hint=os.path.getsize(xhtml_path)
+        )
+    else:
+        if output_path is None:
+            output_path = str(xhtml_path.with_name(xhtml_path.stem + "_clean.xhtml"))
+        out = open(output_path, "wb")
+
+    stripper = _ImageStripper()
+
+    with out, open(xhtml_path, "rb") as src:
+        for chunk in iter(lambda: src.read(chunk_size), b""):
+            out.write(stripper.feed(chunk))
+        out.write(stripper.feed(b"", final=True))
+
     return output_path
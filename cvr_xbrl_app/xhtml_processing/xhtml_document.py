@@ -0,0 +1,270 @@
+# xhtml_document.py
+"""
+Parse an XHTML/iXBRL report ONCE and share the tree between all text
+extractors (xhtml_text, xhtml_extractor, structural_parser, xhtml_cleaner).
+
+- One lxml HTML parse per document (same parser BeautifulSoup's "lxml"
+  builder uses, so tag names are identical, e.g. 'ix:nonnumeric')
+- Documents are cached per file content hash, so the same report under a
+  different temp path reuses the parsed tree
+- A "view" walks the tree once and records, for every element in document
+  order, its span in a flat list of text strings. Element text is then a
+  slice of that list instead of a fresh get_text() per element (which is
+  quadratic on deeply nested div/span/td structures).
+
+Usage:
+    doc = load_document("/path/to/report.xhtml")
+    text = extract_raw_text(doc)
+    sections = extract_sections(doc)
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from utils.lazy import lazy_import
+
+# Imported on first parse, not when the app starts
+etree = lazy_import("lxml.etree")
+
+# Tags that never contain narrative; dropped (with their text) by extract_raw_text
+GARBAGE_TAGS = frozenset({"script", "style", "meta", "link", "head", "title"})
+
+# Tags whose own strings BeautifulSoup's get_text() never returns
+TEXTLESS_TAGS = frozenset({"script", "style", "template"})
+
+CACHE_SIZE = 4
+
+
+_digests: "OrderedDict[tuple, str]" = OrderedDict()
+_digests_lock = threading.Lock()
+
+
+def file_digest(path: str) -> str:
+    """
+    SHA-256 of a file's content, read in 1 MB blocks. Memoized per
+    (path, mtime, size) so repeated lookups of the same file are free.
+    """
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+
+    with _digests_lock:
+        digest = _digests.get(key)
+    if digest is not None:
+        return digest
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    digest = h.hexdigest()
+
+    with _digests_lock:
+        _digests[key] = digest
+        while len(_digests) > 256:
+            _digests.popitem(last=False)
+    return digest
+
+
+# ------------------------------------------------------------
+# DOCUMENT VIEW
+# ------------------------------------------------------------
+class DocNode:
+    """One element of a DocView, with its text span and a bold-descendant flag."""
+
+    __slots__ = ("el", "tag", "start", "end", "has_bold")
+
+    def __init__(self, el, tag: str, start: int):
+        self.el = el
+        self.tag = tag
+        self.start = start
+        self.end = start
+        self.has_bold = False
+
+
+class DocView:
+    """
+    Flattened, document-ordered view of (part of) a parsed document.
+
+    nodes   : DocNode for every element, in document (start-tag) order
+    strings : every non-empty stripped text string, in document order
+
+    text(node) is equivalent to BeautifulSoup's get_text(" ", strip=True).
+    text_length(node) gives its length without building the string.
+    """
+
+    def __init__(self, root, skip_subtrees: frozenset = frozenset()):
+        self.nodes: list[DocNode] = []
+        self.strings: list[str] = []
+        self._build(root, skip_subtrees)
+
+        # Prefix sums of string lengths for text_length()
+        self._offsets = [0]
+        for s in self.strings:
+            self._offsets.append(self._offsets[-1] + len(s))
+
+    def _add(self, s: str | None) -> None:
+        if s:
+            s = s.strip()
+            if s:
+                self.strings.append(s)
+
+    def _open(self, el, name: str, muted: int) -> DocNode:
+        node = DocNode(el, name, len(self.strings))
+        self.nodes.append(node)
+        if name in TEXTLESS_TAGS:
+            muted += 1
+        if not muted:
+            self._add(el.text)
+        return node
+
+    def _build(self, root, skip_subtrees: frozenset) -> None:
+        # Iterative depth-first walk (reports nest far deeper than the
+        # recursion limit allows). `muted` counts open TEXTLESS_TAGS.
+        muted = 0
+        root_node = self._open(root, str(root.tag).lower(), muted)
+        muted += root_node.tag in TEXTLESS_TAGS
+        work = [(root_node, iter(root))]
+
+        while work:
+            node, children = work[-1]
+            child = next(children, None)
+
+            if child is None:
+                work.pop()
+                node.end = len(self.strings)
+                if node.tag in TEXTLESS_TAGS:
+                    muted -= 1
+                if work:
+                    if node.has_bold or node.tag in ("strong", "b"):
+                        work[-1][0].has_bold = True
+                    if not muted:
+                        self._add(node.el.tail)
+                continue
+
+            # Comments / PIs and skipped subtrees: only their tail is text
+            if not isinstance(child.tag, str) or child.tag.lower() in skip_subtrees:
+                if not muted:
+                    self._add(child.tail)
+                continue
+
+            child_node = self._open(child, child.tag.lower(), muted)
+            muted += child_node.tag in TEXTLESS_TAGS
+            work.append((child_node, iter(child)))
+
+    def text(self, node: DocNode) -> str:
+        return " ".join(self.strings[node.start:node.end])
+
+    def text_length(self, node: DocNode) -> int:
+        n = node.end - node.start
+        if not n:
+            return 0
+        return self._offsets[node.end] - self._offsets[node.start] + n - 1
+
+
+# ------------------------------------------------------------
+# PARSED DOCUMENT
+# ------------------------------------------------------------
+class ParsedDocument:
+    """
+    One parsed XHTML/iXBRL report. Create with load_document().
+
+    Attributes:
+        path (str): File the document was parsed from.
+        digest (str): SHA-256 of the file content (cache key).
+        root: lxml root element.
+    """
+
+    def __init__(self, path: str, digest: str, root):
+        self.path = str(path)
+        self.digest = digest
+        self.root = root
+        self._views: dict[tuple, DocView] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def body(self):
+        """The <body> element, or the root if the document has none."""
+        body = self.root.find(".//body")
+        return body if body is not None else self.root
+
+    def view(self, scope: str = "document", skip_subtrees: frozenset = frozenset()) -> DocView:
+        """
+        Cached DocView over the whole document ("document") or the
+        <body> ("body"), optionally dropping whole subtrees by tag name.
+        """
+        key = (scope, skip_subtrees)
+        with self._lock:
+            view = self._views.get(key)
+            if view is None:
+                root = self.body if scope == "body" else self.root
+                view = DocView(root, skip_subtrees)
+                self._views[key] = view
+            return view
+
+    def with_path(self, path: str) -> "ParsedDocument":
+        """
+        The same parse under another file path. Shares the tree and the
+        cached views; only `path` differs, so the original is untouched.
+        """
+        doc = copy.copy(self)
+        doc.path = str(path)
+        return doc
+
+
+def _parse(path: str):
+    parsers = (
+        etree.HTMLParser(encoding="utf-8", huge_tree=True),
+        # Fallback for documents the HTML parser cannot make sense of
+        etree.XMLParser(recover=True, huge_tree=True),
+    )
+    for parser in parsers:
+        try:
+            root = etree.parse(path, parser).getroot()
+        except etree.XMLSyntaxError:
+            continue
+        if root is not None:
+            return root
+
+    # Empty / unparseable file: behave like an empty document
+    return etree.Element("html")
+
+
+_cache: "OrderedDict[str, ParsedDocument]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def load_document(source: str | Path | ParsedDocument) -> ParsedDocument:
+    """
+    Return the parsed document for a file path, reusing a cached parse
+    when a file with the same content hash was loaded before. A cached
+    parse is shared across sessions and threads, so a hit returns a copy
+    whose `path` is the new, live file (see ParsedDocument.with_path).
+    ParsedDocument instances are returned unchanged.
+    """
+    if isinstance(source, ParsedDocument):
+        return source
+
+    path = str(source)
+    digest = file_digest(path)
+
+    with _cache_lock:
+        doc = _cache.get(digest)
+        if doc is not None:
+            _cache.move_to_end(digest)
+            return doc.with_path(path)
+
+    doc = ParsedDocument(path, digest, _parse(path))
+
+    with _cache_lock:
+        _cache[digest] = doc
+        _cache.move_to_end(digest)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+    return doc
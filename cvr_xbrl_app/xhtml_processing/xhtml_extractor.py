@@ -3,61 +3,66 @@
 Extracts structured narrative content from XHTML/iXBRL files.
 """
 
-from bs4 import BeautifulSoup
-from pathlib import Path
+from .xhtml_document import DocNode, DocView, ParsedDocument, load_document
 
 HEADING_TAGS = ["h1", "h2", "h3", "h4"]
 
 
-def is_heading(element):
+def is_heading(node: DocNode, view: DocView):
     """Heuristic: detect headings that are not proper <h1>-<h4>."""
-    txt = element.get_text(" ", strip=True)
-    if not txt or len(txt) > 200:
+    length = view.text_length(node)
+    if not length or length > 200:
         return False
 
     # Fully bold?
-    if element.find("strong") or element.find("b"):
+    if node.has_bold:
         return True
 
     # CSS-based headings (common in Vestas)
-    style = element.get("style", "").lower()
+    style = node.el.get("style", "").lower()
     if "font-size" in style and ("18" in style or "20" in style or "24" in style):
         return True
     if "font-weight" in style and ("600" in style or "700" in style):
         return True
 
     # All caps (ACRONYMS ignored)
+    txt = view.text(node)
     if txt.isupper() and txt.isalpha() and len(txt) > 3:
         return True
 
     return False
 
 
-def extract_sections(xhtml_path: str) -> list[dict]:
-    soup = BeautifulSoup(Path(xhtml_path).read_text(encoding="utf-8"), "lxml")
+def extract_sections(xhtml: str | ParsedDocument) -> list[dict]:
+    """
+    Split the document into [{"title": ..., "text": ...}] sections.
+    Accepts a file path or a ParsedDocument from load_document().
+    """
+    doc = load_document(xhtml)
+    view = doc.view("document")
 
     sections = []
     current_title = None
     current_text = []
 
-    for el in soup.find_all(True):
-        tag = el.name.lower()
+    for node in view.nodes:
+        tag = node.tag
 
         # True heading
-        if tag in HEADING_TAGS or is_heading(el):
+        if tag in HEADING_TAGS or is_heading(node, view):
             # Finalize previous section
             if current_title or current_text:
                 sections.append({
                     "title": current_title,
                     "text": "\n".join(current_text).strip()
                 })
-            current_title = el.get_text(" ", strip=True)
+            current_title = view.text(node)
             current_text = []
             continue
 
         # Collect narrative text
         if tag in ["p", "div", "span", "section"]:
-            txt = el.get_text(" ", strip=True)
+            txt = view.text(node)
             if txt:
                 current_text.append(txt)
 
@@ -11,10 +11,58 @@ where `raw_text` contains headings like:
 
     ### Ledelsesberetning
     ### Koncernledelsesberetning
+
+When those headings pin the section down clearly, the rule-based locator
+returns it directly and no LLM call is made at all. Otherwise only chunks
+the local relevance scorer considers plausible are sent to the LLM, and
+scanning stops once the (contiguous) section has clearly ended.
+
+Chunks are sent with up to `max_concurrency` requests in flight; answers
+are consumed in chunk order, so the result is the same as a sequential run.
+
+In "ids" mode (the default) paragraphs are numbered and the model only
+answers with the IDs of the paragraphs that belong to the section; the
+text is rebuilt locally, verbatim. "text" mode asks the model to copy the
+text out, as originally.
 """
 
-from typing import Callable
-from .xhtml_chunker import chunk_text
+import json
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Callable, Iterable, Optional, Union
+from utils.prompts import Prompt
+from .xhtml_chunker import iter_token_chunk_paragraphs, number_paragraph
+from .ledelsesberetning_locator import locate_ledelsesberetning
+from .chunk_scorer import HEADING_LINE, RELEVANCE_THRESHOLD, ChunkScorer, heading_state
+
+# Locator results at or above this confidence skip the LLM entirely
+LOCATOR_MIN_CONFIDENCE = 0.8
+
+# Text under a start heading needed before an end heading counts as the
+# end of the section (shorter spans are e.g. table-of-contents entries)
+MIN_INSIDE_CHARS = 300
+
+# Consecutive empty LLM answers after extracted content that end the section
+MAX_EMPTY_ANSWERS = 2
+
+NOT_STARTED, INSIDE, ENDED = "not_started", "inside", "ended"
+
+# "ids": model returns paragraph IDs, text is rebuilt locally
+# "text": model copies the relevant text out
+EXTRACTION_MODE = "ids"
+
+# Chunk size in estimated tokens (~9000 characters of Danish text) and
+# paragraphs repeated at the start of the next chunk for context
+CHUNK_MAX_TOKENS = 2500
+CHUNK_OVERLAP = 1
+
+# LLM requests in flight at once, and the limit per request in seconds
+LLM_MAX_CONCURRENCY = 4
+LLM_CALL_TIMEOUT = 90.0
 
 SYSTEM_PROMPT = """
 Du er en ekspert i danske årsrapporter og i særdeleshed i at finde afsnittet
@@ -46,6 +94,36 @@ REGLER:
 """
 
 
+IDS_SYSTEM_PROMPT = """
+Du er en ekspert i danske årsrapporter og i særdeleshed i at finde afsnittet
+'Ledelsesberetning' / 'Management Review'.
+
+Du arbejder på tekst, hvor hvert afsnit starter med sit nummer i kantede
+parenteser, fx '[17] Selskabets aktiviteter ...', og overskrifter er
+markeret sådan: '[12] ### Overskrift'.
+
+Din opgave:
+- Find de afsnit, der tilhører Ledelsesberetningen.
+- Typiske relevante overskrifter:
+  * Ledelsesberetning
+  * Koncernledelsesberetning
+  * Brev til aktionærer
+  * Udvikling i aktiviteter og økonomiske forhold
+  * Væsentlige begivenheder
+  * Usikkerheder og risici
+  * Forventninger til fremtiden
+
+REGLER:
+- Hvis en overskrift tydeligt markerer start på Ledelsesberetningen, så
+  hører afsnittene efter den med, indtil en ny overskrift klart indikerer
+  et andet afsnit (fx 'Ledelsespåtegning', 'Revisionspåtegning', 'Noter').
+- Uden overskrift: vurdér, om teksten sandsynligvis er en fortsættelse af
+  Ledelsesberetningen (aktiviteter, økonomisk udvikling, risici, forventninger).
+- Svar KUN med en JSON-liste af numrene, fx [17, 18, 19]. Sammenhængende
+  numre må skrives som interval: ["17-25", 31].
+- Ingen tekst, ingen forklaringer. Hvis intet er relevant: [].
+"""
+
 def _clean_llm_answer(answer: str) -> str:
     """
     Remove obvious wrapper formatting from the LLM answer
@@ -74,36 +152,89 @@ def _clean_llm_answer(answer: str) -> str:
     return text
 
 
-def llm_extract_ledelsesberetning(raw_text: str, run_llm_fn: Callable[[str], str]) -> str:
+class _ReviewTracker:
+    """
+    Tracks where the chunk scan is relative to the Ledelsesberetning:
+    not started -> inside -> ended. Driven by the '### ' heading markers
+    in each chunk and by whether the LLM found anything in it.
     """
-    Split the full extracted XHTML text into chunks and use an LLM
-    to extract relevant parts of the Ledelsesberetning.
-
-    Parameters
-    ----------
-    raw_text : str
-        Full plain-text representation of the XHTML/iXBRL document
-        from extract_raw_text().
-    run_llm_fn : Callable[[str], str]
-        A function that sends a prompt to an LLM and returns the answer
-        as a plain string. In your app this is `run_ai_model`.
 
-    Returns
-    -------
-    str
-        Concatenated extracted text belonging to the Ledelsesberetning.
+    def __init__(self):
+        self.state = NOT_STARTED
+        self.inside_chars = 0
+        self.found_content = False
+        self.empty_answers = 0
+
+    def feed_headings(self, chunk: str) -> None:
+        pos = 0
+        for h in list(HEADING_LINE.finditer(chunk)) + [None]:
+            end = h.start() if h else len(chunk)
+            if self.state == INSIDE:
+                self.inside_chars += end - pos
+            if h is None:
+                break
+            pos = h.start()
+
+            hs = heading_state(h.group(1), started=self.state == INSIDE)
+            if hs == "inside" and self.state == NOT_STARTED:
+                self.state = INSIDE
+            elif hs == "outside" and self.state == INSIDE:
+                if self.inside_chars >= MIN_INSIDE_CHARS or self.found_content:
+                    self.state = ENDED
+                    return
+                # False start (table of contents): wait for the real heading
+                self.state, self.inside_chars = NOT_STARTED, 0
+
+    def feed_answer(self, has_content: bool) -> None:
+        if has_content:
+            self.found_content = True
+            self.empty_answers = 0
+            if self.state == NOT_STARTED:
+                self.state = INSIDE   # section without a recognisable heading
+        elif self.found_content:
+            self.empty_answers += 1
+            if self.empty_answers >= MAX_EMPTY_ANSWERS:
+                self.state = ENDED
+
+
+_ID_RANGE = re.compile(r"(\d+)\s*[-–]\s*(\d+)|(\d+)")
+
+
+def _parse_ids(answer: str) -> list:
     """
-    if not raw_text:
-        return ""
+    Paragraph IDs from an answer like '[3, 4, "7-9"]'. Tolerates code
+    fences and prose around the list; returns [] if nothing is found.
+    """
+    text = _clean_llm_answer(answer)
+    start, end = text.find("["), text.rfind("]")
+    if start >= 0 and end > start:
+        text = text[start:end + 1]
+        try:
+            text = " ".join(str(v) for v in json.loads(text))
+        except (ValueError, TypeError):
+            pass
+
+    ids = []
+    for m in _ID_RANGE.finditer(text):
+        if m.group(3):
+            ids.append(int(m.group(3)))
+        else:
+            lo, hi = int(m.group(1)), int(m.group(2))
+            ids.extend(range(lo, hi + 1))
+    return ids
 
-    # Larger chunks to give the LLM more context
-    chunks = chunk_text(raw_text, max_chars=9000)
-    results = []
 
-    print("Number of chunks:", len(chunks))
+IDS_TASK = """
+Du modtager nu et udsnit (en bid) af en dansk årsrapport med nummererede afsnit.
+
+OPGAVE:
+- Returnér numrene på ALLE afsnit i dette udsnit, som tilhører
+  Ledelsesberetningen / Management Review, inkl. afsnit der meget
+  sandsynligt er en fortsættelse heraf.
+- Svar KUN med en JSON-liste, fx [4, 5, "8-12"]. Intet relevant: [].
+"""
 
-    for idx, chunk in enumerate(chunks):
-        user_prompt = f"""
+CHUNK_TASK = """
 Du modtager nu et udsnit (en bid) af en dansk årsrapport i ren tekst.
 
 Teksten kan indeholde overskrifter markeret som:
@@ -117,35 +248,51 @@ OPGAVE:
 - Medtag også tekst, der meget sandsynligt er en fortsættelse heraf.
 - Returnér KUN selve teksten uden forklaring, markdown eller andre kommentarer.
 - Hvis intet er relevant i denne bid, returnér en tom streng.
-
-HER ER UDSNITTET:
-\"\"\"{chunk}\"\"\"
 """
 
-        try:
-            answer = run_llm_fn(SYSTEM_PROMPT + "\n" + user_prompt)
-        except Exception as e:
-            print(f"[LLM ERROR chunk {idx}] {e}")
-            continue
 
-        cleaned = _clean_llm_answer(answer)
-        if not cleaned:
-            continue
+def _ids_prompt(numbered_chunk: str) -> Prompt:
+    """Full prompt (system + task, then the chunk) for one numbered chunk in "ids" mode."""
+    return Prompt(
+        [("system", IDS_SYSTEM_PROMPT), ("opgave", IDS_TASK)],
+        [("udsnit", f'HER ER UDSNITTET:\n"""{numbered_chunk}"""')],
+    )
 
-        # Ignore obvious "no content" messages if model uses them
-        lowered = cleaned.strip().lower()
-        if lowered in ("", "none", "ingen", "no relevant content"):
-            continue
 
-        results.append(cleaned)
+def _chunk_prompt(chunk: str) -> Prompt:
+    """Full prompt (system + task, then the chunk) for one chunk in "text" mode."""
+    return Prompt(
+        [("system", SYSTEM_PROMPT), ("opgave", CHUNK_TASK)],
+        [("udsnit", f'HER ER UDSNITTET:\n"""{chunk}"""')],
+    )
 
-    # Join all extracted pieces with blank lines
-    full = "\n\n".join(results).strip()
 
-    # Optional simple dedupe of repeated paragraphs
-    if not full:
-        return ""
+def _start_call(fn: Callable[[str], str], prompt: str, slot: threading.Semaphore) -> Future:
+    """
+    Run fn(prompt) on its own daemon thread, holding one acquired `slot`.
+    The slot is released when fn returns, not when the caller stops
+    waiting: an abandoned (timed-out) call keeps counting against the
+    concurrency limit until the backend is really done with it.
+    """
+    future = Future()
 
+    def run():
+        try:
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(fn(prompt))
+            except BaseException as e:
+                future.set_exception(e)
+        finally:
+            slot.release()
+
+    threading.Thread(target=run, name="llm-chunk", daemon=True).start()
+    return future
+
+
+def _dedupe_lines(full: str) -> str:
+    """Simple dedupe of repeated paragraphs, keeping the first occurrence."""
     lines = [ln.strip() for ln in full.splitlines() if ln.strip()]
     deduped_lines = []
     seen = set()
@@ -156,3 +303,232 @@ HER ER UDSNITTET:
         deduped_lines.append(ln)
 
     return "\n\n".join(deduped_lines).strip()
+
+
+def llm_extract_ledelsesberetning(
+    raw_text: Union[str, Iterable[str]],
+    run_llm_fn: Callable[[str], str],
+    min_confidence: Optional[float] = LOCATOR_MIN_CONFIDENCE,
+    min_relevance: Optional[float] = RELEVANCE_THRESHOLD,
+    stop_at_end: bool = True,
+    stats: Optional[dict] = None,
+    max_concurrency: int = LLM_MAX_CONCURRENCY,
+    call_timeout: Optional[float] = LLM_CALL_TIMEOUT,
+    mode: str = EXTRACTION_MODE,
+    max_tokens: int = CHUNK_MAX_TOKENS,
+    overlap: int = CHUNK_OVERLAP,
+) -> str:
+    """
+    Split the full extracted XHTML text into chunks and use an LLM
+    to extract relevant parts of the Ledelsesberetning.
+
+    The deterministic locator runs first; if it finds the section with
+    at least `min_confidence`, that span is returned without any LLM
+    call. Pass min_confidence=None to always use the LLM.
+
+    Chunks scoring below `min_relevance` (see chunk_scorer) are not sent
+    to the LLM. Pass min_relevance=None to send every chunk.
+
+    With `stop_at_end`, no further chunks are sent once the section has
+    clearly ended (an end heading such as 'Ledelsespåtegning' or 'Noter'
+    after the section, or repeated empty answers after extracted text).
+    If a `stats` dict is given it is filled with chunk and call counts.
+
+    Up to `max_concurrency` chunks are sent at once (1 = sequential). A
+    call that fails or takes longer than `call_timeout` seconds only
+    loses that chunk (a timed-out call is abandoned, not interrupted, and
+    holds its slot until it returns, so no more than `max_concurrency`
+    calls ever run). With early termination, calls already in flight
+    when the section ends are discarded; chunks still waiting for a slot
+    are not sent.
+
+    `mode` "ids" sends numbered paragraphs and rebuilds the section from
+    the returned paragraph IDs (IDs outside the chunk are ignored), so the
+    text is never rewritten by the model; "text" lets the model copy it.
+
+    Chunks hold up to `max_tokens` estimated tokens, with `overlap`
+    paragraphs repeated from the previous chunk. They are built lazily:
+    given a paragraph stream (e.g. iter_raw_paragraphs(path)) the first
+    call goes out while the report is still being parsed, and parsing
+    stops when the section has ended. The locator needs the full text
+    and only runs for str input.
+
+    Parameters
+    ----------
+    raw_text : str | Iterable[str]
+        Full plain-text representation of the XHTML/iXBRL document
+        from extract_raw_text(), or a stream of its paragraphs.
+    run_llm_fn : Callable[[str], str]
+        A function that sends a prompt to an LLM and returns the answer
+        as a plain string. In your app this is `run_ai_model`.
+
+    Returns
+    -------
+    str
+        Concatenated extracted text belonging to the Ledelsesberetning.
+    """
+    if stats is None:
+        stats = {}
+    stats.update(chunks=0, llm_calls=0, skipped_relevance=0, skipped_after_end=0, located=False)
+
+    streamed = not isinstance(raw_text, str)
+    if not streamed and not raw_text:
+        return ""
+
+    if min_confidence is not None and not streamed:
+        located = locate_ledelsesberetning(raw_text)
+        if located.text and located.confidence >= min_confidence:
+            print(
+                f"Ledelsesberetning located without LLM "
+                f"(confidence {located.confidence:.2f}, "
+                f"'{located.start_heading}' → '{located.end_heading}')"
+            )
+            stats["located"] = True
+            return _dedupe_lines(located.text)
+
+    if mode not in ("ids", "text"):
+        raise ValueError(f"Unknown extraction mode '{mode}' (use 'ids' or 'text')")
+
+    groups = iter_token_chunk_paragraphs(
+        raw_text, max_tokens=max_tokens, overlap=overlap, numbered=(mode == "ids")
+    )
+    total = None
+    if not streamed:
+        groups = list(groups)
+        total = len(groups)
+        print("Number of chunks:", total)
+    pending = iter(groups)
+
+    results = []
+    paragraphs = {}        # "ids" mode: paragraph ID -> text, as chunks are built
+    selected_ids = set()
+
+    scorer = ChunkScorer(total) if min_relevance is not None else None
+    tracker = _ReviewTracker()
+
+    max_concurrency = max(1, max_concurrency)
+    slots = threading.Semaphore(max_concurrency)   # released when a call really returns
+    window = deque()   # [idx, group, chunk, prompt or None, future, started] in chunk order
+    exhausted = False
+    built = 0
+
+    def launch(entry) -> None:
+        entry[4] = _start_call(run_llm_fn, entry[3], slots)
+        entry[5] = time.monotonic()
+        stats["llm_calls"] += 1
+
+    while True:
+        # Keep up to max_concurrency chunks ahead, in chunk order
+        while (
+            not exhausted
+            and len(window) < max_concurrency
+            and not (stop_at_end and tracker.state == ENDED)
+        ):
+            group = next(pending, None)
+            if group is None:
+                exhausted = True
+                break
+
+            idx = built
+            built += 1
+
+            # Headings are recognised on the plain text; in "ids" mode the model sees numbers
+            chunk = "\n\n".join(p for _, p in group)
+            if mode == "ids":
+                paragraphs.update(group)
+
+            prompt = None
+            if scorer is None or scorer.score(chunk).score >= min_relevance:
+                if mode == "ids":
+                    prompt = _ids_prompt("\n\n".join(number_paragraph(i, p) for i, p in group))
+                else:
+                    prompt = _chunk_prompt(chunk)
+            window.append([idx, group, chunk, prompt, None, None])
+
+        # Send the waiting chunks, in order, while slots are free
+        for entry in window:
+            if entry[3] is None or entry[4] is not None:
+                continue
+            if not slots.acquire(blocking=False):
+                break
+            launch(entry)
+
+        if not window:
+            break
+
+        entry = window.popleft()
+        idx, group, chunk, prompt = entry[:4]
+
+        if prompt is None:
+            stats["skipped_relevance"] += 1
+            tracker.feed_headings(chunk)
+        else:
+            try:
+                if entry[4] is None:
+                    # Every slot is held by a call (possibly an abandoned one)
+                    if not slots.acquire(timeout=call_timeout):
+                        raise FutureTimeout()
+                    launch(entry)
+                remaining = None
+                if call_timeout is not None:
+                    remaining = max(0.0, call_timeout - (time.monotonic() - entry[5]))
+                answer = entry[4].result(timeout=remaining)
+            except FutureTimeout:
+                print(f"[LLM TIMEOUT chunk {idx}] no answer after {call_timeout:g}s")
+                answer = None
+            except Exception as e:
+                print(f"[LLM ERROR chunk {idx}] {e}")
+                answer = None
+
+            tracker.feed_headings(chunk)
+            if answer is not None and mode == "ids":
+                chunk_ids = {pid for pid, _ in group}
+                ids = chunk_ids.intersection(_parse_ids(answer))
+                selected_ids.update(ids)
+                tracker.feed_answer(bool(ids))
+
+            elif answer is not None:
+                cleaned = _clean_llm_answer(answer)
+
+                # Ignore obvious "no content" messages if model uses them
+                lowered = cleaned.strip().lower()
+                has_content = lowered not in ("", "none", "ingen", "no relevant content")
+
+                tracker.feed_answer(has_content)
+                if has_content:
+                    results.append(cleaned)
+
+        if stop_at_end and tracker.state == ENDED:
+            # Only chunks never sent count: those not built yet (unknown for a
+            # stream, which is not read further) and windowed ones below the
+            # relevance threshold or still waiting for a slot. Calls already
+            # in flight are in llm_calls.
+            not_built = total - built if total is not None else 0
+            stats["skipped_after_end"] = not_built + sum(1 for w in window if w[4] is None)
+            break
+
+    stats["chunks"] = total if total is not None else built
+    if streamed and hasattr(groups, "close"):
+        groups.close()   # stop reading the report
+
+    print(
+        f"LLM calls: {stats['llm_calls']}/{stats['chunks']} chunks "
+        f"(skipped: {stats['skipped_relevance']} by relevance, "
+        f"{stats['skipped_after_end']} after the section ended)"
+    )
+
+    if mode == "ids":
+        # Rebuild verbatim from the source paragraphs, heading markers dropped
+        results = [
+            paragraphs[pid][4:].strip() if paragraphs[pid].startswith("### ") else paragraphs[pid]
+            for pid in sorted(selected_ids)
+        ]
+
+    # Join all extracted pieces with blank lines
+    full = "\n\n".join(results).strip()
+
+    # Optional simple dedupe of repeated paragraphs
+    if not full:
+        return ""
+
+    return _dedupe_lines(full)
@@ -2,29 +2,221 @@
 xhtml_llm_summary.py
 --------------------
 LLM-based summarization of Ledelsesberetning.
+
+Short texts go into the three-theme prompt as they are. Above
+MAP_REDUCE_MIN_TOKENS (estimated) the text is summarised map-reduce style:
+
+1. Map: the text is split into token-budgeted chunks and each chunk is
+   condensed to key points, in parallel
+2. Reduce: the partial summaries replace the text in the three-theme
+   prompt (repeating step 1 on the partials if they are still too long)
+
+condense_ledelsesberetning() is the map step on its own, for prompts that
+embed the review next to other data (nlp.final_summary_prompt).
+
+Map prompts only depend on the chunk text, so with run_ai_model the
+partial summaries are served from the LLM cache on repeated runs.
 """
 
-from typing import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional
 
-def llm_summarize_ledelsesberetning(text: str, run_llm_fn: Callable[[str], str]) -> str:
+from utils.prompts import Prompt
+from utils.tokens import estimate_tokens
+from .paragraph_diff import ParagraphDiff
+from .xhtml_chunker import iter_token_chunks
+
+# Above this many estimated tokens the text is summarised map-reduce style
+MAP_REDUCE_MIN_TOKENS = 12000
+
+# Chunk size of the map step and map calls in flight at once
+MAP_CHUNK_TOKENS = 6000
+MAP_MAX_CONCURRENCY = 4
+
+# Map rounds before the reduce prompt is used regardless of its size
+MAX_MAP_ROUNDS = 3
+
+# Extra attempts for parts whose map call failed; a part still missing
+# after that fails the map step (a reduce over the rest would look complete)
+MAP_RETRIES = 1
+
+# Above this share of changed text a full summary replaces the incremental one
+INCREMENTAL_MAX_CHANGED_SHARE = 0.6
+
+# Removed paragraphs are only quoted by their start
+REMOVED_PREVIEW_CHARS = 200
+
+
+SUMMARY_INSTRUCTIONS = """
+Du er en ekspertanalytiker.
+
+Opsummer følgende ledelsesberetning i **kun tre hovedpunkter**:
+- Identificér de **3 vigtigste temaer** i hele teksten (fx strategi, resultater, risici, fusioner, markedsforhold m.m.)
+- Giv en **kort og præcis** punktopsummering af hvert tema
+- Undlad alt, der ikke er blandt de tre mest centrale temaer
+- Maks. 5 linjer pr. tema
+"""
+
+MAP_INSTRUCTIONS = """
+Du er en ekspertanalytiker.
+
+Nedenfor er en del af en længere ledelsesberetning. Skriv et kort,
+faktuelt resumé af delen som punktliste (maks. 10 punkter):
+- Strategi, aktiviteter og væsentlige begivenheder
+- Resultater, nøgletal og markedsforhold
+- Risici, usikkerheder og forventninger
+- Bevar tal, beløb og årstal præcist
+- Ingen indledning, ingen konklusion
+"""
+
+INCREMENTAL_INSTRUCTIONS = """
+Du er en ekspertanalytiker.
+
+Nedenfor er sidste års opsummering af virksomhedens ledelsesberetning
+og de afsnit i årets ledelsesberetning, der er nye eller ændrede.
+Alt andet i ledelsesberetningen er uændret fra sidste år.
+
+Opdater opsummeringen, så den dækker årets ledelsesberetning:
+- Stadig **kun tre hovedpunkter** (de 3 vigtigste temaer)
+- Brug årets tal og formuleringer, hvor de afviger fra sidste år
+- Fjern forhold, der kun stod i de udgåede afsnit
+- Maks. 5 linjer pr. tema
+"""
+
+
+def build_ledelsesberetning_summary_prompt(text: str) -> Prompt:
+    """Prompt for the three-theme summary (also used for streaming in the app)."""
+    return Prompt([("instruktioner", SUMMARY_INSTRUCTIONS)], [("tekst", "TEKST:\n" + text)])
+
+
+def build_map_prompt(chunk: str) -> Prompt:
+    """Prompt that condenses one part of a long ledelsesberetning (map step)."""
+    return Prompt([("instruktioner", MAP_INSTRUCTIONS)], [("tekst", "TEKST:\n" + chunk)])
 
-    if not text.strip():
-        return "Ingen ledelsesberetning fundet."
 
-    prompt = f"""
-    Du er en ekspertanalytiker.
+def build_incremental_summary_prompt(
+    previous_summary: str, delta: str, removed: List[str]
+) -> Prompt:
+    """Prompt that updates last year's three-theme summary with this year's changes."""
+    gone = "\n".join(
+        f"- {p[:REMOVED_PREVIEW_CHARS]}{'…' if len(p) > REMOVED_PREVIEW_CHARS else ''}"
+        for p in removed
+    ) or "(ingen)"
+    return Prompt(
+        [("instruktioner", INCREMENTAL_INSTRUCTIONS)],
+        [
+            ("sidste_opsummering", "SIDSTE ÅRS OPSUMMERING:\n" + previous_summary),
+            ("ændringer", "NYE ELLER ÆNDREDE AFSNIT:\n" + delta),
+            ("udgået", "UDGÅEDE AFSNIT (begyndelsen):\n" + gone),
+        ],
+    )
 
-    Opsummer følgende ledelsesberetning i **kun tre hovedpunkter**:
-    - Identificér de **3 vigtigste temaer** i hele teksten (fx strategi, resultater, risici, fusioner, markedsforhold m.m.)
-    - Giv en **kort og præcis** punktopsummering af hvert tema
-    - Undlad alt, der ikke er blandt de tre mest centrale temaer
-    - Maks. 5 linjer pr. tema
 
-    TEKST:
-    {text}
+def _summarize_parts(chunks: List[str], run_llm_fn: Callable[[str], str]) -> Optional[List[str]]:
     """
+    Map step: condensed summaries of the chunks, in order. Failed parts
+    are retried MAP_RETRIES times; None if any part is still missing.
+    """
+
+    def summarize(chunk: str) -> str:
+        try:
+            return (run_llm_fn(build_map_prompt(chunk)) or "").strip()
+        except Exception as e:
+            print(f"[LLM ERROR map] {e}")
+            return ""
+
+    partials = [""] * len(chunks)
+    todo = list(range(len(chunks)))
+    with ThreadPoolExecutor(max_workers=MAP_MAX_CONCURRENCY) as pool:
+        for attempt in range(MAP_RETRIES + 1):
+            if attempt:
+                print(f"Map step: retrying {len(todo)}/{len(chunks)} parts")
+            for i, partial in zip(todo, pool.map(summarize, [chunks[i] for i in todo])):
+                partials[i] = partial
+            todo = [i for i in todo if not partials[i]]
+            if not todo:
+                return partials
+
+    print(f"Map step: {len(todo)}/{len(chunks)} parts could not be summarised")
+    return None
+
+
+def condense_ledelsesberetning(
+    text: str, run_llm_fn: Callable[[str], str]
+) -> Optional[str]:
+    """
+    `text` itself if it is short enough for one prompt, otherwise the
+    partial summaries of the map step (calling run_llm_fn). Returns None
+    if a part could not be summarised, rather than condensing only the rest.
+    """
+    current = text
+    for _ in range(MAX_MAP_ROUNDS):
+        tokens = estimate_tokens(current)
+        if tokens <= MAP_REDUCE_MIN_TOKENS:
+            break
+
+        chunks = list(iter_token_chunks(current, max_tokens=MAP_CHUNK_TOKENS))
+        print(f"Map-reduce summary: {tokens} tokens in {len(chunks)} parts")
+
+        partials = _summarize_parts(chunks, run_llm_fn)
+        if partials is None:
+            return None
+
+        current = "\n\n".join(partials)
+        if estimate_tokens(current) >= tokens:
+            break   # no longer shrinking
+
+    return current
+
+
+def prepare_ledelsesberetning_summary_prompt(
+    text: str, run_llm_fn: Callable[[str], str]
+) -> Optional[Prompt]:
+    """
+    The final three-theme prompt for `text`. For long texts the map step
+    runs first (calling run_llm_fn) and the prompt holds the partial
+    summaries instead of the text. Returns None if the map step failed.
+    """
+    condensed = condense_ledelsesberetning(text, run_llm_fn)
+    if condensed is None:
+        return None
+    return build_ledelsesberetning_summary_prompt(condensed)
+
+
+def prepare_incremental_summary_prompt(
+    diff: ParagraphDiff, previous_summary: str, run_llm_fn: Callable[[str], str]
+) -> Optional[Prompt]:
+    """
+    Update prompt for `diff` (previous text -> current text) and last
+    year's summary. Falls back to the full three-theme prompt when more
+    than INCREMENTAL_MAX_CHANGED_SHARE of the text changed. Returns None
+    if the map step failed.
+    """
+    full_text = "\n\n".join(diff.paragraphs)
+    if not previous_summary or diff.changed_share > INCREMENTAL_MAX_CHANGED_SHARE:
+        return prepare_ledelsesberetning_summary_prompt(full_text, run_llm_fn)
+
+    delta = "\n\n".join(diff.delta_paragraphs())
+    print(
+        f"Incremental summary: {len(diff.changed) + len(diff.new)}/{len(diff.paragraphs)} "
+        f"paragraphs changed, {estimate_tokens(delta)} of {estimate_tokens(full_text)} tokens sent"
+    )
+
+    condensed = condense_ledelsesberetning(delta, run_llm_fn)
+    if condensed is None:
+        return None
+    return build_incremental_summary_prompt(previous_summary, condensed or "(ingen)", diff.removed)
+
+
+def llm_summarize_ledelsesberetning(text: str, run_llm_fn: Callable[[str], str]) -> str:
+
+    if not text.strip():
+        return "Ingen ledelsesberetning fundet."
 
     try:
+        prompt = prepare_ledelsesberetning_summary_prompt(text, run_llm_fn)
+        if prompt is None:
+            return "Fejl: LLM kunne ikke opsummere teksten."
         return run_llm_fn(prompt)
     except:
         return "Fejl: LLM kunne ikke opsummere teksten."
@@ -0,0 +1,178 @@
+# xhtml_pages.py
+"""
+Page-parallel narrative extraction for large ESEF XHTML reports.
+
+ESEF reports are usually a long run of page-level <div> containers
+directly under <body>. This module:
+
+1. Scans the raw bytes with a lightweight tag tokenizer (no DOM) and cuts
+   the file in front of every top-level <div> that is not inside an open
+   ix: element
+2. Groups the pages into balanced batches and extracts their text blocks
+   in a process pool (the streaming extractor from xhtml_text)
+3. Concatenates the blocks in page order and applies the same dedupe and
+   formatting as extract_raw_text(), so the output is identical
+
+If the page structure cannot be determined reliably, it falls back to
+the normal single-core extractor.
+
+Usage:
+    text = extract_raw_text_parallel("/path/to/report.xhtml", workers=16)
+    # or: extract_raw_text(path, workers=16)
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from .xhtml_text import extract_raw_text, format_block, iter_text_blocks, merge_blocks
+
+# Below this size the process pool costs more than it saves
+PARALLEL_MIN_BYTES = 2 * 1024 * 1024
+
+# Batches per worker (smooths out pages of very different size)
+BATCHES_PER_WORKER = 4
+
+VOID_TAGS = {
+    b"area", b"base", b"br", b"col", b"embed", b"hr", b"img", b"input",
+    b"link", b"meta", b"param", b"source", b"track", b"wbr",
+}
+RAW_TEXT_TAGS = {b"script", b"style"}
+
+_MARKUP = re.compile(
+    rb"<!--.*?-->"
+    rb"|<!\[CDATA\[.*?\]\]>"
+    rb"|<[?!][^>]*>"
+    rb"|<(?P<close>/?)(?P<name>[A-Za-z][^\s/>]*)(?P<attrs>(?:\"[^\"]*\"|'[^']*'|[^'\">])*)>",
+    re.DOTALL,
+)
+
+
+# ------------------------------------------------------------
+# PAGE SPLITTING
+# ------------------------------------------------------------
+def find_page_cuts(data) -> Optional[List[int]]:
+    """
+    Return byte offsets where the document can be cut into pages: the
+    start of every <div> directly under <body> with no ix: element open.
+    Returns None if the markup is not balanced enough to trust.
+    """
+    depth = 0
+    ix_open = 0
+    body_depth = None
+    cuts: List[int] = []
+    pos = 0
+
+    while True:
+        m = _MARKUP.search(data, pos)
+        if not m:
+            break
+        pos = m.end()
+
+        name = m.group("name")
+        if name is None:
+            continue  # comment, CDATA, PI, doctype
+
+        name = name.lower()
+
+        if m.group("close"):
+            if name in VOID_TAGS:
+                continue
+            depth -= 1
+            if name.startswith(b"ix:"):
+                ix_open -= 1
+            if depth < 0 or ix_open < 0:
+                return None
+            if body_depth is not None and depth < body_depth:
+                break  # </body>
+            continue
+
+        if name == b"div" and body_depth is not None and depth == body_depth and not ix_open:
+            cuts.append(m.start())
+
+        if name in VOID_TAGS or m.group("attrs").rstrip().endswith(b"/"):
+            continue
+
+        depth += 1
+        if name.startswith(b"ix:"):
+            ix_open += 1
+        if name == b"body" and body_depth is None:
+            body_depth = depth
+
+        if name in RAW_TEXT_TAGS:
+            # Skip raw text (may contain '<') up to the matching end tag
+            end = re.compile(rb"</" + re.escape(name) + rb"\s*>", re.IGNORECASE).search(data, pos)
+            if not end:
+                return None
+            pos = end.end()
+            depth -= 1
+
+    if body_depth is None:
+        return None
+    return cuts
+
+
+def _batches(cuts: List[int], size: int, n_batches: int) -> List[Tuple[int, int]]:
+    """Group consecutive pages into ~n_batches byte ranges of similar size."""
+    bounds = [0] + cuts + [size]
+    target = size / max(1, n_batches)
+
+    ranges = []
+    start = 0
+    for b in bounds[1:-1]:
+        if b - start >= target:
+            ranges.append((start, b))
+            start = b
+    ranges.append((start, size))
+    return ranges
+
+
+# ------------------------------------------------------------
+# WORKER
+# ------------------------------------------------------------
+def _range_blocks(task: Tuple[str, int, int]) -> list:
+    """Text blocks (before dedupe) of one byte range of the report."""
+    path, start, end = task
+    with open(path, "rb") as f:
+        f.seek(start)
+        text = f.read(end - start).decode("utf-8", errors="ignore")
+
+    # Later ranges start in the middle of <body>; reopen it for the parser
+    pieces = [text] if start == 0 else ["<html><body>", text]
+    return list(iter_text_blocks(pieces))
+
+
+# ------------------------------------------------------------
+# MAIN
+# ------------------------------------------------------------
+def extract_raw_text_parallel(xhtml_path: str, workers: Optional[int] = None) -> str:
+    """
+    Same output as extract_raw_text(xhtml_path), but pages are extracted
+    in a process pool with `workers` processes (default: all cores).
+    """
+    workers = workers or os.cpu_count() or 1
+    size = os.path.getsize(xhtml_path)
+
+    if workers <= 1 or size < PARALLEL_MIN_BYTES:
+        return extract_raw_text(xhtml_path)
+
+    with open(xhtml_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        cuts = find_page_cuts(data)
+
+    if not cuts:
+        return extract_raw_text(xhtml_path)
+
+    ranges = _batches(cuts, size, workers * BATCHES_PER_WORKER)
+    if len(ranges) < 2:
+        return extract_raw_text(xhtml_path)
+
+    tasks = [(xhtml_path, start, end) for start, end in ranges]
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        per_range = list(pool.map(_range_blocks, tasks))
+
+    blocks = (b for range_blocks in per_range for b in range_blocks)
+    return "\n\n".join(format_block(b) for b in merge_blocks(blocks)).strip()
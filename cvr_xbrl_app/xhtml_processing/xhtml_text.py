@@ -10,15 +10,24 @@ Goals:
 
 Usage:
     text = extract_raw_text("/path/to/report.xhtml")
+    text = extract_raw_text(load_document("/path/to/report.xhtml"))
+
+A file path is extracted in ONE linear streaming pass (lxml parser target,
+no tree): memory is bounded by the largest block still being collected,
+not by the document. A ParsedDocument reuses its shared tree. Both
+produce byte-identical output.
 """
 
-from pathlib import Path
-from bs4 import BeautifulSoup, XMLParsedAsHTMLWarning
-from bs4.element import Tag
+import codecs
 import re
-import warnings
+from collections import deque
+from typing import Iterable, Iterator, Optional, Tuple
+
+from utils.lazy import lazy_import
+from .xhtml_document import GARBAGE_TAGS, TEXTLESS_TAGS, ParsedDocument
 
-warnings.filterwarnings("ignore", category=XMLParsedAsHTMLWarning)
+# Imported on first parse, not when the app starts
+etree = lazy_import("lxml.etree")
 
 # ------------------------------------------------------------
 # TAGS that usually contain readable narrative text
@@ -41,6 +50,9 @@ BLOCK_TAGS = [
 
 HEADING_TAGS = ["h1", "h2", "h3", "h4", "h5", "h6"]
 
+# Containers that are skipped when they only wrap other blocks
+WRAPPER_TAGS = ["div", "section", "article", "span"]
+
 # These words will likely appear in or near the Management Review
 HEADING_MARKERS = [
     "ledelsesberetning",
@@ -52,6 +64,27 @@ HEADING_MARKERS = [
     "management review",
 ]
 
+# Headings that mark the start of a section AFTER the Management Review
+END_HEADING_MARKERS = [
+    "ledelsespåtegning",
+    "revisionspåtegning",
+    "den uafhængige revisors",
+    "revisors erklæring",
+    "erklæring om udvidet gennemgang",
+    "anvendt regnskabspraksis",
+    "resultatopgørelse",
+    "balance",
+    "egenkapitalopgørelse",
+    "pengestrømsopgørelse",
+    "noter",
+    "statement by management",
+    "management's statement",
+    "independent auditor",
+    "accounting policies",
+    "income statement",
+    "notes",
+]
+
 
 # ------------------------------------------------------------
 # CLEANING HELPERS
@@ -113,85 +146,285 @@ def clean_line(text: str, is_heading: bool = False) -> str:
 
 
 # ------------------------------------------------------------
-# MAIN EXTRACTOR
+# BLOCKS
 # ------------------------------------------------------------
-def extract_raw_text(xhtml_path: str) -> str:
-    """
-    Fully robust XHTML/iXBRL extractor:
+# A block is (level, text): level 1-6 for h1-h6 headings, None for paragraphs
+Block = Tuple[Optional[int], str]
 
-    1. Load raw XHTML
-    2. Parse DOM with BeautifulSoup (lxml)
-    3. Remove scripts, styles, metadata
-    4. Walk through the document in order and collect:
-       - Headings (h1-h6) as lines prefixed with "### "
-       - Narrative text blocks as paragraphs
-    5. Clean each line
-    6. Return clean text with blank lines between blocks
-    """
-    raw = Path(xhtml_path).read_text(encoding="utf-8", errors="ignore")
 
-    # Parse XHTML
-    try:
-        soup = BeautifulSoup(raw, "lxml")
-    except Exception:
-        soup = BeautifulSoup(raw, "xml")
+def format_block(block: Block) -> str:
+    """Render a block the way it appears in extract_raw_text() output."""
+    level, text = block
+    return f"### {text}" if level else text
 
-    # Remove garbage tags that never contain narrative
-    for tag in soup(["script", "style", "meta", "link", "head", "title"]):
-        tag.decompose()
 
-    body = soup.body or soup  # fallback if <body> missing
+def merge_blocks(blocks: Iterable[Block]) -> Iterator[Block]:
+    """Merge adjacent identical lines (simple dedupe)."""
+    last = None
+    for b in blocks:
+        line = format_block(b)
+        if line != last:
+            yield b
+        last = line
 
-    blocks = []
 
-    # Iterate through relevant tags in document order
-    # BeautifulSoup's find_all preserves order.
-    for node in body.find_all(True):
-        if not isinstance(node, Tag):
-            continue
+def _make_block(name: str, text: str) -> Optional[Block]:
+    if not text:
+        return None
 
-        name = node.name.lower()
+    is_heading = name in HEADING_TAGS
+    cleaned = clean_line(text, is_heading=is_heading)
+    if not cleaned:
+        return None
 
-        is_heading = name in HEADING_TAGS
-        is_block = name in BLOCK_TAGS
+    # Mark headings explicitly so LLM can use them as boundaries
+    return (int(name[1]) if is_heading else None, cleaned)
 
-        if not (is_heading or is_block):
+
+# ------------------------------------------------------------
+# TREE EXTRACTOR (shared ParsedDocument)
+# ------------------------------------------------------------
+def _document_blocks(doc: ParsedDocument) -> Iterator[Block]:
+    view = doc.view("body", GARBAGE_TAGS)
+
+    # Iterate through relevant tags in document order
+    for node in view.nodes:
+        name = node.tag
+
+        if not (name in HEADING_TAGS or name in BLOCK_TAGS):
             continue
 
         # Avoid double-collecting: if a div/section is just a wrapper
         # around other block elements, skip it.
-        if name in ["div", "section", "article", "span"]:
+        if name in WRAPPER_TAGS:
             has_block_children = any(
-                isinstance(child, Tag)
-                and (child.name.lower() in BLOCK_TAGS or child.name.lower() in HEADING_TAGS)
-                for child in node.children
+                isinstance(child.tag, str)
+                and (child.tag.lower() in BLOCK_TAGS or child.tag.lower() in HEADING_TAGS)
+                for child in node.el
             )
             if has_block_children:
                 continue
 
-        text = node.get_text(" ", strip=True)
-        if not text:
-            continue
+        block = _make_block(name, view.text(node))
+        if block:
+            yield block
+
 
-        cleaned = clean_line(text, is_heading=is_heading)
-        if not cleaned:
+# ------------------------------------------------------------
+# STREAMING EXTRACTOR (file path)
+# ------------------------------------------------------------
+_GARBAGE = object()
+_PENDING = object()
+
+
+class _Frame:
+    __slots__ = ("name", "slot", "start", "has_block_children")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.slot = None
+        self.start = 0
+        self.has_block_children = False
+
+
+class _NarrativeTarget:
+    """
+    lxml parser target (SAX-style events) that emits blocks in document order.
+
+    It applies exactly the rules of the tree extractor, without a tree:
+    - text runs are buffered until the next tag/comment, like a DOM text node
+    - a candidate element reserves an output slot when it opens and fills it
+      when it closes, so nested candidates still come out in start-tag order
+    - a wrapper (div, section, ...) is settled as skipped as soon as its
+      first block child opens, so an outer div around the whole report
+      neither holds back the blocks after it nor keeps their text
+    - text strings are only kept while a candidate that still needs them
+      is open; memory is bounded by the largest non-wrapper block (e.g. an
+      ix:nonNumeric text block), whose text is one output block anyway
+    """
+
+    def __init__(self):
+        self.ready: list[Block] = []
+        self._data: list[str] = []
+        self._strings: list[str] = []
+        self._stack: list = []
+        self._pending: deque = deque()
+        self._garbage = 0
+        self._muted = 0
+        self._body = 0
+        self._open_candidates = 0
+
+    def _flush(self) -> None:
+        if not self._data:
+            return
+        s = "".join(self._data).strip()
+        self._data = []
+        if s and self._open_candidates and not self._muted:
+            self._strings.append(s)
+
+    def _drain(self) -> None:
+        while self._pending and self._pending[0][0] is not _PENDING:
+            block = self._pending.popleft()[0]
+            if block:
+                self.ready.append(block)
+
+    # ---- parser target interface ----
+    def start(self, tag, attrib, nsmap=None):
+        self._flush()
+        name = tag.lower()
+
+        if self._garbage or name in GARBAGE_TAGS:
+            self._garbage += 1
+            self._stack.append(_GARBAGE)
+            return
+
+        if self._stack:
+            parent = self._stack[-1]
+            if parent is not _GARBAGE and (name in BLOCK_TAGS or name in HEADING_TAGS):
+                if not parent.has_block_children and parent.slot is not None and parent.name in WRAPPER_TAGS:
+                    # Its own text is never emitted: settle the slot and stop collecting for it
+                    parent.slot[0] = None
+                    self._close_candidate()
+                parent.has_block_children = True
+
+        frame = _Frame(name)
+        if name == "body":
+            self._body += 1
+        if name in TEXTLESS_TAGS:
+            self._muted += 1
+
+        if self._body and (name in HEADING_TAGS or name in BLOCK_TAGS):
+            frame.slot = [_PENDING]
+            frame.start = len(self._strings)
+            self._pending.append(frame.slot)
+            self._open_candidates += 1
+
+        self._stack.append(frame)
+
+    def end(self, tag):
+        self._flush()
+        frame = self._stack.pop()
+
+        if frame is _GARBAGE:
+            self._garbage -= 1
+            return
+
+        if frame.name == "body":
+            self._body -= 1
+        if frame.name in TEXTLESS_TAGS:
+            self._muted -= 1
+
+        if frame.slot is None:
+            return
+
+        if frame.name in WRAPPER_TAGS and frame.has_block_children:
+            return  # settled when its first block child opened
+
+        frame.slot[0] = _make_block(frame.name, " ".join(self._strings[frame.start:]))
+        self._close_candidate()
+
+    def _close_candidate(self) -> None:
+        self._open_candidates -= 1
+        if not self._open_candidates:
+            self._strings = []
+        self._drain()
+
+    def data(self, data):
+        if not self._garbage:
+            self._data.append(data)
+
+    def comment(self, text):
+        self._flush()
+
+    def pi(self, target, data=None):
+        self._flush()
+
+    def doctype(self, *args):
+        pass
+
+    def close(self):
+        self._flush()
+        self._drain()
+
+
+def iter_text_blocks(pieces: Iterable[str]) -> Iterator[Block]:
+    """
+    Stream blocks (before dedupe) out of decoded XHTML text pieces.
+    Blocks are yielded as soon as they are complete.
+    """
+    target = _NarrativeTarget()
+    parser = etree.HTMLParser(target=target, strip_cdata=False, recover=True)
+
+    for piece in pieces:
+        if not piece:
             continue
+        parser.feed(piece)
+        if target.ready:
+            ready, target.ready = target.ready, []
+            yield from ready
 
-        # Mark headings explicitly so LLM can use them as boundaries
-        if is_heading:
-            blocks.append(f"### {cleaned}")
-        else:
-            blocks.append(cleaned)
+    try:
+        parser.close()
+    except etree.XMLSyntaxError:
+        # Empty or hopeless input: nothing (more) to extract
+        target.close()
 
-    # Merge adjacent identical lines (simple dedupe)
-    merged_blocks = []
-    last = None
-    for b in blocks:
-        if b != last:
-            merged_blocks.append(b)
-        last = b
+    yield from target.ready
+
+
+def _read_text_pieces(xhtml_path: str, chunk_size: int) -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    with open(xhtml_path, "rb") as f:
+        for raw in iter(lambda: f.read(chunk_size), b""):
+            yield decoder.decode(raw)
+    yield decoder.decode(b"", final=True)
+
+
+def iter_narrative_blocks(xhtml_path: str, chunk_size: int = 1 << 20) -> Iterator[Block]:
+    """
+    Stream the deduped (level, text) blocks of a report in document order,
+    reading the file `chunk_size` bytes at a time.
+    """
+    return merge_blocks(iter_text_blocks(_read_text_pieces(xhtml_path, chunk_size)))
+
+
+def iter_raw_paragraphs(xhtml_path: str) -> Iterator[str]:
+    """
+    The paragraphs of extract_raw_text(xhtml_path) ('### ' for headings),
+    yielded while the file is still being parsed.
+    """
+    for block in iter_narrative_blocks(xhtml_path):
+        yield format_block(block)
+
+
+# ------------------------------------------------------------
+# MAIN EXTRACTOR
+# ------------------------------------------------------------
+def extract_raw_text(xhtml: str | ParsedDocument, workers: int = 1) -> str:
+    """
+    Fully robust XHTML/iXBRL extractor:
+
+    1. Stream the file (or walk the shared ParsedDocument tree)
+    2. Skip scripts, styles, metadata
+    3. Walk through the document in order and collect:
+       - Headings (h1-h6) as lines prefixed with "### "
+       - Narrative text blocks as paragraphs
+    4. Clean each line
+    5. Return clean text with blank lines between blocks
+
+    With workers > 1 (file paths only) the pages of large reports are
+    extracted in a process pool, see xhtml_pages. The output is the same.
+    """
+    if workers > 1 and not isinstance(xhtml, ParsedDocument):
+        from .xhtml_pages import extract_raw_text_parallel
+        return extract_raw_text_parallel(str(xhtml), workers)
+
+    if isinstance(xhtml, ParsedDocument):
+        blocks = merge_blocks(_document_blocks(xhtml))
+    else:
+        blocks = iter_narrative_blocks(str(xhtml))
 
     # Join paragraphs with blank lines between them
-    result = "\n\n".join(merged_blocks).strip()
+    result = "\n\n".join(format_block(b) for b in blocks).strip()
 
     return result